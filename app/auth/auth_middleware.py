@@ -1,15 +1,29 @@
 # app/middleware/auth_middleware.py
 import logging
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
+import re
+from typing import List
+
+from starlette.datastructures import Headers
 from starlette.responses import RedirectResponse, JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send
 
 logger = logging.getLogger(__name__)
 
 
-class AdminAuthMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
+def _prefix_pattern(prefixes: List[str]) -> re.Pattern:
+    """多个路径前缀编译为一个正则（长前缀在前），一次匹配代替逐个 startswith"""
+    alternatives = '|'.join(re.escape(prefix) for prefix in sorted(prefixes, key=len, reverse=True))
+    return re.compile(f'(?:{alternatives})')
+
+
+class AdminAuthMiddleware:
+    """后台接口认证中间件（纯 ASGI 实现）
+
+    不经过 BaseHTTPMiddleware：无额外任务和响应流包装，导出等流式响应直接透传
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.protected_paths = [
             "/api/analysis/",
             "/api/user/",
@@ -25,68 +39,61 @@ class AdminAuthMiddleware(BaseHTTPMiddleware):
             "/health",
             "/"
         ]
+        # /admin 后台页面不需要认证（由amis自己处理）
+        self._exclude_pattern = _prefix_pattern(["/admin"] + self.exclude_paths)
+        self._protected_pattern = _prefix_pattern(self.protected_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):
-        path = request.url.path
+        path = scope["path"]
         logger.debug(f"处理请求路径: {path}")
 
         if not self._needs_auth(path):
             logger.debug(f"路径 {path} 无需认证")
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
-        auth_header = request.headers.get('Authorization')
+        auth_header = Headers(scope=scope).get('Authorization')
         logger.debug(f"认证头: {auth_header}")
 
         if not auth_header or not auth_header.startswith('Bearer '):
             logger.warning(f"路径 {path} 缺少认证头")
-            return self._handle_unauthorized(path)
+            await self._handle_unauthorized(path)(scope, receive, send)
+            return
 
         try:
-            from database import SessionFactory
-            from app.auth.login_auth import auth_service
-            from app.user.user_crud import UserCenterCRUD
+            from app.auth.principal_cache import principal_cache
 
             token = auth_header.split(' ')[1]
-            payload = auth_service.decode_access_token(token)
+            user = principal_cache.resolve(token)
 
-            if not payload:
-                logger.warning(f"路径 {path} token无效")
-                return self._handle_unauthorized(path)
+            if not user:
+                logger.warning(f"路径 {path} token无效或用户不存在/未激活")
+                await self._handle_unauthorized(path)(scope, receive, send)
+                return
 
-            with SessionFactory() as db:
-                crud = UserCenterCRUD(db)
-                user = crud.get_user_by_username(payload.get('username'))
-
-                if not user or not user.is_active:
-                    logger.warning(f"路径 {path} 用户不存在或未激活")
-                    return self._handle_unauthorized(path)
-
-                request.state.current_user = user
-                logger.debug(f"用户 {user.user_name} 认证成功")
+            # 依赖 SimpleAuth.get_current_user 通过 request.state 直接复用，不再重复解码和查询
+            scope.setdefault("state", {})["current_user"] = user
+            logger.debug(f"用户 {user.user_name} 认证成功")
 
         except Exception as e:
             logger.error(f"认证异常: {e}")
-            return self._handle_unauthorized(path)
+            await self._handle_unauthorized(path)(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self.app(scope, receive, send)
 
     def _needs_auth(self, path: str) -> bool:
-        """判断路径是否需要认证"""
-        # /admin 后台页面不需要认证（由amis自己处理）
-        if path.startswith('/admin'):
-            return False
+        """判断路径是否需要认证：先检查排除路径，再检查保护路径（均为前缀匹配，与原 startswith 逻辑一致）
 
-        # 先检查排除路径
-        for exclude in self.exclude_paths:
-            if path.startswith(exclude):
-                return False
-
-        # 再检查保护路径
-        for protected in self.protected_paths:
-            if path.startswith(protected):
-                return True
-
-        return False
+        注意 "/" 按前缀匹配会排除所有路径，接口实际由各路由的 Depends(get_current_user) 认证
+        """
+        if self._exclude_pattern.match(path):
+            return False
+        return self._protected_pattern.match(path) is not None
 
     def _handle_unauthorized(self, path: str):
         if path.startswith('/api/'):
@@ -95,4 +102,4 @@ class AdminAuthMiddleware(BaseHTTPMiddleware):
                 content={"status": 1, "msg": "未授权访问", "data": None}
             )
         else:
-            return RedirectResponse(url="/admin/login", status_code=302)
\ No newline at end of file
+            return RedirectResponse(url="/admin/login", status_code=302)
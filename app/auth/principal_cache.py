@@ -0,0 +1,79 @@
+# app/auth/principal_cache.py - 已认证用户缓存：令牌校验通过后短时间内复用用户记录，免去每个请求的用户查询
+import logging
+import threading
+import time
+from typing import Optional, Dict, Tuple, Callable
+
+from config import settings
+from app.auth.login_auth import auth_service
+from app.user.user_model import UserCenter
+
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """用户名 -> 用户记录（已脱离会话的 UserCenter）
+
+    - 令牌每次都解码校验（签名、过期时间），只缓存随后的用户查询
+    - 用户被修改或启用/禁用时由 UserCenterCRUD 调用 invalidate() 立即失效；
+      多进程部署时其他进程的缓存最迟在 ttl_seconds 后失效
+    """
+
+    def __init__(self, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: Dict[str, Tuple[float, UserCenter]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[UserCenter]:
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= self._clock():
+                del self._entries[username]
+                return None
+            return user
+
+    def set(self, user: UserCenter) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[user.user_name] = (self._clock() + self.ttl_seconds, user)
+
+    def invalidate(self, user_id: int) -> None:
+        """用户信息变更：移除该用户的缓存（用户名可能已被修改，按 id 查找）"""
+        with self._lock:
+            for username in [name for name, (_, user) in self._entries.items() if user.id == user_id]:
+                del self._entries[username]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def resolve(self, token: str) -> Optional[UserCenter]:
+        """校验令牌并返回有效用户；令牌无效、用户不存在或已禁用时返回 None"""
+        payload = auth_service.decode_access_token(token)
+        if not payload:
+            return None
+
+        username = payload.get('username')
+        user = self.get(username)
+        if user is None:
+            from database import SessionFactory
+            from app.user.user_crud import UserCenterCRUD
+
+            with SessionFactory() as db:
+                user = UserCenterCRUD(db).get_user_by_username(username)
+            if user is None:
+                return None
+            self.set(user)
+
+        return user if user.is_active else None
+
+
+# 全局实例（AdminAuthMiddleware、SimpleAuth 共用，UserCenterCRUD 更新用户时失效）
+principal_cache = PrincipalCache(ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS)
@@ -1,14 +1,13 @@
 # app/auth/simple_auth.py
 """简化版认证模块 - 只提供后台登录验证和超级用户管理"""
 import logging
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-
-from database import get_db, SessionFactory
+from database import SessionFactory
 from app.user.user_crud import UserCenterCRUD
 from app.user.user_model import UserCenter
 from app.auth.login_auth import auth_service
+from app.auth.principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
@@ -45,23 +44,19 @@ class SimpleAuth:
 
     @staticmethod
     def get_current_user(
-            credentials: HTTPAuthorizationCredentials = Depends(security),
-            db: Session = Depends(get_db)
+            request: Request,
+            credentials: HTTPAuthorizationCredentials = Depends(security)
     ) -> UserCenter:
-        """获取当前用户"""
-        payload = auth_service.decode_access_token(credentials.credentials)
-        if not payload:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="无效令牌"
-            )
+        """获取当前用户（优先使用 AdminAuthMiddleware 已认证的用户）"""
+        user = getattr(request.state, 'current_user', None)
+        if user is not None:
+            return user
 
-        crud = UserCenterCRUD(db)
-        user = crud.get_user_by_username(payload["username"])
-        if not user or not user.is_active:
+        user = principal_cache.resolve(credentials.credentials)
+        if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="用户不存在或已禁用"
+                detail="无效令牌或用户已禁用"
             )
 
         return user
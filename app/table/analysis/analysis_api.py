@@ -1,16 +1,20 @@
-import csv
-import io
+import hashlib
+import json
 from datetime import datetime
 import logging
-from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
-from starlette.responses import StreamingResponse
-
-from database import get_db
-from app.table.analysis.analysis_service import AnalysisService
-from app.table.search.search_schemas import AnalysisSearchRequest, AnalysisSearchResponse
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import StreamingResponse, Response
+
+from database import get_async_db
+from app.table.analysis.analysis_service import AsyncAnalysisService
+from app.table.analysis.analysis_serializer import dumps
+from app.table.analysis.analysis_trend import TrendQuery, PageTrendQuery
+from app.table.analysis.analysis_export import AnalysisExporter, EXPORT_FORMATS, EXPORT_MEDIA_TYPES
+from app.table.search.search_schemas import AnalysisSearchRequest, AnalysisSearchResponse, TrendBatchRequest
 from app.auth.simple_auth import simple_auth
+from config import settings
 
 
 logger = logging.getLogger(__name__)
@@ -43,7 +47,11 @@ async def search_data(
         current_user: dict = Depends(simple_auth.get_current_user),
         # 分页参数
         page: int = Query(1, ge=1, description="页码"),
-        perPage: int = Query(50, ge=1, le=200, description="每页数量"),
+        perPage: int = Query(50, ge=1, le=1000, description="每页数量（表格可选 100 / 200 / 500 / 1000）"),
+        pagination: Optional[str] = Query(None, description="分页方式: offset（默认）/ cursor"),
+        cursor: Optional[str] = Query(None, description="游标分页：上一页返回的 nextCursor"),
+        fields: Optional[str] = Query(None, description="返回字段（逗号分隔），为空时返回全部字段"),
+        include_trend: Optional[str] = Query(None, description="是否返回排名趋势（默认 true；表格由 /trends 批量获取时为 false）"),
 
         # 排序字段
         orderBy: Optional[str] = Query("current_rangking_day", description="排序字段，默认按日排名排序"),
@@ -56,6 +64,7 @@ async def search_data(
         asin: Optional[str] = Query(None, description="ASIN搜索"),
         product_title: Optional[str] = Query(None, description="商品标题搜索"),
         report_date: Optional[str] = Query(None, description="报告日期筛选"),
+        match_mode: Optional[str] = Query(None, description="文本匹配方式: contains/prefix/similar"),
 
         # 高级搜索 - 排名范围参数
         daily_ranking_min: Optional[str] = Query(None, description="日排名最小值"),
@@ -82,9 +91,9 @@ async def search_data(
         is_new_week: Optional[str] = Query(None, description="是否周新品"),
 
         # 依赖注入
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         # current_user: dict = Depends(get_current_user)  # 暂时注释掉用户验证
-) -> Dict[str, Any]:
+) -> Response:
     """搜索亚马逊数据 - 重构后的简洁版本"""
     try:
         # 构建搜索请求参数
@@ -92,6 +101,10 @@ async def search_data(
             # 分页参数
             page=page,
             perPage=perPage,
+            pagination=_parse_optional_value(pagination),
+            cursor=_parse_optional_value(cursor),
+            fields=_parse_optional_value(fields),
+            include_trend=_parse_optional_value(include_trend, bool) is not False,
 
             # 排序参数
             orderBy=_parse_optional_value(orderBy),
@@ -104,6 +117,7 @@ async def search_data(
             asin=_parse_optional_value(asin),
             product_title=_parse_optional_value(product_title),
             report_date=_parse_optional_value(report_date),
+            match_mode=_parse_optional_value(match_mode),
 
             # 排名范围参数
             daily_ranking_min=_parse_optional_value(daily_ranking_min, int),
@@ -130,11 +144,11 @@ async def search_data(
             is_new_week=_parse_optional_value(is_new_week, bool)
         )
 
-        # 调用服务层处理业务逻辑
-        analysis_service = AnalysisService(db)
-        result = analysis_service.search_data(search_params)
+        # 调用服务层处理业务逻辑（精简序列化：按列格式化后直接编码，不再逐行构造模型、按 response_model 重新校验）
+        analysis_service = AsyncAnalysisService(db)
+        payload = await analysis_service.search_payload(search_params)
 
-        return result.model_dump()
+        return Response(content=dumps(payload), media_type="application/json")
 
     except Exception as e:
         logger.error(f"搜索数据API失败: {e}")
@@ -146,28 +160,73 @@ async def search_data(
 
 @analysis_router.get("/categories")
 async def get_categories(
+        request: Request,
         current_user: dict = Depends(simple_auth.get_current_user),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
-    """获取类目下拉选项"""
+    """获取类目下拉选项（ETag + Cache-Control：类目未变化时浏览器复用缓存，协商返回 304）"""
     try:
-        analysis_service = AnalysisService(db)
-        categories = analysis_service.get_categories()
-
-        return {
-            "status": 0,
-            "msg": "获取成功",
-            "data": categories
-        }
+        analysis_service = AsyncAnalysisService(db)
+        categories = await analysis_service.get_categories()
+
+        body = json.dumps({"status": 0, "msg": "获取成功", "data": categories}, ensure_ascii=False)
+        etag = f'"{hashlib.sha1(body.encode("utf-8")).hexdigest()}"'
+        headers = {"ETag": etag, "Cache-Control": f"private, max-age={settings.CATEGORIES_CACHE_MAX_AGE}"}
+
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
     except Exception as e:
         logger.error(f"获取类目选项失败: {e}")
         raise HTTPException(status_code=500, detail=f"获取失败: {str(e)}")
 
 
+@analysis_router.get("/trend")
+async def get_trend(
+        current_user: dict = Depends(simple_auth.get_current_user),
+        keyword_id: Optional[int] = Query(None, description="关键词 id（搜索结果中的 id）"),
+        keyword: Optional[str] = Query(None, description="关键词（未传 keyword_id 时使用）"),
+        window: int = Query(30, description="时间窗口天数: 30 / 90 / 365"),
+        period: str = Query("day", description="排名类型: day / week"),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """关键词排名趋势（keyword_rank_history，按窗口服务端降采样，dates / ranks 列式返回）"""
+    if not settings.RANK_HISTORY_ENABLED:
+        raise HTTPException(status_code=404, detail="排名历史未启用（RANK_HISTORY_ENABLED）")
+    try:
+        data = await TrendQuery(db).fetch(
+            keyword_id=keyword_id, keyword=_parse_optional_value(keyword), window=window, period=period
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"查询排名趋势失败: {e}")
+        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+    return Response(content=dumps({"status": 0, "msg": "查询成功", "data": data}), media_type="application/json")
+
+
+@analysis_router.post("/trends")
+async def get_page_trends(
+        request: TrendBatchRequest,
+        current_user: dict = Depends(simple_auth.get_current_user),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """表格当前页的趋势图数据（一次请求返回整页，dates 只返回一次，ranks 为与 ids 对齐的整数数组）"""
+    try:
+        data = await PageTrendQuery(db).fetch(ids=request.ids, keywords=request.keywords)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"批量查询排名趋势失败: {e}")
+        raise HTTPException(status_code=500, detail=f"查询失败: {str(e)}")
+    return Response(content=dumps({"status": 0, "msg": "查询成功", "data": data}), media_type="application/json")
+
+
 @analysis_router.get("/export")
 async def export_data(
         current_user: dict = Depends(simple_auth.get_current_user),
-        db: Session = Depends(get_db),
+        export_format: Optional[str] = Query(None, alias="format", description="导出格式: csv（默认）/ parquet / arrow"),
+        gzip: Optional[str] = Query(None, description="是否 gzip 压缩导出文件（仅 csv）"),
 
         # 排序字段
         orderBy: Optional[str] = Query("current_rangking_day", description="排序字段，默认按日排名排序"),
@@ -180,6 +239,7 @@ async def export_data(
         asin: Optional[str] = Query(None, description="ASIN搜索"),
         product_title: Optional[str] = Query(None, description="商品标题搜索"),
         report_date: Optional[str] = Query(None, description="报告日期筛选"),
+        match_mode: Optional[str] = Query(None, description="文本匹配方式: contains/prefix/similar"),
 
         # 高级搜索 - 排名范围参数
         daily_ranking_min: Optional[str] = Query(None, description="日排名最小值"),
@@ -205,11 +265,13 @@ async def export_data(
         is_new_day: Optional[str] = Query(None, description="是否日新品"),
         is_new_week: Optional[str] = Query(None, description="是否周新品")
 ):
-    """导出数据结果，限制1000条"""
+    """流式导出数据结果（服务端游标分批读取，行数不受分页限制）"""
+    file_format = _parse_optional_value(export_format) or "csv"
+    if file_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式：{file_format}")
+
     try:
         search_params = AnalysisSearchRequest(
-            page=1,
-            perPage=1500,
             # 排序参数
             orderBy=_parse_optional_value(orderBy),
             orderDir=_parse_optional_value(orderDir),
@@ -221,6 +283,7 @@ async def export_data(
             asin=_parse_optional_value(asin),
             product_title=_parse_optional_value(product_title),
             report_date=_parse_optional_value(report_date),
+            match_mode=_parse_optional_value(match_mode),
 
             # 排名范围参数
             daily_ranking_min=_parse_optional_value(daily_ranking_min, int),
@@ -247,29 +310,13 @@ async def export_data(
             is_new_week=_parse_optional_value(is_new_week, bool)
         )
 
-        # 查询数据
-        analysis_service = AnalysisService(db)
-        result = analysis_service.search_data(search_params)
-
-        items = result.data.get("items", [])
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        writer.writerow(['关键词', '报告日期'])
-
-        for item in items:
-            writer.writerow([
-                item.get('keyword' , ''),
-                item.get('report_date_day' , '')
-            ])
-
-        output.seek(0)
-        filename = f"keywords_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        # gzip 只作用于 csv；parquet / arrow 在文件内部按列 zstd 压缩
+        compress = file_format == "csv" and bool(_parse_optional_value(gzip, bool))
+        filename = f"keywords_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{file_format}" + (".gz" if compress else "")
 
         return StreamingResponse(
-            io.BytesIO(output.getvalue().encode('utf-8-sig')),  # utf-8-sig支持Excel
-            media_type="text/csv",
+            AnalysisExporter().stream(search_params, file_format, compress=compress),
+            media_type="application/gzip" if compress else EXPORT_MEDIA_TYPES[file_format],
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
     except Exception as e:
@@ -0,0 +1,263 @@
+# app/table/analysis/analysis_cache.py - 搜索结果缓存：进程内 LRU/TTL + 可选 Redis 二级缓存，按数据版本号失效
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable
+
+from config import settings
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+logger = logging.getLogger(__name__)
+
+REDIS_VERSION_KEY = 'analysis:search:data_version'
+# Redis 连接或操作失败后，间隔多少秒再重新连接（期间只使用进程内缓存）
+REDIS_RETRY_SECONDS = 30
+
+
+class SearchResultCache:
+    """搜索结果缓存
+
+    - 键为规范化后的 AnalysisSearchRequest 摘要
+    - 导入完成时 bump_version() 递增数据版本号，旧版本的缓存条目不再命中
+    - 配置 REDIS_URL 时版本号和结果同时存入 Redis，多个应用进程共享；Redis 不可用时退回进程内缓存
+    - version_file：同一台机器上各 worker 共享的版本文件（内容为版本号，失效时整体替换写入），
+      未使用 Redis 时由它判断其他 worker 是否已完成导入；未配置时版本号只在本进程内有效
+    - 调用方在查询前取 version_tag() 并传给 get / set：查询期间导入完成时，结果存在旧版本下，不会被当作新数据返回
+    - version_source：与另一个缓存共用数据版本号（如计数缓存跟随搜索结果缓存一起失效）
+    """
+
+    def __init__(
+            self, max_entries: int, ttl_seconds: float, redis_url: str = '', namespace: str = 'search',
+            version_source: Optional['SearchResultCache'] = None, clock: Callable[[], float] = time.monotonic,
+            version_file: str = ''
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.redis_url = redis_url
+        self.key_prefix = f'analysis:{namespace}'
+        self.version_source = version_source
+        self.version_file = version_file
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._local_version = 0
+        self._redis = None
+        # 下次允许尝试连接 Redis 的时间（clock 时钟），失败后按 REDIS_RETRY_SECONDS 推后
+        self._redis_retry_at = 0.0
+        self._stats = {
+            'hits': 0, 'redis_hits': 0, 'misses': 0, 'evictions': 0,
+            'expirations': 0, 'invalidations': 0, 'redis_errors': 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def make_key(params: AnalysisSearchRequest) -> str:
+        """规范化请求参数：去除空值、字符串去空格、按字段名排序后取摘要"""
+        normalized = {}
+        for name, value in params.model_dump().items():
+            if isinstance(value, str):
+                value = value.strip() or None
+            if value is not None:
+                normalized[name] = value
+        raw = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _get_redis(self):
+        """延迟连接 Redis（未配置时只使用进程内缓存；连接失败后等待 REDIS_RETRY_SECONDS 再重试）"""
+        if self._redis is not None or not self.redis_url:
+            return self._redis
+        now = self._clock()
+        with self._lock:
+            if now < self._redis_retry_at:
+                return None
+            # 并发请求中只有一个去连接，其余继续使用进程内缓存
+            self._redis_retry_at = now + REDIS_RETRY_SECONDS
+        try:
+            import redis
+            client = redis.Redis.from_url(self.redis_url, socket_timeout=0.5)
+            client.ping()
+        except Exception as e:
+            logger.warning(f"Redis 不可用，搜索结果缓存暂时只使用进程内缓存（{REDIS_RETRY_SECONDS}s 后重试）: {e}")
+            return None
+        self._redis = client
+        logger.info("搜索结果缓存已启用 Redis 二级缓存")
+        return client
+
+    def _redis_call(self, operation: Callable, default=None):
+        client = self._get_redis()
+        if client is None:
+            return default
+        try:
+            return operation(client)
+        except Exception as e:
+            # 断开后退回进程内缓存，避免 Redis 宕机期间每次请求都等待超时；稍后由 _get_redis 重新连接
+            with self._lock:
+                self._stats['redis_errors'] += 1
+                self._redis = None
+                self._redis_retry_at = self._clock() + REDIS_RETRY_SECONDS
+            logger.warning(f"搜索结果缓存 Redis 操作失败: {e}")
+            return default
+
+    def _file_version(self) -> Optional[int]:
+        if not self.version_file:
+            return None
+        try:
+            with open(self.version_file, encoding='ascii') as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取缓存版本文件失败: {e}")
+            return None
+
+    def _bump_file_version(self) -> None:
+        if not self.version_file:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.version_file) or '.', exist_ok=True)
+            version = (self._file_version() or 0) + 1
+            # 先写临时文件再 os.replace：读取方只会看到完整的旧值或新值；
+            # 多个进程同时失效时可能写入相同的值，但都不同于失效前的版本号，缓存仍会失效
+            temp_path = f'{self.version_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w', encoding='ascii') as f:
+                f.write(str(version))
+            os.replace(temp_path, self.version_file)
+        except OSError as e:
+            logger.warning(f"更新缓存版本文件失败: {e}")
+
+    def version_tag(self) -> str:
+        """缓存条目和 Redis 键使用的版本标记（区分来源，Redis 与版本文件的计数互不混淆）；在查询前读取"""
+        if self.version_source is not None:
+            return self.version_source.version_tag()
+        shared = self._redis_call(lambda client: client.get(REDIS_VERSION_KEY))
+        if shared is not None:
+            return f'r{int(shared)}'
+        file_version = self._file_version()
+        if file_version is not None:
+            return f'f{file_version}'
+        return f'l{self._local_version}'
+
+    def current_version(self) -> int:
+        """当前数据版本号（优先读取 Redis 中的共享版本，其次是版本文件）"""
+        return int(self.version_tag()[1:])
+
+    def bump_version(self) -> int:
+        """数据已变更（导入完成）：递增版本号，使现有缓存全部失效（包括其他 worker 的进程内缓存）"""
+        with self._lock:
+            self._local_version += 1
+            self._stats['invalidations'] += len(self._entries)
+            self._entries.clear()
+        self._bump_file_version()
+        self._redis_call(lambda client: client.incr(REDIS_VERSION_KEY))
+        version = self.current_version()
+        logger.info(f"搜索结果缓存失效，数据版本: {version}")
+        return version
+
+    def get(self, key: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """读取 version（默认为当前版本）下的缓存结果"""
+        if not self.enabled:
+            return None
+
+        version = version or self.version_tag()
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_version, expires_at, value = entry
+                if entry_version != version:
+                    del self._entries[key]
+                    self._stats['invalidations'] += 1
+                elif expires_at <= now:
+                    del self._entries[key]
+                    self._stats['expirations'] += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return value
+
+        cached = self._redis_call(lambda client: client.get(f'{self.key_prefix}:{version}:{key}'))
+        if cached is not None:
+            value = json.loads(cached)
+            self._store_local(key, version, value)
+            with self._lock:
+                self._stats['redis_hits'] += 1
+            return value
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any], version: Optional[str] = None) -> None:
+        """把结果存在 version 下：传入查询前读取的版本，查询期间数据已变更时该条目不会命中"""
+        if not self.enabled:
+            return
+        version = version or self.version_tag()
+        self._store_local(key, version, value)
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        self._redis_call(lambda client: client.setex(
+            f'{self.key_prefix}:{version}:{key}', max(int(self.ttl_seconds), 1), payload
+        ))
+
+    async def aversion_tag(self) -> str:
+        """异步路径使用：配置 Redis 时在线程中读取版本标记（Redis 为阻塞调用，不在事件循环上等待）"""
+        if self._uses_redis():
+            return await asyncio.to_thread(self.version_tag)
+        return self.version_tag()
+
+    async def aget(self, key: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """异步路径使用：配置 Redis 时在线程中执行 get"""
+        if self.enabled and self._uses_redis():
+            return await asyncio.to_thread(self.get, key, version)
+        return self.get(key, version)
+
+    async def aset(self, key: str, value: Dict[str, Any], version: Optional[str] = None) -> None:
+        """异步路径使用：配置 Redis 时在线程中执行 set"""
+        if self.enabled and self._uses_redis():
+            await asyncio.to_thread(self.set, key, value, version)
+        else:
+            self.set(key, value, version)
+
+    def _uses_redis(self) -> bool:
+        """get/set 是否可能访问 Redis（数据版本号来自 version_source 时同样读取它的 Redis）"""
+        return bool(self.redis_url) or (self.version_source is not None and self.version_source._uses_redis())
+
+    def _store_local(self, key: str, version: str, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[key] = (version, self._clock() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            entries = len(self._entries)
+        lookups = stats['hits'] + stats['redis_hits'] + stats['misses']
+        return {
+            'enabled': self.enabled,
+            'redis': self._redis is not None,
+            'data_version': self.current_version(),
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hit_rate': round((stats['hits'] + stats['redis_hits']) / lookups, 3) if lookups else 0.0,
+            **stats,
+        }
+
+
+# 全局缓存实例（AsyncAnalysisService 查询、UploadService 导入完成时失效）
+search_result_cache = SearchResultCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL,
+    version_file=settings.CACHE_VERSION_FILE,
+)
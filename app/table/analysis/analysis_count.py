@@ -0,0 +1,94 @@
+# app/table/analysis/analysis_count.py - 搜索结果计数：按筛选条件缓存、超过阈值的宽泛条件用规划器估算、类目/日期汇总表精确计数
+import json
+import logging
+import time
+from typing import NamedTuple, Set
+
+from sqlalchemy import Table, Column, MetaData, String, Date, BigInteger, text
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.table.analysis.analysis_cache import SearchResultCache, search_result_cache
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+logger = logging.getLogger(__name__)
+
+# 不影响结果集的请求字段（分页、排序），不参与计数缓存键
+NON_FILTER_FIELDS = {'page', 'perPage', 'orderBy', 'orderDir', 'pagination', 'cursor', 'fields', 'include_trend'}
+# 只有这些筛选条件时可直接由汇总表得到精确计数（match_mode 只影响类目的匹配方式）
+SUMMARY_FILTER_FIELDS = {'category', 'report_date', 'match_mode'}
+
+# 默认过滤后按 类目 × 日报告日期 × 周报告日期 聚合的行数（docs/migrations/006_search_count_summary.sql）
+# 物化视图不由 ORM 建表，单独的 MetaData
+search_count_summary = Table(
+    'search_count_summary', MetaData(),
+    Column('top_category', String(255)),
+    Column('report_date_day', Date),
+    Column('report_date_week', Date),
+    Column('cnt', BigInteger),
+    schema='analysis',
+)
+
+
+class CountResult(NamedTuple):
+    total: int
+    exact: bool
+
+
+def active_filter_fields(params: AnalysisSearchRequest) -> Set[str]:
+    """请求中实际生效的筛选字段"""
+    fields = set()
+    for name, value in params.model_dump(exclude=NON_FILTER_FIELDS).items():
+        if isinstance(value, str):
+            value = value.strip() or None
+        if value is not None:
+            fields.add(name)
+    return fields
+
+
+def count_signature(params: AnalysisSearchRequest) -> str:
+    """计数缓存键：只由筛选条件决定，同一条件的各页共用一个总数"""
+    reset = {name: None for name in NON_FILTER_FIELDS}
+    reset.update(page=1, perPage=1)
+    return SearchResultCache.make_key(params.model_copy(update=reset))
+
+
+def summary_covers(params: AnalysisSearchRequest) -> bool:
+    return settings.COUNT_SUMMARY_ENABLED and active_filter_fields(params) <= SUMMARY_FILTER_FIELDS
+
+
+def explain_row_estimate(db: Session, stmt) -> int:
+    """规划器估算的结果行数（只做查询规划，不执行）"""
+    connection = db.connection()
+    compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positional:
+        # asyncpg 等位置参数驱动（$1, $2 ...）
+        params = tuple(params[name] for name in compiled.positiontup)
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def refresh_count_summary(db: Session) -> None:
+    """导入完成后刷新计数汇总表（CONCURRENTLY：刷新期间查询不阻塞）"""
+    started = time.perf_counter()
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY analysis.search_count_summary"))
+    db.commit()
+    logger.info(f"计数汇总表刷新完成: {time.perf_counter() - started:.1f}s")
+
+
+def count_cache_ttl() -> float:
+    """计数缓存有效期不超过搜索结果缓存：版本号未能及时反映导入（如其他 worker 上的导入）时，旧总数最多保留这么久"""
+    return min(settings.COUNT_CACHE_TTL_SECONDS, settings.SEARCH_CACHE_TTL_SECONDS)
+
+
+# 计数缓存与搜索结果缓存共用数据版本号，导入完成后一起失效
+count_cache = SearchResultCache(
+    max_entries=settings.COUNT_CACHE_MAX_ENTRIES,
+    ttl_seconds=count_cache_ttl(),
+    redis_url=settings.REDIS_URL,
+    namespace='count',
+    version_source=search_result_cache,
+)
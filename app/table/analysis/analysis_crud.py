@@ -1,150 +1,191 @@
 import logging
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_, asc, func, and_, text, select
-from typing import List, Tuple
+import re
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer, undefer
+from sqlalchemy import desc, or_, asc, func, and_, text, select, Table, MetaData, Column, String, BigInteger
+from typing import List, Tuple, Optional
 from datetime import datetime
 
 from app.table.analysis.analysis_model import AmazonOriginSearchData
+from app.table.analysis.analysis_count import (
+    CountResult, count_cache, count_signature, summary_covers, explain_row_estimate, search_count_summary
+)
+from app.table.analysis.analysis_cursor import (
+    SortKeys, resolve_sort_keys, sort_columns, order_clauses, encode_cursor, decode_cursor, keyset_ranges
+)
+from config import settings
 from app.table.search.search_schemas import AnalysisSearchRequest
 
 logger = logging.getLogger(__name__)
 
+# 完整 ASIN（10位字母数字）走等值匹配
+ASIN_PATTERN = re.compile(r'^[A-Z0-9]{10}$')
+TEXT_MATCH_MODES = ('contains', 'prefix', 'similar')
+
+# 默认排除的类目（与 docs/migrations/004_branded_keyword_flag.sql 部分索引条件保持一致）
+CATEGORY_BLACKLIST = [
+    'Books',
+    'Grocery',
+    'Video Games',
+    'Digital_Video_Download',
+    'Digital_Ebook_Purchase',
+    'Digital_Music_Purchase'
+]
+
+
+def escape_like(value: str) -> str:
+    """转义 LIKE 通配符，用户输入的 % _ 按字面匹配"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class AnalysisQueryBuilder:
+    """搜索语句构建（不访问数据库），同步与异步 CRUD 共用：两个 CRUD 只负责执行语句"""
+
+    @staticmethod
+    def _uses_keyset(params: AnalysisSearchRequest) -> bool:
+        """游标分页（不受页码深度影响）"""
+        return params.pagination == 'cursor' or bool(params.cursor)
+
+    @staticmethod
+    def _fetch_rows(result, columns: Optional[list]) -> list:
+        """指定 columns 时取 Row 元组，否则取 ORM 对象"""
+        if columns:
+            return list(result.all())
+        return list(result.scalars().all())
+
+    @staticmethod
+    def _exact_probe_count(probe: int) -> Optional[CountResult]:
+        """探测计数不超过 COUNT_ESTIMATE_THRESHOLD 时即为精确总数，否则返回 None（改用规划器估算）"""
+        if probe <= settings.COUNT_ESTIMATE_THRESHOLD:
+            return CountResult(probe, True)
+        return None
+
+    # ==================== 语句构建 ====================
+
+    def _paginated_statement(self, base_stmt, params: AnalysisSearchRequest, columns: list = None):
+        """OFFSET 分页：排序 + 偏移 + 每页数量"""
+        skip = (params.page - 1) * params.perPage
+
+        result_stmt = self._ordered_statement(self._projected(base_stmt, columns), params)
+        return result_stmt.offset(skip).limit(params.perPage)
+
+    def _projected(self, base_stmt, columns: list = None):
+        """未指定 columns 时查询完整 ORM 对象（趋势字段按引擎加载），否则只查询指定列（结果为 Row 元组）"""
+        if columns:
+            return base_stmt.with_only_columns(*columns)
+        return base_stmt.options(*self._trend_load_options())
+
+    def _ordered_statement(self, base_stmt, params: AnalysisSearchRequest):
+        """按请求排序，未指定时默认按报告日期倒序、日排名升序"""
+        if params.orderBy:
+            if params.orderDir == "desc":
+                return base_stmt.order_by(desc(getattr(AmazonOriginSearchData, params.orderBy)))
+            return base_stmt.order_by(asc(getattr(AmazonOriginSearchData, params.orderBy)))
+        return base_stmt.order_by(
+            desc(AmazonOriginSearchData.report_date_day),
+            asc(AmazonOriginSearchData.current_rangking_day)
+        )
 
-class AnalysisCRUD:
-    """分析数据CRUD操作类"""
-
-    def __init__(self, db: Session):
-        self.db = db
-
-    def search_data_paginated(self, params: AnalysisSearchRequest) -> Tuple[List[AmazonOriginSearchData], int]:
-        """分页搜索数据"""
-        try:
-            # 计算偏移量
-            skip = (params.page - 1) * params.perPage
-
-            # 构建基础查询
-            base_stmt = self._build_search_query(params)
-
-            # 仅第一页或少量数据时精确统计
-            if self._has_user_filters(params) and params.page == 1:
-                count_stmt = select(func.count()).select_from(base_stmt)
-                total_count = self.db.execute(count_stmt).scalar() or 0
-            elif self._has_user_filters(params):
-                # 后续页使用limit估算（避免全表扫描）
-                limited_stmt = base_stmt.limit(10000)
-                count_stmt = select(func.count()).select_from(limited_stmt)
-                total_count = self.db.execute(count_stmt).scalar() or 0
-            else:
-                total_count = self._get_table_estimate_count()
-
-            # 应用排序和分页到完整查询
-            result_stmt = base_stmt
-            if params.orderBy:
-                if params.orderDir == "desc":
-                    result_stmt = result_stmt.order_by(desc(getattr(AmazonOriginSearchData, params.orderBy)))
-                else:
-                    result_stmt = result_stmt.order_by(asc(getattr(AmazonOriginSearchData, params.orderBy)))
-            else:
-                result_stmt = result_stmt.order_by(
-                    desc(AmazonOriginSearchData.report_date_day),
-                    asc(AmazonOriginSearchData.current_rangking_day)
-                )
-
-            result_stmt = result_stmt.offset(skip).limit(params.perPage)
-            results = list(self.db.execute(result_stmt).scalars().all())
-
-            return results, total_count
-
-        except Exception as e:
-            logger.error(f"分页搜索数据失败: {e}")
-            return [], 0
-
-    def get_categories(self) -> List[dict]:
-        """获取类目列表 - 使用视图查询"""
-        try:
-            result = self.db.execute(
-                text("SELECT top_category, cnt FROM analysis.my_category_stats ORDER BY cnt DESC")
-            ).fetchall()
+    def _keyset_statement(self, base_stmt, condition, sort_keys: SortKeys, limit: int, columns: list = None):
+        """游标分页的单个区间查询（columns 须包含排序字段和 id，用于生成下一页游标）"""
+        result_stmt = base_stmt if condition is None else base_stmt.where(condition)
+        result_stmt = result_stmt.order_by(*order_clauses(sort_keys))
+        return self._projected(result_stmt, columns).limit(limit)
+
+    def _keyset_columns(self, columns: Optional[list], sort_keys: SortKeys) -> Optional[list]:
+        """投影查询补上排序字段（下一页游标由本页末行的排序键值生成）"""
+        if not columns:
+            return columns
+        selected = {column.key for column in columns}
+        return columns + [column for column in sort_columns(sort_keys) if column.key not in selected]
+
+    def _keyset_conditions(self, params: AnalysisSearchRequest, sort_keys: SortKeys) -> list:
+        """游标分页的区间条件（首页无条件）；游标无效时抛出 InvalidCursorError"""
+        if not params.cursor:
+            return [None]
+        return keyset_ranges(sort_keys, decode_cursor(params.cursor, sort_keys))
+
+    def _keyset_page(
+            self, results: list, sort_keys: SortKeys, per_page: int
+    ) -> Tuple[List[AmazonOriginSearchData], Optional[str]]:
+        """多取的一行存在时截断到一页，并由本页末行生成下一页游标"""
+        if len(results) > per_page:
+            results = results[:per_page]
+            return results, encode_cursor(sort_keys, results[-1])
+        return results, None
+
+    def _build_count_stmt(self, base_stmt):
+        """最多数到 COUNT_ESTIMATE_THRESHOLD + 1 行：宽泛条件不做全量 count(*)，
+        规划器高估的选择性条件仍能得到精确总数"""
+        probe = base_stmt.with_only_columns(AmazonOriginSearchData.id).limit(settings.COUNT_ESTIMATE_THRESHOLD + 1)
+        return select(func.count()).select_from(probe.subquery())
+
+    def _summary_count_statement(self, params: AnalysisSearchRequest):
+        """从类目 × 日期汇总表求和（汇总表已应用默认过滤条件）"""
+        stmt = select(func.coalesce(func.sum(search_count_summary.c.cnt), 0))
+        if params.category and params.category.strip():
+            stmt = stmt.where(self._category_predicate(search_count_summary.c.top_category, params.category.strip()))
+        date_predicate = self._report_date_predicate(
+            search_count_summary.c.report_date_day, search_count_summary.c.report_date_week, params.report_date
+        )
+        if date_predicate is not None:
+            stmt = stmt.where(date_predicate)
+        return stmt
 
+    def _categories_statement(self):
+        """类目统计 - 启用物化视图时读取 category_stats，否则读取原视图"""
+        relation = 'category_stats' if settings.CATEGORY_STATS_MATERIALIZED else 'my_category_stats'
+        stats = Table(relation, MetaData(), Column('top_category', String), Column('cnt', BigInteger), schema='analysis')
+        return select(stats.c.top_category, stats.c.cnt).order_by(stats.c.cnt.desc())
+
+    def _format_categories(self, rows) -> List[dict]:
+        return [
+            {
+                "label": f"{row.top_category} ({row.cnt})",
+                "value": row.top_category
+            }
+            for row in rows
+        ]
+
+    def _trend_load_options(self) -> list:
+        """按趋势引擎只加载需要的趋势字段（数组引擎不再读取 jsonb 列）"""
+        if settings.RANKING_TREND_ENGINE == 'array':
             return [
-                {
-                    "label": f"{row.top_category} ({row.cnt})",
-                    "value": row.top_category
-                }
-                for row in result
+                defer(AmazonOriginSearchData.ranking_trend_day),
+                undefer(AmazonOriginSearchData.trend_dates),
+                undefer(AmazonOriginSearchData.trend_ranks),
             ]
-        except Exception as e:
-            logger.error(f"获取类目列表失败: {e}")
-            return []
-
-    def _has_user_filters(self, params: AnalysisSearchRequest) -> bool:
-        """判断是否有用户搜索条件（排除默认过滤）"""
-        return any([
-            # 基础搜索
-            params.keyword, params.brand, params.category,
-            params.asin, params.product_title, params.report_date,
-            # 排名范围
-            params.daily_ranking_min is not None, params.daily_ranking_max is not None,
-            params.weekly_ranking_min is not None, params.weekly_ranking_max is not None,
-            # 变化范围
-            params.daily_change_min is not None, params.daily_change_max is not None,
-            params.weekly_change_min is not None, params.weekly_change_max is not None,
-            # 份额转化率
-            params.click_share_min is not None, params.click_share_max is not None,
-            params.conversion_share_min is not None, params.conversion_share_max is not None,
-            params.conversion_rate_min is not None, params.conversion_rate_max is not None,
-            # 布尔值
-            params.is_new_day is not None, params.is_new_week is not None
-        ])
-
-    def _get_table_estimate_count(self) -> int:
-        """使用PG统计信息快速估算总行数"""
-        try:
-            result = self.db.execute(
-                text("""
-                     SELECT reltuples::bigint AS estimate
-                     FROM pg_class
-                     WHERE relname = :table_name
-                       AND relnamespace = (SELECT oid
-                                           FROM pg_namespace
-                                           WHERE nspname = :schema_name)
-                     """),
-                {"table_name": "amazon_origin_search_data", "schema_name": "analysis"}
-            ).scalar()
-            return result or 0
-        except Exception as e:
-            logger.error(f"估算表行数失败: {e}")
-            return 0
+        return []
 
     def _build_search_query(self, params: AnalysisSearchRequest):
         """构建搜索查询"""
         stmt = select(AmazonOriginSearchData)
 
         # 默认过滤条件：排除关键词中包含品牌词的条目
-        stmt = stmt.where(
-            and_(
-                AmazonOriginSearchData.top_brand.isnot(None),
-                AmazonOriginSearchData.top_brand != '',
-                ~func.lower(AmazonOriginSearchData.keyword).like(
-                    func.concat('%', func.lower(AmazonOriginSearchData.top_brand), '%')
+        if settings.BRANDED_KEYWORD_FLAG:
+            # 导入时已计算标记，条件与 idx_amazon_default_listing 部分索引一致
+            stmt = stmt.where(
+                and_(
+                    AmazonOriginSearchData.top_brand != '',
+                    AmazonOriginSearchData.is_branded_keyword == False
+                )
+            )
+        else:
+            stmt = stmt.where(
+                and_(
+                    AmazonOriginSearchData.top_brand.isnot(None),
+                    AmazonOriginSearchData.top_brand != '',
+                    ~func.lower(AmazonOriginSearchData.keyword).like(
+                        func.concat('%', func.lower(AmazonOriginSearchData.top_brand), '%')
+                    )
                 )
             )
-        )
 
         # 基础过滤：排除日排名为0的数据
         stmt = stmt.where(AmazonOriginSearchData.current_rangking_day != 0)
 
         # 新增：过滤黑名单类目
-        stmt = stmt.where(
-            ~AmazonOriginSearchData.top_category.in_([
-                'Books',
-                'Grocery',
-                'Video Games',
-                'Digital_Video_Download',
-                'Digital_Ebook_Purchase',
-                'Digital_Music_Purchase'
-            ])
-        )
+        stmt = stmt.where(~AmazonOriginSearchData.top_category.in_(CATEGORY_BLACKLIST))
 
         # 基础搜索条件
         stmt = self._apply_basic_filters(stmt, params)
@@ -161,6 +202,77 @@ class AnalysisCRUD:
 
     def _apply_basic_filters(self, stmt, params: AnalysisSearchRequest):
         """应用基础搜索筛选条件"""
+        if settings.SEARCH_TEXT_MODE == 'trigram':
+            stmt = self._apply_trigram_text_filters(stmt, params)
+        else:
+            stmt = self._apply_ilike_text_filters(stmt, params)
+
+        # 报告日期筛选
+        date_predicate = self._report_date_predicate(
+            AmazonOriginSearchData.report_date_day, AmazonOriginSearchData.report_date_week, params.report_date
+        )
+        if date_predicate is not None:
+            stmt = stmt.where(date_predicate)
+
+        return stmt
+
+    def _report_date_predicate(self, day_column, week_column, report_date: Optional[str]):
+        """报告日期条件：日报告或周报告日期等于指定日期；未指定或格式无效时返回 None"""
+        if not report_date or not report_date.strip():
+            return None
+        try:
+            target_date = datetime.strptime(report_date.strip(), "%Y-%m-%d").date()
+        except ValueError:
+            logger.warning(f"无效的日期格式: {report_date}")
+            return None
+        return or_(day_column == target_date, week_column == target_date)
+
+    def _category_predicate(self, column, category: str):
+        """类目条件：trigram 模式下类目来自下拉选项，等值匹配；ilike 模式模糊匹配"""
+        if settings.SEARCH_TEXT_MODE == 'trigram':
+            return column == category
+        return column.ilike(f"%{category}%")
+
+    def _apply_trigram_text_filters(self, stmt, params: AnalysisSearchRequest):
+        """文本筛选（trigram 模式）- 生成可走 pg_trgm / btree 索引的条件"""
+        match_mode = params.match_mode if params.match_mode in TEXT_MATCH_MODES else 'contains'
+
+        for column, value in (
+                (AmazonOriginSearchData.keyword, params.keyword),
+                (AmazonOriginSearchData.top_brand, params.brand),
+                (AmazonOriginSearchData.top_product_title, params.product_title),
+        ):
+            if value and value.strip():
+                stmt = stmt.where(self._text_predicate(column, value.strip(), match_mode))
+
+        # 类目来自下拉选项，等值匹配
+        if params.category and params.category.strip():
+            stmt = stmt.where(self._category_predicate(AmazonOriginSearchData.top_category, params.category.strip()))
+
+        # ASIN：完整输入等值匹配，否则前缀匹配（ASIN 均为大写）
+        if params.asin and params.asin.strip():
+            asin = params.asin.strip().upper()
+            if ASIN_PATTERN.match(asin):
+                stmt = stmt.where(AmazonOriginSearchData.top_product_asin == asin)
+            else:
+                stmt = stmt.where(AmazonOriginSearchData.top_product_asin.like(f"{escape_like(asin)}%", escape='\\'))
+
+        return stmt
+
+    def _text_predicate(self, column, term: str, match_mode: str):
+        """单个文本字段的匹配条件
+
+        短于 SEARCH_MIN_TRIGRAM_LENGTH 的词提取不出有效三元组，包含/相似度匹配会退化为全表扫描，改为前缀匹配
+        """
+        if match_mode == 'prefix' or len(term) < settings.SEARCH_MIN_TRIGRAM_LENGTH:
+            return column.ilike(f"{escape_like(term)}%", escape='\\')
+        if match_mode == 'similar':
+            # pg_trgm 相似度运算符，阈值由 pg_trgm.similarity_threshold 控制（默认0.3）
+            return column.op('%')(term)
+        return column.ilike(f"%{escape_like(term)}%", escape='\\')
+
+    def _apply_ilike_text_filters(self, stmt, params: AnalysisSearchRequest):
+        """文本筛选（ilike 模式）- '%词%' 模糊匹配"""
         if params.keyword and params.keyword.strip():
             stmt = stmt.where(AmazonOriginSearchData.keyword.ilike(f"%{params.keyword.strip()}%"))
 
@@ -168,7 +280,7 @@ class AnalysisCRUD:
             stmt = stmt.where(AmazonOriginSearchData.top_brand.ilike(f"%{params.brand.strip()}%"))
 
         if params.category and params.category.strip():
-            stmt = stmt.where(AmazonOriginSearchData.top_category.ilike(f"%{params.category.strip()}%"))
+            stmt = stmt.where(self._category_predicate(AmazonOriginSearchData.top_category, params.category.strip()))
 
         if params.asin and params.asin.strip():
             stmt = stmt.where(AmazonOriginSearchData.top_product_asin.ilike(f"%{params.asin.strip()}%"))
@@ -176,19 +288,6 @@ class AnalysisCRUD:
         if params.product_title and params.product_title.strip():
             stmt = stmt.where(AmazonOriginSearchData.top_product_title.ilike(f"%{params.product_title.strip()}%"))
 
-        # 报告日期筛选
-        if params.report_date and params.report_date.strip():
-            try:
-                target_date = datetime.strptime(params.report_date.strip(), "%Y-%m-%d").date()
-                stmt = stmt.where(
-                    or_(
-                        AmazonOriginSearchData.report_date_day == target_date,
-                        AmazonOriginSearchData.report_date_week == target_date
-                    )
-                )
-            except ValueError:
-                logger.warning(f"无效的日期格式: {params.report_date}")
-
         return stmt
 
     def _apply_ranking_filters(self, stmt, params: AnalysisSearchRequest):
@@ -264,3 +363,183 @@ class AnalysisCRUD:
             stmt = stmt.where(AmazonOriginSearchData.is_new_week == params.is_new_week)
 
         return stmt
+
+
+class AnalysisCRUD(AnalysisQueryBuilder):
+    """分析数据CRUD操作类"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def search(self, params: AnalysisSearchRequest, columns: list = None) -> Tuple[list, CountResult, Optional[str]]:
+        """按请求的分页方式搜索，返回 (数据, 总数, 下一页游标)"""
+        if self._uses_keyset(params):
+            return self.search_data_keyset(params, columns)
+        results, count_result = self.search_data_paginated(params, columns)
+        return results, count_result, None
+
+    def search_data_paginated(
+            self, params: AnalysisSearchRequest, columns: list = None
+    ) -> Tuple[List[AmazonOriginSearchData], CountResult]:
+        """分页搜索数据（指定 columns 时返回 Row 元组而非 ORM 对象）"""
+        try:
+            base_stmt = self._build_search_query(params)
+            count_result = self._count(base_stmt, params)
+            result = self.db.execute(self._paginated_statement(base_stmt, params, columns))
+            return self._fetch_rows(result, columns), count_result
+
+        except Exception as e:
+            logger.error(f"分页搜索数据失败: {e}")
+            return [], CountResult(0, False)
+
+    def search_data_keyset(
+            self, params: AnalysisSearchRequest, columns: list = None
+    ) -> Tuple[List[AmazonOriginSearchData], CountResult, Optional[str]]:
+        """游标分页：按 (排序键, id) 从上一页末行之后取数，返回 (数据, 总数, 下一页游标)
+
+        游标无效或排序字段不支持时抛出 InvalidCursorError
+        """
+        sort_keys = resolve_sort_keys(params.orderBy, params.orderDir)
+        conditions = self._keyset_conditions(params, sort_keys)
+        columns = self._keyset_columns(columns, sort_keys)
+
+        try:
+            base_stmt = self._build_search_query(params)
+            count_result = self._count(base_stmt, params)
+
+            # 多取一行判断是否还有下一页
+            limit = params.perPage + 1
+            results = []
+            for condition in conditions:
+                result_stmt = self._keyset_statement(base_stmt, condition, sort_keys, limit - len(results), columns)
+                results.extend(self._fetch_rows(self.db.execute(result_stmt), columns))
+                if len(results) >= limit:
+                    break
+
+            results, next_cursor = self._keyset_page(results, sort_keys, params.perPage)
+            return results, count_result, next_cursor
+
+        except Exception as e:
+            logger.error(f"游标分页搜索数据失败: {e}")
+            return [], CountResult(0, False), None
+
+    def _count(self, base_stmt, params: AnalysisSearchRequest) -> CountResult:
+        """统计总数：同一筛选条件各页共用缓存的总数，直到下次导入完成
+
+        - 只有类目/日期条件（或无条件）且启用汇总表时，从汇总表精确求和
+        - 其余条件先精确计数到 COUNT_ESTIMATE_THRESHOLD + 1 行，不超过阈值时为精确总数
+        - 超过阈值的宽泛条件返回规划器估算值（不小于已数到的行数）
+        """
+        signature = count_signature(params)
+        version = count_cache.version_tag()
+        cached = count_cache.get(signature, version)
+        if cached is not None:
+            return CountResult(**cached)
+
+        if summary_covers(params):
+            result = CountResult(int(self.db.execute(self._summary_count_statement(params)).scalar()), True)
+        else:
+            probe = self.db.execute(self._build_count_stmt(base_stmt)).scalar() or 0
+            result = self._exact_probe_count(probe)
+            if result is None:
+                result = CountResult(max(explain_row_estimate(self.db, base_stmt), probe), False)
+
+        count_cache.set(signature, result._asdict(), version)
+        return result
+
+    def get_categories(self) -> List[dict]:
+        """获取类目列表"""
+        try:
+            return self._format_categories(self.db.execute(self._categories_statement()).fetchall())
+        except Exception as e:
+            logger.error(f"获取类目列表失败: {e}")
+            return []
+
+    def refresh_category_stats(self) -> None:
+        """导入完成后刷新类目统计物化视图（CONCURRENTLY：刷新期间下拉框查询不阻塞）"""
+        self.db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY analysis.category_stats"))
+        self.db.commit()
+
+
+class AsyncAnalysisCRUD(AnalysisQueryBuilder):
+    """分析数据CRUD操作类（AsyncSession / asyncpg），查询期间不阻塞事件循环；语句与 AnalysisCRUD 相同"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def search(
+            self, params: AnalysisSearchRequest, columns: list = None
+    ) -> Tuple[list, CountResult, Optional[str]]:
+        """按请求的分页方式搜索，返回 (数据, 总数, 下一页游标)"""
+        if self._uses_keyset(params):
+            return await self.search_data_keyset(params, columns)
+        results, count_result = await self.search_data_paginated(params, columns)
+        return results, count_result, None
+
+    async def search_data_paginated(
+            self, params: AnalysisSearchRequest, columns: list = None
+    ) -> Tuple[List[AmazonOriginSearchData], CountResult]:
+        """分页搜索数据（指定 columns 时返回 Row 元组而非 ORM 对象）"""
+        try:
+            base_stmt = self._build_search_query(params)
+            count_result = await self._count(base_stmt, params)
+            result = await self.db.execute(self._paginated_statement(base_stmt, params, columns))
+            return self._fetch_rows(result, columns), count_result
+
+        except Exception as e:
+            logger.error(f"分页搜索数据失败: {e}")
+            return [], CountResult(0, False)
+
+    async def search_data_keyset(
+            self, params: AnalysisSearchRequest, columns: list = None
+    ) -> Tuple[List[AmazonOriginSearchData], CountResult, Optional[str]]:
+        """游标分页搜索，游标无效或排序字段不支持时抛出 InvalidCursorError"""
+        sort_keys = resolve_sort_keys(params.orderBy, params.orderDir)
+        conditions = self._keyset_conditions(params, sort_keys)
+        columns = self._keyset_columns(columns, sort_keys)
+
+        try:
+            base_stmt = self._build_search_query(params)
+            count_result = await self._count(base_stmt, params)
+
+            limit = params.perPage + 1
+            results = []
+            for condition in conditions:
+                result_stmt = self._keyset_statement(base_stmt, condition, sort_keys, limit - len(results), columns)
+                results.extend(self._fetch_rows(await self.db.execute(result_stmt), columns))
+                if len(results) >= limit:
+                    break
+
+            results, next_cursor = self._keyset_page(results, sort_keys, params.perPage)
+            return results, count_result, next_cursor
+
+        except Exception as e:
+            logger.error(f"游标分页搜索数据失败: {e}")
+            return [], CountResult(0, False), None
+
+    async def _count(self, base_stmt, params: AnalysisSearchRequest) -> CountResult:
+        """统计总数（规则同 AnalysisCRUD._count）；计数缓存配置 Redis 时在线程中访问，不阻塞事件循环"""
+        signature = count_signature(params)
+        version = await count_cache.aversion_tag()
+        cached = await count_cache.aget(signature, version)
+        if cached is not None:
+            return CountResult(**cached)
+
+        if summary_covers(params):
+            result = CountResult(int((await self.db.execute(self._summary_count_statement(params))).scalar()), True)
+        else:
+            probe = (await self.db.execute(self._build_count_stmt(base_stmt))).scalar() or 0
+            result = self._exact_probe_count(probe)
+            if result is None:
+                result = CountResult(max(await self.db.run_sync(explain_row_estimate, base_stmt), probe), False)
+
+        await count_cache.aset(signature, result._asdict(), version)
+        return result
+
+    async def get_categories(self) -> List[dict]:
+        """获取类目列表"""
+        try:
+            return self._format_categories((await self.db.execute(self._categories_statement())).fetchall())
+        except Exception as e:
+            logger.error(f"获取类目列表失败: {e}")
+            return []
@@ -0,0 +1,120 @@
+# app/table/analysis/analysis_cursor.py - 游标（keyset）分页：按 (排序键, id) 定位下一页，深分页不再随 OFFSET 线性变慢
+import base64
+import binascii
+import json
+from datetime import date
+from decimal import Decimal
+from typing import List, Tuple, Any
+
+from sqlalchemy import and_, tuple_
+
+from app.table.analysis.analysis_model import AmazonOriginSearchData
+
+# 支持游标分页的排序字段（与表格 sortable 列一致）
+SORTABLE_COLUMNS = {
+    'current_rangking_day': AmazonOriginSearchData.current_rangking_day,
+    'ranking_change_day': AmazonOriginSearchData.ranking_change_day,
+    'current_rangking_week': AmazonOriginSearchData.current_rangking_week,
+    'ranking_change_week': AmazonOriginSearchData.ranking_change_week,
+    'top_product_click_share': AmazonOriginSearchData.top_product_click_share,
+    'top_product_conversion_share': AmazonOriginSearchData.top_product_conversion_share,
+    'report_date_day': AmazonOriginSearchData.report_date_day,
+    'report_date_week': AmazonOriginSearchData.report_date_week,
+}
+
+# 未指定排序字段时的默认排序（与 offset 模式一致）
+DEFAULT_SORT = [('report_date_day', 'desc'), ('current_rangking_day', 'asc')]
+
+SortKeys = List[Tuple[str, str]]
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析或与当前排序不匹配"""
+
+
+def _column(name: str):
+    return AmazonOriginSearchData.id if name == 'id' else SORTABLE_COLUMNS[name]
+
+
+def resolve_sort_keys(order_by: str = None, order_dir: str = None) -> SortKeys:
+    """排序键列表，末尾追加 id 保证顺序唯一"""
+    if not order_by:
+        return DEFAULT_SORT + [('id', 'asc')]
+    if order_by not in SORTABLE_COLUMNS:
+        raise InvalidCursorError(f"排序字段不支持游标分页: {order_by}")
+    direction = 'desc' if order_dir == 'desc' else 'asc'
+    return [(order_by, direction), ('id', direction)]
+
+
+def sort_columns(sort_keys: SortKeys) -> list:
+    return [_column(name) for name, _ in sort_keys]
+
+
+def order_clauses(sort_keys: SortKeys) -> list:
+    return [_column(name).desc() if direction == 'desc' else _column(name).asc() for name, direction in sort_keys]
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(name: str, value: Any) -> Any:
+    python_type = _column(name).type.python_type
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort_keys: SortKeys, row: AmazonOriginSearchData) -> str:
+    """由本页最后一行生成下一页游标（base64url JSON，包含排序方式和排序键值）"""
+    payload = {
+        's': [f'{name}:{direction}' for name, direction in sort_keys],
+        'v': [_dump_value(getattr(row, name)) for name, _ in sort_keys],
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str, sort_keys: SortKeys) -> list:
+    """解析游标，返回排序键值；排序方式与请求不一致时报错（排序变化后需从第一页重新开始）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload['s'] != [f'{name}:{direction}' for name, direction in sort_keys]:
+            raise InvalidCursorError("分页游标与当前排序不匹配")
+        return [_load_value(name, value) for (name, _), value in zip(sort_keys, payload['v'], strict=True)]
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError(f"无效的分页游标: {e}") from e
+
+
+def keyset_ranges(sort_keys: SortKeys, values: list) -> list:
+    """位于游标之后的行，按排序先后拆成互不重叠的若干区间条件
+
+    同方向的连续排序键用行值比较 (col, id) > (v, id)，可直接作为索引扫描边界；
+    默认排序方向混合（日期降序、排名升序）时拆为：同日期内排名在游标之后的行、更早日期的行，
+    各区间都能按索引顺序读取，依次查询直到取满一页
+    """
+    groups = []
+    for (name, direction), value in zip(sort_keys, values):
+        if groups and groups[-1][0] == direction:
+            groups[-1][1].append(_column(name))
+            groups[-1][2].append(value)
+        else:
+            groups.append((direction, [_column(name)], [value]))
+
+    ranges = []
+    for i in reversed(range(len(groups))):
+        direction, columns, group_values = groups[i]
+        if direction == 'desc':
+            after = tuple_(*columns) < tuple_(*group_values)
+        else:
+            after = tuple_(*columns) > tuple_(*group_values)
+        prefix = [column == value for _, cols, vals in groups[:i] for column, value in zip(cols, vals)]
+        ranges.append(and_(*prefix, after) if prefix else after)
+    return ranges
@@ -0,0 +1,191 @@
+# app/table/analysis/analysis_export.py - 流式导出：服务端游标分批读取，逐批写出 CSV（可选 gzip）/ Parquet / Arrow，内存占用与导出行数无关
+import csv
+import io
+import json
+import logging
+import zlib
+from typing import AsyncIterator, Optional, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import BigInteger, Boolean, Date, DateTime, Float, Integer, Numeric, String, Text, cast
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+
+from config import settings
+from app.table.analysis.analysis_crud import AnalysisQueryBuilder
+from app.table.analysis.analysis_model import AmazonOriginSearchData
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+logger = logging.getLogger(__name__)
+
+# CSV 导出列：(表头, 字段)
+EXPORT_COLUMNS = [
+    ('关键词', AmazonOriginSearchData.keyword),
+    ('报告日期', AmazonOriginSearchData.report_date_day),
+]
+
+EXPORT_FORMATS = ('csv', 'parquet', 'arrow')
+EXPORT_MEDIA_TYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+def columnar_columns() -> list:
+    """Parquet/Arrow 导出的表字段：全部列，跳过当前配置下未迁移或未使用的列"""
+    skipped = set()
+    if settings.RANKING_TREND_ENGINE == 'array':
+        skipped.add('ranking_trend_day')
+    else:
+        skipped.update(('trend_dates', 'trend_ranks'))
+    if not settings.BRANDED_KEYWORD_FLAG:
+        skipped.add('is_branded_keyword')
+    return [column for column in AmazonOriginSearchData.__table__.columns if column.name not in skipped]
+
+
+def arrow_type(sql_type) -> pa.DataType:
+    """SQLAlchemy 列类型 -> Arrow 类型（Numeric 在查询中转为 float8，jsonb 以 JSON 文本导出）"""
+    if isinstance(sql_type, ARRAY):
+        return pa.list_(arrow_type(sql_type.item_type))
+    if isinstance(sql_type, JSONB):
+        return pa.string()
+    if isinstance(sql_type, BigInteger):
+        return pa.int64()
+    if isinstance(sql_type, Integer):
+        return pa.int32()
+    if isinstance(sql_type, (Numeric, Float)):
+        return pa.float64()
+    if isinstance(sql_type, Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    if isinstance(sql_type, (String, Text)):
+        return pa.string()
+    raise TypeError(f"不支持导出的列类型: {sql_type!r}")
+
+
+class _StreamSink:
+    """pyarrow 写入目标：累积写出的字节供逐批取走，tell() 返回累计偏移（Parquet 页脚记录的偏移依赖它）"""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class AnalysisExporter(AnalysisQueryBuilder):
+    """按搜索条件流式导出
+
+    - 与搜索使用同一套筛选条件和排序
+    - AsyncSession.stream + yield_per：asyncpg 服务端游标，每次只取 batch_size 行
+    - CSV：关键词和报告日期，UTF-8 BOM（Excel 直接打开不乱码），compress=True 时输出 gzip 流
+    - Parquet / Arrow：全部字段，每批行直接转为 RecordBatch，Parquet 每批一个 row group，Arrow 为 IPC 流格式
+    - 会话由导出生成器自己打开和关闭，响应发送完之前一直可用
+    """
+
+    def __init__(self, session_factory=None, batch_size: int = None, max_rows: int = None):
+        if session_factory is None:
+            from database import AsyncSessionFactory
+            session_factory = AsyncSessionFactory
+        self.session_factory = session_factory
+        self.batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+        self.max_rows = settings.EXPORT_MAX_ROWS if max_rows is None else max_rows
+
+    def stream(self, params: AnalysisSearchRequest, file_format: str = 'csv', compress: bool = False) -> AsyncIterator[bytes]:
+        if file_format == 'csv':
+            return self.iter_csv(params, compress=compress)
+        if file_format in ('parquet', 'arrow'):
+            return self.iter_columnar(params, file_format)
+        raise ValueError(f"不支持的导出格式: {file_format}")
+
+    def export_statement(self, params: AnalysisSearchRequest, columns: list = None):
+        columns = columns if columns is not None else [column for _, column in EXPORT_COLUMNS]
+        stmt = self._build_search_query(params).with_only_columns(*columns)
+        stmt = self._ordered_statement(stmt, params)
+        if self.max_rows:
+            stmt = stmt.limit(self.max_rows)
+        return stmt.execution_options(yield_per=self.batch_size)
+
+    async def _iter_row_batches(self, stmt) -> AsyncIterator[list]:
+        exported = 0
+        async with self.session_factory() as db:
+            result = await db.stream(stmt)
+            async for rows in result.partitions():
+                exported += len(rows)
+                yield rows
+        logger.info(f"导出完成: {exported} 条")
+
+    async def iter_csv(self, params: AnalysisSearchRequest, compress: bool = False) -> AsyncIterator[bytes]:
+        encoder: Optional[zlib.compressobj] = zlib.compressobj(wbits=31) if compress else None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def drain() -> bytes:
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            return encoder.compress(data) if encoder else data
+
+        buffer.write('\ufeff')
+        writer.writerow([header for header, _ in EXPORT_COLUMNS])
+        yield drain()
+
+        async for rows in self._iter_row_batches(self.export_statement(params)):
+            writer.writerows(rows)
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+        if encoder:
+            yield encoder.flush()
+
+    async def iter_columnar(self, params: AnalysisSearchRequest, file_format: str) -> AsyncIterator[bytes]:
+        columns = columnar_columns()
+        schema = pa.schema([pa.field(column.name, arrow_type(column.type), nullable=column.nullable)
+                            for column in columns])
+        json_columns = {i for i, column in enumerate(columns) if isinstance(column.type, JSONB)}
+        # Numeric 在数据库端转为 float8，避免逐个转换 Decimal
+        select_columns = [cast(column, Float).label(column.name) if isinstance(column.type, Numeric) else column
+                          for column in columns]
+
+        sink = _StreamSink()
+        if file_format == 'parquet':
+            writer = pq.ParquetWriter(sink, schema, compression='zstd')
+        else:
+            writer = pa.ipc.new_stream(sink, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+        try:
+            async for rows in self._iter_row_batches(self.export_statement(params, select_columns)):
+                arrays = []
+                for i, values in enumerate(zip(*rows)):
+                    if i in json_columns:
+                        values = [json.dumps(value, ensure_ascii=False) for value in values]
+                    arrays.append(pa.array(values, type=schema.field(i).type))
+                writer.write_batch(pa.record_batch(arrays, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
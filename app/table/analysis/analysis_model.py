@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy import BigInteger, Integer, String, Date, Boolean, Text, DateTime, Numeric, func, Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from datetime import datetime, date
 from typing import Optional
 import enum
@@ -16,6 +16,7 @@ class StatusEnum(enum.Enum):
 
 class AmazonOriginSearchData(Base):
     __tablename__ = "amazon_origin_search_data"
+    # 按 keyword HASH 分区只在数据库中完成（可选迁移 docs/migrations/002_partition_by_keyword.sql），ORM 映射不变
     __table_args__ = {"schema": "analysis"}
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
@@ -27,6 +28,9 @@ class AmazonOriginSearchData(Base):
     previous_rangking_day: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     ranking_change_day: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     ranking_trend_day: Mapped[dict] = mapped_column(JSONB, nullable=False, default=lambda: [])
+    # 趋势数组引擎（RANKING_TREND_ENGINE=array），新日期在前；延迟加载，未迁移的库不受影响
+    trend_dates: Mapped[list] = mapped_column(ARRAY(Date), nullable=False, server_default='{}', deferred=True)
+    trend_ranks: Mapped[list] = mapped_column(ARRAY(Integer), nullable=False, server_default='{}', deferred=True)
 
     # 周排名字段
     current_rangking_week: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -59,6 +63,8 @@ class AmazonOriginSearchData(Base):
     product_conversion_share_3rd: Mapped[float] = mapped_column(Numeric(10, 2), nullable=False, default=0)
 
     # 状态标识
+    # 关键词中是否包含 Top1 品牌词（导入时计算，BRANDED_KEYWORD_FLAG=true 时默认过滤使用）；延迟加载，未迁移的库不受影响
+    is_branded_keyword: Mapped[bool] = mapped_column(Boolean, nullable=False, server_default='false', deferred=True)
     is_new_day: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     is_new_week: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
 
@@ -0,0 +1,115 @@
+# app/table/analysis/analysis_serializer.py - 搜索结果精简序列化：只查询列表所需的列（元组），按列格式化后直接编码为 JSON 字节，不逐行构造 Pydantic 模型
+import json
+from typing import Callable, Dict, List, Optional, Sequence
+
+from config import settings
+from app.table.analysis.analysis_model import AmazonOriginSearchData
+from app.table.search.search_schemas import AnalysisDataItem
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时退回标准库 json
+    orjson = None
+
+# 输出字段及顺序与 AnalysisDataItem 一致，前端无感知
+ITEM_FIELDS = list(AnalysisDataItem.model_fields)
+
+
+def resolve_fields(fields: Optional[str], include_trend: bool = True) -> List[str]:
+    """fields 参数（逗号分隔）-> 输出字段（按 AnalysisDataItem 顺序，始终包含 id）；为空时返回全部字段
+
+    include_trend=False 时去掉趋势字段（趋势由 /trends 按页批量获取）；包含不存在的字段时抛出 ValueError
+    """
+    if not fields or not fields.strip():
+        requested = set(ITEM_FIELDS)
+    else:
+        requested = {name.strip() for name in fields.split(',') if name.strip()}
+        unknown = requested - set(ITEM_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}")
+        requested.add('id')
+    if not include_trend:
+        requested.discard('ranking_trend_day')
+    return [name for name in ITEM_FIELDS if name in requested]
+
+
+def _source_columns(field: str) -> list:
+    """输出字段依赖的表字段：转化率由两个份额计算，趋势字段按趋势引擎选择"""
+    model = AmazonOriginSearchData
+    if field == 'ranking_trend_day':
+        if settings.RANKING_TREND_ENGINE == 'array':
+            return [model.trend_dates, model.trend_ranks]
+        return [model.ranking_trend_day]
+    if field == 'conversion_rate':
+        return [model.top_product_click_share, model.top_product_conversion_share]
+    return [getattr(model, field)]
+
+
+def listing_columns(fields: List[str] = None) -> list:
+    """列表查询的字段：只查询输出字段需要的列（默认为 AnalysisDataItem 的全部字段）"""
+    columns, selected = [], set()
+    for field in fields or ITEM_FIELDS:
+        for column in _source_columns(field):
+            if column.key not in selected:
+                selected.add(column.key)
+                columns.append(column)
+    return columns
+
+
+def format_ranking_trend(ranking_trend_day, trend_dates, trend_ranks) -> List[dict]:
+    """趋势图数据 - 数组引擎转换为与 jsonb 相同的 [{"date", "ranking"}]（日期倒序）"""
+    if settings.RANKING_TREND_ENGINE == 'array':
+        pairs = sorted(zip(trend_dates or [], trend_ranks or []), reverse=True)
+        return [{"date": day.isoformat(), "ranking": ranking} for day, ranking in pairs]
+    return ranking_trend_day or []
+
+
+def _isoformat(values: Sequence) -> list:
+    return [value.isoformat() if value else None for value in values]
+
+
+def _conversion_rates(columns: dict) -> list:
+    # 与逐行格式化相同：Decimal 运算后保留两位小数（避免除零）
+    return [
+        float(round((conversion / click) * 100, 2)) if click and click > 0 else 0.0
+        for conversion, click in zip(columns['top_product_conversion_share'], columns['top_product_click_share'])
+    ]
+
+
+def _ranking_trends(columns: dict) -> list:
+    if settings.RANKING_TREND_ENGINE == 'array':
+        return [format_ranking_trend(None, dates, ranks)
+                for dates, ranks in zip(columns['trend_dates'], columns['trend_ranks'])]
+    return [trend or [] for trend in columns['ranking_trend_day']]
+
+
+# 需要转换的输出字段（按列处理），其余字段直接取查询结果
+_COLUMN_FORMATTERS: Dict[str, Callable[[dict], list]] = {
+    'ranking_trend_day': _ranking_trends,
+    'top_product_click_share': lambda columns: [float(value) for value in columns['top_product_click_share']],
+    'top_product_conversion_share': lambda columns: [float(value) for value in columns['top_product_conversion_share']],
+    'conversion_rate': _conversion_rates,
+    'report_date_day': lambda columns: _isoformat(columns['report_date_day']),
+    'report_date_week': lambda columns: _isoformat(columns['report_date_week']),
+    'created_at': lambda columns: _isoformat(columns['created_at']),
+}
+
+
+def serialize_rows(rows: Sequence, fields: List[str] = None) -> List[dict]:
+    """listing_columns(fields) 查询结果 -> 字典列表（全部字段时与 AnalysisDataItem.model_dump() 相同）
+
+    先按列转换（Decimal -> float、日期 -> ISO 字符串、转化率），再按行组装；查询结果中多出的列（如游标排序键）不输出
+    """
+    if not rows:
+        return []
+    fields = fields or ITEM_FIELDS
+    columns = dict(zip(rows[0]._fields, zip(*rows)))
+    values = [_COLUMN_FORMATTERS[name](columns) if name in _COLUMN_FORMATTERS else columns[name] for name in fields]
+    return [dict(zip(fields, item)) for item in zip(*values)]
+
+
+def dumps(payload) -> bytes:
+    """编码响应体（UTF-8 JSON 字节）"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
@@ -1,9 +1,14 @@
 import logging
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Sequence
 
-from app.table.analysis.analysis_crud import AnalysisCRUD
+from config import settings
+
+from app.table.analysis.analysis_cache import search_result_cache
+from app.table.analysis.analysis_count import CountResult
+from app.table.analysis.analysis_crud import AsyncAnalysisCRUD
 from app.table.analysis.analysis_model import AmazonOriginSearchData
+from app.table.analysis.analysis_serializer import listing_columns, resolve_fields, serialize_rows, format_ranking_trend
 from app.table.search.search_schemas import (
     AnalysisSearchRequest,
     AnalysisSearchResponse,
@@ -14,52 +19,67 @@ from app.table.search.search_schemas import (
 logger = logging.getLogger(__name__)
 
 
-class AnalysisService:
-    """分析数据业务逻辑服务"""
-
-    def __init__(self, db: Session):
-        self.db = db
-        self.crud = AnalysisCRUD(db)
-
-    def search_data(self, params: AnalysisSearchRequest) -> AnalysisSearchResponse:
-        """搜索分析数据"""
-        try:
-            # 调用CRUD层获取数据
-            items, total_count = self.crud.search_data_paginated(params)
-
-            # 格式化数据
-            formatted_items = [self._format_data_item(item) for item in items]
-
-            # 构建分页数据
-            pagination_data = PaginationData(
-                items=formatted_items,
-                count=total_count,
-                page=params.page,
-                perPage=params.perPage
-            )
-
-            return AnalysisSearchResponse(
-                status=0,
-                msg="查询成功",
-                data=pagination_data.model_dump()
-            )
-
-        except Exception as e:
-            logger.error(f"搜索数据服务失败: {e}")
-            return AnalysisSearchResponse(
-                status=1,
-                msg=f"查询失败: {str(e)}",
-                data={
-                    "items": [],
-                    "count": 0,
-                    "page": params.page,
-                    "perPage": params.perPage
-                }
-            )
-
-    def get_categories(self) -> List[dict]:
-        """获取类目选项"""
-        return self.crud.get_categories()
+class AnalysisResponseBuilder:
+    """搜索响应的格式化（不访问数据库和缓存）"""
+
+    @staticmethod
+    def _cacheable(payload: dict) -> bool:
+        """CRUD 层查询异常时也返回空结果，空结果不缓存"""
+        return bool(payload['data']['items'])
+
+    def _build_payload(
+            self, params: AnalysisSearchRequest, rows: Sequence,
+            count_result: CountResult, next_cursor: Optional[str], fields: List[str] = None
+    ) -> dict:
+        """行元组按列格式化并构建响应字典（结构与 _build_response 的 model_dump() 相同）"""
+        items = serialize_rows(rows, fields)
+        payload = {
+            "status": 0,
+            "msg": "查询成功",
+            "data": {
+                "items": items,
+                "count": count_result.total,
+                "countExact": count_result.exact,
+                "page": params.page,
+                "perPage": params.perPage,
+                "nextCursor": next_cursor,
+            },
+        }
+        return payload
+
+    def _build_response(
+            self, params: AnalysisSearchRequest, items: List[AmazonOriginSearchData],
+            count_result: CountResult, next_cursor: Optional[str]
+    ) -> AnalysisSearchResponse:
+        """格式化数据、构建分页响应"""
+        formatted_items = [self._format_data_item(item) for item in items]
+
+        pagination_data = PaginationData(
+            items=formatted_items,
+            count=count_result.total,
+            countExact=count_result.exact,
+            page=params.page,
+            perPage=params.perPage,
+            nextCursor=next_cursor
+        )
+
+        return AnalysisSearchResponse(
+            status=0,
+            msg="查询成功",
+            data=pagination_data.model_dump()
+        )
+
+    def _error_response(self, params: AnalysisSearchRequest, error: Exception) -> AnalysisSearchResponse:
+        return AnalysisSearchResponse(
+            status=1,
+            msg=f"查询失败: {str(error)}",
+            data={
+                "items": [],
+                "count": 0,
+                "page": params.page,
+                "perPage": params.perPage
+            }
+        )
 
     def _format_data_item(self, item: AmazonOriginSearchData) -> AnalysisDataItem:
         """格式化单个数据项"""
@@ -84,7 +104,7 @@ class AnalysisService:
                 ranking_change_week=item.ranking_change_week,
 
                 # 趋势图数据
-                ranking_trend_day=item.ranking_trend_day or [],
+                ranking_trend_day=self._format_ranking_trend(item),
 
                 # 商品信息
                 top_brand=item.top_brand,
@@ -130,3 +150,66 @@ class AnalysisService:
                 is_new_week=False
             )
 
+    def _format_ranking_trend(self, item: AmazonOriginSearchData) -> List[dict]:
+        """趋势图数据 - 数组引擎转换为与 jsonb 相同的 [{"date", "ranking"}]（日期倒序）"""
+        if settings.RANKING_TREND_ENGINE == 'array':
+            return format_ranking_trend(None, item.trend_dates, item.trend_ranks)
+        return format_ranking_trend(item.ranking_trend_day, None, None)
+
+
+class AsyncAnalysisService(AnalysisResponseBuilder):
+    """分析数据业务逻辑服务（异步会话，搜索接口均为异步路由）
+
+    结果缓存通过 aget / aset 访问：配置 Redis 时在线程中执行，不在事件循环上等待 Redis
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.crud = AsyncAnalysisCRUD(db)
+
+    async def search_data(self, params: AnalysisSearchRequest) -> AnalysisSearchResponse:
+        """搜索分析数据（相同条件在数据版本未变化时直接返回缓存结果）"""
+        cache_key = search_result_cache.make_key(params)
+        # 查询前读取数据版本，查询期间导入完成时结果存在旧版本下
+        version = await search_result_cache.aversion_tag()
+        cached = await search_result_cache.aget(cache_key, version)
+        if cached is not None:
+            return AnalysisSearchResponse(**cached)
+
+        try:
+            response = self._build_response(params, *await self.crud.search(params))
+        except Exception as e:
+            logger.error(f"搜索数据服务失败: {e}")
+            return self._error_response(params, e)
+
+        payload = response.model_dump()
+        if self._cacheable(payload):
+            await search_result_cache.aset(cache_key, payload, version)
+        return response
+
+    async def search_payload(self, params: AnalysisSearchRequest) -> dict:
+        """搜索分析数据，返回响应字典（与 search_data().model_dump() 相同）
+
+        精简路径：只查询 params.fields 需要的列，按列格式化，不逐行构造 AnalysisDataItem；与 search_data 共用结果缓存
+        """
+        cache_key = search_result_cache.make_key(params)
+        # 查询前读取数据版本，查询期间导入完成时结果存在旧版本下
+        version = await search_result_cache.aversion_tag()
+        cached = await search_result_cache.aget(cache_key, version)
+        if cached is not None:
+            return cached
+
+        try:
+            fields = resolve_fields(params.fields, params.include_trend)
+            payload = self._build_payload(params, *await self.crud.search(params, listing_columns(fields)), fields)
+        except Exception as e:
+            logger.error(f"搜索数据服务失败: {e}")
+            return self._error_response(params, e).model_dump()
+
+        if self._cacheable(payload):
+            await search_result_cache.aset(cache_key, payload, version)
+        return payload
+
+    async def get_categories(self) -> List[dict]:
+        """获取类目选项"""
+        return await self.crud.get_categories()
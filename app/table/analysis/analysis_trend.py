@@ -0,0 +1,160 @@
+# app/table/analysis/analysis_trend.py - 排名历史：按月分区的 keyword_rank_history 窄表（导入时追加），趋势查询按时间窗口服务端降采样；
+# 表格趋势图按页批量获取主表的近期趋势（列式返回）
+import logging
+from datetime import date, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import Table, MetaData, Column, BigInteger, CHAR, Date, Integer, select, func, literal, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.table.analysis.analysis_model import AmazonOriginSearchData
+from app.table.analysis.analysis_serializer import listing_columns, serialize_rows
+
+logger = logging.getLogger(__name__)
+
+# 时间窗口（天） -> 每个点合并的天数：各窗口都在 30~52 个点左右
+TREND_WINDOWS = {30: 1, 90: 3, 365: 7}
+# 接口参数 -> period 列取值
+TREND_PERIODS = {'day': 'd', 'week': 'w'}
+# 批量趋势单次最多的关键词数（表格每页最多 1000 行）
+TREND_BATCH_MAX = 1000
+
+# docs/migrations/009_keyword_rank_history.sql
+keyword_rank_history = Table(
+    'keyword_rank_history', MetaData(),
+    Column('keyword_id', BigInteger, primary_key=True),
+    Column('period', CHAR(1), primary_key=True),
+    Column('rank_date', Date, primary_key=True),
+    Column('rank', Integer, nullable=False),
+    schema='analysis',
+)
+
+
+def ensure_rank_history_partition(db: Session, day: date) -> None:
+    """创建 day 所在月份的分区（已存在时不做任何事），导入开始时调用"""
+    db.execute(text("SELECT analysis.ensure_rank_history_partition(:day)"), {'day': day})
+    db.commit()
+
+
+class TrendQuery:
+    """单个关键词的排名历史查询
+
+    - 窗口结束日期默认取该关键词最近一条历史的日期（导入滞后时窗口不为空）
+    - 按 TREND_WINDOWS 把窗口切成若干桶，每桶取平均排名（四舍五入）和桶内最后日期；周排名每桶至少 7 天
+    - 返回列式结构：dates / ranks 两个等长数组
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def bucket_days(window: int, period: str) -> int:
+        if window not in TREND_WINDOWS:
+            raise ValueError(f"不支持的时间窗口: {window}（可选 {', '.join(map(str, TREND_WINDOWS))}）")
+        if period not in TREND_PERIODS:
+            raise ValueError(f"不支持的排名类型: {period}（可选 day / week）")
+        days = TREND_WINDOWS[window]
+        return max(days, 7) if period == 'week' else days
+
+    def _keyword_id_statement(self, keyword: str):
+        return select(AmazonOriginSearchData.id).where(AmazonOriginSearchData.keyword == keyword)
+
+    def _end_date_statement(self, keyword_id: int, period_code: str):
+        history = keyword_rank_history.c
+        return select(func.max(history.rank_date)).where(
+            history.keyword_id == keyword_id, history.period == period_code
+        )
+
+    def _series_statement(self, keyword_id: int, period_code: str, start: date, end: date, bucket_days: int):
+        history = keyword_rank_history.c
+        # 桶按窗口结束日期对齐：最后一个桶总是以 end 结束
+        bucket = ((literal(end, Date) - history.rank_date) // bucket_days).label('bucket')
+        return (
+            select(func.max(history.rank_date).label('rank_date'),
+                   func.round(func.avg(history.rank)).cast(Integer).label('rank'))
+            .where(history.keyword_id == keyword_id, history.period == period_code,
+                   history.rank_date > start, history.rank_date <= end)
+            .group_by(bucket)
+            .order_by(func.max(history.rank_date))
+        )
+
+    async def fetch(
+            self, keyword_id: Optional[int] = None, keyword: Optional[str] = None,
+            window: int = 30, period: str = 'day', end_date: Optional[date] = None
+    ) -> dict:
+        """keyword_id 与 keyword 二选一；参数不合法时抛出 ValueError"""
+        bucket_days = self.bucket_days(window, period)
+        period_code = TREND_PERIODS[period]
+
+        if keyword_id is None:
+            if not keyword:
+                raise ValueError("需要 keyword_id 或 keyword")
+            keyword_id = (await self.db.execute(self._keyword_id_statement(keyword))).scalar()
+
+        series = {'dates': [], 'ranks': []}
+        if keyword_id is not None:
+            end = end_date or (await self.db.execute(self._end_date_statement(keyword_id, period_code))).scalar()
+            if end is not None:
+                start = end - timedelta(days=window)
+                rows = (await self.db.execute(
+                    self._series_statement(keyword_id, period_code, start, end, bucket_days)
+                )).all()
+                series = {'dates': [row.rank_date.isoformat() for row in rows], 'ranks': [row.rank for row in rows]}
+
+        return {'keywordId': keyword_id, 'period': period, 'window': window, 'bucketDays': bucket_days, **series}
+
+
+class PageTrendQuery:
+    """表格当前页的趋势图数据（主表 ranking_trend_day / trend_dates + trend_ranks），一次查询返回整页
+
+    列式结构：dates 只返回一次（各行日期的并集，与 ranking_trend_day 相同按日期倒序），
+    ranks 为与 ids 对齐的整数数组，某行缺少的日期为 null；不存在的 id 不返回
+    """
+
+    FIELDS = ['id', 'keyword', 'ranking_trend_day']
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _statement(self, ids: Sequence[int], keywords: Sequence[str]):
+        stmt = select(*listing_columns(self.FIELDS))
+        if ids:
+            return stmt.where(AmazonOriginSearchData.id.in_(ids))
+        return stmt.where(AmazonOriginSearchData.keyword.in_(keywords))
+
+    @staticmethod
+    def pivot(items: List[dict], order: Sequence, key: str) -> dict:
+        """[{id, keyword, ranking_trend_day}] -> {dates, ids, ranks}，按请求顺序排列"""
+        dates = sorted({point['date'] for item in items for point in item['ranking_trend_day']}, reverse=True)
+        position = {day: index for index, day in enumerate(dates)}
+        by_key = {item[key]: item for item in items}
+        ids, ranks = [], []
+        for value in order:
+            item = by_key.get(value)
+            if item is None:
+                continue
+            series = [None] * len(dates)
+            for point in item['ranking_trend_day']:
+                series[position[point['date']]] = point['ranking']
+            ids.append(item['id'])
+            ranks.append(series)
+        return {'dates': dates, 'ids': ids, 'ranks': ranks}
+
+    async def fetch(self, ids: Sequence[int] = (), keywords: Sequence[str] = ()) -> dict:
+        """ids 与 keywords 二选一（按关键词查询时额外返回对齐的 keywords）；参数不合法时抛出 ValueError"""
+        ids = list(dict.fromkeys(ids))
+        keywords = list(dict.fromkeys(keyword.strip() for keyword in keywords if keyword and keyword.strip()))
+        if not ids and not keywords:
+            raise ValueError("需要 ids 或 keywords")
+        if len(ids or keywords) > TREND_BATCH_MAX:
+            raise ValueError(f"单次最多 {TREND_BATCH_MAX} 个关键词")
+
+        rows = (await self.db.execute(self._statement(ids, keywords))).all()
+        items = serialize_rows(rows, self.FIELDS)
+        if ids:
+            return self.pivot(items, ids, 'id')
+        data = self.pivot(items, keywords, 'keyword')
+        keyword_by_id = {item['id']: item['keyword'] for item in items}
+        data['keywords'] = [keyword_by_id[item_id] for item_id in data['ids']]
+        return data
@@ -1,9 +1,34 @@
+# 搜索结果返回后按当前页 id 一次请求 /trends，把列式趋势（dates + ranks）还原为趋势图使用的 ranking_trend_day
+# 趋势请求失败时表格照常显示（趋势图为空）
+TREND_ADAPTOR = """
+var items = payload.status === 0 && payload.data && payload.data.items;
+if (!items || !items.length) { return payload; }
+var token = localStorage.getItem('access_token');
+return fetch('/api/analysis/trends', {
+    method: 'POST',
+    headers: {'Content-Type': 'application/json', 'Authorization': token ? 'Bearer ' + token : ''},
+    body: JSON.stringify({ids: items.map(function (item) { return item.id; })})
+}).then(function (response) { return response.json(); }).then(function (result) {
+    var trends = result.data, ranksById = {};
+    trends.ids.forEach(function (id, index) { ranksById[id] = trends.ranks[index]; });
+    items.forEach(function (item) {
+        var ranks = ranksById[item.id] || [];
+        item.ranking_trend_day = trends.dates
+            .map(function (date, index) { return {date: date, ranking: ranks[index]}; })
+            .filter(function (point) { return point.ranking !== null && point.ranking !== undefined; });
+    });
+    return payload;
+}).catch(function () { return payload; });
+"""
+
+
 class TableComponent:
     """表格功能组件"""
 
     @staticmethod
     def build_data_table() -> dict:
         """构建数据表格 - 修复API参数传递"""
+        columns = TableComponent._get_table_columns()
         return {
             "type": "crud",
             "name": "data_table",
@@ -25,6 +50,10 @@ class TableComponent:
                     "orderBy": "${orderBy}",
                     "orderDir": "${orderDir}",
 
+                    # 只返回表格渲染的字段（后端按字段只查询需要的列）；趋势图由 adaptor 按页批量获取
+                    "fields": ",".join(column["name"] for column in columns),
+                    "include_trend": "false",
+
                     # 基础搜索条件参数
                     "keyword": "${keyword}",
                     "brand": "${brand}",
@@ -32,6 +61,7 @@ class TableComponent:
                     "asin": "${asin}",
                     "product_title": "${product_title}",
                     "report_date": "${report_date}",
+                    "match_mode": "${match_mode}",
 
                     # 高级搜索 - 排名范围参数
                     "daily_ranking_min": "${daily_ranking_min}",
@@ -56,7 +86,8 @@ class TableComponent:
                     # 高级搜索 - 布尔值参数
                     "is_new_day": "${is_new_day}",
                     "is_new_week": "${is_new_week}"
-                }
+                },
+                "adaptor": TREND_ADAPTOR
             },
 
             # 默认参数
@@ -68,7 +99,7 @@ class TableComponent:
             },
 
             # 表格列配置
-            "columns": TableComponent._get_table_columns(),
+            "columns": columns,
 
             # 分页配置
             "perPage": 100,
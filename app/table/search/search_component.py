@@ -1,6 +1,7 @@
 """
 搜索组件
 """
+import config
 
 
 class SearchComponent:
@@ -283,7 +284,30 @@ class SearchComponent:
                         }
                     ]
                 },
+                # 匹配方式只在 trigram 模式下生效（ilike 模式始终为包含匹配），其他模式下不显示
                 {
+                    "type": "flex",
+                    "className": "flex-1 mr-3",
+                    "items": [
+                        {
+                            "type": "tpl",
+                            "tpl": "匹配方式：",
+                            "className": "label-text mr-2"
+                        },
+                        {
+                            "type": "select",
+                            "name": "match_mode",
+                            "placeholder": "包含",
+                            "className": "flex-1",
+                            "clearable": True,
+                            "options": [
+                                {"label": "包含", "value": "contains"},
+                                {"label": "前缀", "value": "prefix"},
+                                {"label": "相似", "value": "similar"}
+                            ]
+                        }
+                    ]
+                } if config.settings.SEARCH_TEXT_MODE == 'trigram' else {
                     "type": "static",
                     "className": "flex-1 mr-3"
                 },
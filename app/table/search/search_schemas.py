@@ -8,6 +8,10 @@ class AnalysisSearchRequest(BaseModel):
     # 分页参数
     page: int = Field(default=1, ge=1, description="页码")
     perPage: int = Field(default=50, ge=1, le=1501, description="每页数量")
+    pagination: Optional[str] = Field(None, description="分页方式: offset（默认）/ cursor")
+    cursor: Optional[str] = Field(None, description="游标分页：上一页返回的 nextCursor，为空时取第一页")
+    fields: Optional[str] = Field(None, description="返回字段（逗号分隔，只查询这些字段需要的列），为空时返回全部字段")
+    include_trend: bool = Field(True, description="是否返回排名趋势（表格改由 /trends 按页批量获取时为 false）")
 
     # 搜索条件
     orderBy: Optional[str] = Field(None, description="排序字段")
@@ -20,6 +24,7 @@ class AnalysisSearchRequest(BaseModel):
     asin: Optional[str] = Field(None, description="ASIN搜索")
     product_title: Optional[str] = Field(None, description="商品标题搜索")
     report_date: Optional[str] = Field(None, description="报告日期筛选")
+    match_mode: Optional[str] = Field(None, description="文本匹配方式: contains/prefix/similar（trigram 模式生效）")
 
     # 高级搜索 - 排名范围
     daily_ranking_min: Optional[int] = Field(None, description="日排名最小值")
@@ -96,5 +101,14 @@ class PaginationData(BaseModel):
     """分页数据模型"""
     items: List[AnalysisDataItem]
     count: int
+    # count 为规划器估算值时为 False（宽泛筛选条件下不做精确统计）
+    countExact: bool = True
     page: int
     perPage: int
+    nextCursor: Optional[str] = None
+
+
+class TrendBatchRequest(BaseModel):
+    """当前页排名趋势批量请求（ids 与 keywords 二选一）"""
+    ids: List[int] = Field(default_factory=list, description="关键词 id（搜索结果中的 id）")
+    keywords: List[str] = Field(default_factory=list, description="关键词（未传 ids 时使用）")
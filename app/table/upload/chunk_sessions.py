@@ -0,0 +1,346 @@
+# app/table/upload/chunk_sessions.py - 分块上传会话存储：会话状态存入 Redis（配置 REDIS_URL 时）或上传目录下的会话文件，
+# 多个 worker 共享、重启后可续传；分块数据写入 CHUNK_UPLOAD_DIR，超时未完成的会话连同临时目录定期清理；
+# 完成后按序号在内核中拼接分块（copy_file_range / sendfile）
+import errno
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PATTERN = re.compile(r'[0-9a-f]{32}')
+SESSION_FILE = 'session.json'
+FINISHED_FILE = 'finished'
+REDIS_PREFIX = 'upload:chunk'
+
+
+def _atomic_write_json(path: Path, value: dict) -> None:
+    """先写临时文件再改名，并发读取不会看到写了一半的内容"""
+    temp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}')
+    temp_path.write_text(json.dumps(value, ensure_ascii=False), encoding='utf-8')
+    os.replace(temp_path, path)
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+
+
+# copy_file_range / sendfile 不支持当前文件系统组合时的错误码（改用下一种方式）
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP}
+
+
+def _copy_in_kernel(src_fd: int, dst_fd: int, size: int, offset: int) -> int:
+    """把 src 整个追加到 dst 的 offset 处，数据不经过用户态；返回已复制的字节数（不支持时可能小于 size）"""
+    copied = 0
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while copied < size:
+                n = os.copy_file_range(src_fd, dst_fd, size - copied, copied, offset + copied)
+                if n == 0:
+                    break
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS or copied:
+                raise
+    # sendfile 从当前写入位置追加
+    os.lseek(dst_fd, offset + copied, os.SEEK_SET)
+    try:
+        while copied < size:
+            n = os.sendfile(dst_fd, src_fd, copied, size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS or copied:
+            raise
+    return copied
+
+
+def merge_parts(part_paths: Sequence[Path], destination: Path, mode: str = 'copy', remove_parts: bool = True) -> int:
+    """按顺序拼接分块到 destination，返回总字节数；分块缺失时抛出 FileNotFoundError
+
+    - copy：copy_file_range（同一文件系统内由内核复制，支持 reflink 的文件系统不复制数据），不可用时退回 sendfile，
+      再退回固定 1MB 缓冲区复制；不把整个分块读入内存
+    - read：原实现，逐个分块整体读入内存后写入
+    remove_parts 时每拼接完一个分块立即删除，磁盘峰值约为文件大小 + 一个分块（原来为两倍文件大小）
+    """
+    total = 0
+    with open(destination, 'wb') as outfile:
+        for part_path in part_paths:
+            with open(part_path, 'rb') as chunk_file:
+                if mode == 'read':
+                    chunk_data = chunk_file.read()
+                    outfile.write(chunk_data)
+                    total += len(chunk_data)
+                else:
+                    size = os.fstat(chunk_file.fileno()).st_size
+                    copied = _copy_in_kernel(chunk_file.fileno(), outfile.fileno(), size, total)
+                    if copied < size:
+                        chunk_file.seek(copied)
+                        outfile.seek(total + copied)
+                        shutil.copyfileobj(chunk_file, outfile, 1024 * 1024)
+                        outfile.flush()
+                    total += size
+                    outfile.seek(total)
+            if remove_parts:
+                os.unlink(part_path)
+    return total
+
+
+class ChunkSessionStore:
+    """分块上传会话（文件存储，未配置 Redis 时使用）
+
+    - 每个会话一个目录 root/<key>/：session.json 为会话信息，part_NNNN.chunk 为分块数据，
+      part_NNNN.json 记录分块大小和 MD5；同一台机器上的多个 worker 共享该目录
+    - 分块先写临时文件再原子改名；同一分块重复上传且 MD5 相同时直接跳过
+    - 完成标记用 O_EXCL 创建，重复调用 finish 只有第一次返回 True（只合并一次）
+    - 超过 ttl_seconds 没有活动的会话由 purge_expired() 连同目录一起删除（在此之前都可以续传）
+    - 并发上传数只统计 idle_seconds 内有活动（创建、收到分块、完成）的会话，中断的上传很快释放名额
+    """
+
+    backend = 'file'
+
+    def __init__(self, root: str, ttl_seconds: float, idle_seconds: float = settings.CHUNK_SESSION_IDLE_SECONDS):
+        self.root = Path(root)
+        self.ttl_seconds = ttl_seconds
+        self.idle_seconds = idle_seconds
+
+    @staticmethod
+    def valid_key(key: Optional[str]) -> bool:
+        """key 由客户端传回，只接受 create() 生成的格式（同时防止路径穿越）"""
+        return bool(key and SESSION_KEY_PATTERN.fullmatch(key))
+
+    def session_dir(self, key: str) -> Path:
+        return self.root / key
+
+    def part_path(self, key: str, part_number: int) -> Path:
+        return self.session_dir(key) / f'part_{part_number:04d}.chunk'
+
+    def temp_part_path(self, key: str, part_number: int) -> Path:
+        """分块上传中的临时文件（同一分块并发上传时互不覆盖）"""
+        return self.session_dir(key) / f'.part_{part_number:04d}.{uuid.uuid4().hex}'
+
+    # ---------- 会话信息 / 分块记录（Redis 存储覆盖这些方法） ----------
+
+    def _save_meta(self, key: str, meta: dict) -> None:
+        _atomic_write_json(self.session_dir(key) / SESSION_FILE, meta)
+
+    def _load_meta(self, key: str) -> Optional[dict]:
+        return _read_json(self.session_dir(key) / SESSION_FILE)
+
+    def _save_part(self, key: str, part_number: int, record: dict) -> None:
+        _atomic_write_json(self.part_path(key, part_number).with_suffix('.json'), record)
+
+    def _load_parts(self, key: str) -> Dict[int, dict]:
+        parts = {}
+        for path in self.session_dir(key).glob('part_*.json'):
+            record = _read_json(path)
+            if record is not None:
+                parts[record['partNumber']] = record
+        return parts
+
+    def _mark_finished(self, key: str) -> bool:
+        try:
+            os.close(os.open(self.session_dir(key) / FINISHED_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            return False
+
+    def _is_finished(self, key: str) -> bool:
+        return (self.session_dir(key) / FINISHED_FILE).exists()
+
+    def _touch(self, key: str) -> None:
+        os.utime(self.session_dir(key) / SESSION_FILE)
+
+    def _delete_meta(self, key: str) -> None:
+        """文件存储的会话信息随目录一起删除"""
+
+    def _keys(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return [path.name for path in self.root.iterdir() if path.is_dir() and self.valid_key(path.name)]
+
+    def _last_active(self, key: str) -> float:
+        session_file = self.session_dir(key) / SESSION_FILE
+        return (session_file if session_file.exists() else self.session_dir(key)).stat().st_mtime
+
+    def _expired(self, key: str, now: float) -> bool:
+        return now - self._last_active(key) > self.ttl_seconds
+
+    def _active(self, key: str, now: float) -> bool:
+        return now - self._last_active(key) <= self.idle_seconds
+
+    # ---------- 对外接口 ----------
+
+    def create(self, filename: str, data_type: str) -> dict:
+        key = uuid.uuid4().hex
+        self.session_dir(key).mkdir(parents=True)
+        meta = {
+            'key': key,
+            'upload_id': str(uuid.uuid4()),
+            'filename': filename,
+            'data_type': data_type,
+            'created_at': time.time(),
+        }
+        self._save_meta(key, meta)
+        self._touch(key)
+        return meta
+
+    def get(self, key: str) -> Optional[dict]:
+        """会话信息（含 locked：是否已调用 finish）；key 无效或会话不存在时返回 None"""
+        if not self.valid_key(key) or not self.session_dir(key).is_dir():
+            return None
+        meta = self._load_meta(key)
+        if meta is not None:
+            meta['locked'] = self._is_finished(key)
+        return meta
+
+    def parts(self, key: str) -> Dict[int, dict]:
+        """已收到的分块 {partNumber: {partNumber, size, md5}}"""
+        return self._load_parts(key)
+
+    def commit_part(self, key: str, part_number: int, temp_path: Path, size: int, md5: str) -> bool:
+        """把上传完成的临时文件登记为分块；返回 False 表示相同内容的分块已存在（重复上传，丢弃临时文件）"""
+        existing = self._load_parts(key).get(part_number)
+        if existing is not None and existing['md5'] == md5 and self.part_path(key, part_number).exists():
+            temp_path.unlink(missing_ok=True)
+            self._touch(key)
+            return False
+        os.replace(temp_path, self.part_path(key, part_number))
+        self._save_part(key, part_number, {'partNumber': part_number, 'size': size, 'md5': md5})
+        self._touch(key)
+        return True
+
+    def finish(self, key: str) -> bool:
+        """标记上传完成、拒绝新分块；只有第一次调用返回 True"""
+        finished = self._mark_finished(key)
+        if finished:
+            self._touch(key)
+        return finished
+
+    def delete(self, key: str) -> None:
+        """删除会话及其临时目录（合并完成或过期）"""
+        shutil.rmtree(self.session_dir(key), ignore_errors=True)
+        self._delete_meta(key)
+
+    def _active_keys(self) -> List[str]:
+        """idle_seconds 内有活动的会话（超时未过期的会话仍可续传，但不占用并发名额）"""
+        keys, now = [], time.time()
+        for key in self._keys():
+            try:
+                if self._active(key, now):
+                    keys.append(key)
+            except FileNotFoundError:  # 其他 worker 刚删除
+                continue
+        return keys
+
+    def active_count(self) -> int:
+        return len(self._active_keys())
+
+    def active_keys(self, limit: int = 10) -> List[str]:
+        return self._active_keys()[:limit]
+
+    def purge_expired(self) -> int:
+        """删除超过 ttl_seconds 没有活动的会话（中断的上传、合并失败遗留的目录），返回删除的会话数"""
+        removed, now = 0, time.time()
+        for key in self._keys():
+            try:
+                expired = self._expired(key, now)
+            except FileNotFoundError:  # 其他 worker 刚删除
+                continue
+            if expired:
+                self.delete(key)
+                removed += 1
+        if removed:
+            logger.info(f"已清理过期分块上传会话: {removed} 个")
+        return removed
+
+
+class RedisChunkSessionStore(ChunkSessionStore):
+    """分块上传会话（Redis 存储）：会话信息和分块记录存入 Redis 并按 ttl_seconds 过期，分块数据仍写入 root 目录"""
+
+    backend = 'redis'
+
+    def __init__(self, root: str, ttl_seconds: float, client, idle_seconds: float = settings.CHUNK_SESSION_IDLE_SECONDS):
+        super().__init__(root, ttl_seconds, idle_seconds)
+        self.client = client
+
+    def _redis_key(self, key: str, name: str) -> str:
+        return f'{REDIS_PREFIX}:{key}:{name}'
+
+    def _ttl(self) -> int:
+        return max(int(self.ttl_seconds), 1)
+
+    def _save_meta(self, key: str, meta: dict) -> None:
+        self.client.setex(self._redis_key(key, 'meta'), self._ttl(), json.dumps(meta, ensure_ascii=False))
+
+    def _load_meta(self, key: str) -> Optional[dict]:
+        raw = self.client.get(self._redis_key(key, 'meta'))
+        return json.loads(raw) if raw is not None else None
+
+    def _save_part(self, key: str, part_number: int, record: dict) -> None:
+        parts_key = self._redis_key(key, 'parts')
+        self.client.hset(parts_key, str(part_number), json.dumps(record))
+        self.client.expire(parts_key, self._ttl())
+
+    def _load_parts(self, key: str) -> Dict[int, dict]:
+        raw = self.client.hgetall(self._redis_key(key, 'parts'))
+        return {int(part_number): json.loads(record) for part_number, record in raw.items()}
+
+    def _mark_finished(self, key: str) -> bool:
+        return bool(self.client.set(self._redis_key(key, 'finished'), 1, nx=True, ex=self._ttl()))
+
+    def _is_finished(self, key: str) -> bool:
+        return bool(self.client.exists(self._redis_key(key, 'finished')))
+
+    def _touch(self, key: str) -> None:
+        for name in ('meta', 'parts', 'finished'):
+            self.client.expire(self._redis_key(key, name), self._ttl())
+        # 活动标记：idle_seconds 内没有新的活动时过期
+        self.client.set(self._redis_key(key, 'active'), 1, ex=max(int(self.idle_seconds), 1))
+
+    def _delete_meta(self, key: str) -> None:
+        self.client.delete(*(self._redis_key(key, name) for name in ('meta', 'parts', 'finished', 'active')))
+
+    def _active(self, key: str, now: float) -> bool:
+        return bool(self.client.exists(self._redis_key(key, 'active')))
+
+    def _expired(self, key: str, now: float) -> bool:
+        # 会话信息已按 TTL 过期；刚创建的目录可能还没写入会话信息，按目录时间判断
+        if self.client.exists(self._redis_key(key, 'meta')):
+            return False
+        return now - self.session_dir(key).stat().st_mtime > self.ttl_seconds
+
+
+_store: Optional[ChunkSessionStore] = None
+
+
+def get_chunk_session_store() -> ChunkSessionStore:
+    """全局会话存储（首次调用时创建）：配置 REDIS_URL 且可连接时使用 Redis，否则使用会话文件"""
+    global _store
+    if _store is None:
+        root, ttl = settings.CHUNK_UPLOAD_DIR, settings.CHUNK_SESSION_TTL_SECONDS
+        if settings.REDIS_URL:
+            try:
+                import redis
+                client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, decode_responses=True)
+                client.ping()
+                _store = RedisChunkSessionStore(root, ttl, client)
+                logger.info("分块上传会话存储: Redis")
+            except Exception as e:
+                logger.warning(f"Redis 不可用，分块上传会话改用文件存储: {e}")
+        if _store is None:
+            _store = ChunkSessionStore(root, ttl)
+    return _store
@@ -1,9 +1,11 @@
 # app/table/upload/csv_processor.py - 优化版：使用 INSERT ... ON CONFLICT DO UPDATE
+import csv
+import io
 import logging
 import time
+import numpy as np
 import pandas as pd
-from typing import Iterator, Dict, Any, List
-from pathlib import Path
+from typing import Iterator, Dict, Any, List, NamedTuple, Optional, Tuple
 from datetime import datetime, date
 from sqlalchemy.orm import Session
 from sqlalchemy import text
@@ -11,68 +13,96 @@ from config import settings
 from sqlalchemy.exc import OperationalError, DisconnectionError
 import psycopg2
 
-logger = logging.getLogger(__name__)
-
-def validate_csv_structure(file_path: str) -> tuple[bool, str]:
-    """验证CSV文件结构"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+from app.table.upload.file_inspector import CSVFileInspector, open_byte_range
+from app.table.upload.record_preparer import (
+    PRODUCT_COLUMNS, FLOAT_PRODUCT_COLUMNS, prepare_columns, prepare_batch_records
+)
 
-        if len(lines) < 3:
-            return False, "文件行数不足，至少需要3行（元数据、表头、数据）"
-
-        # 检查第一行是否包含元数据
-        first_line = lines[0].strip()
-        if '报告范围' not in first_line:
-            return False, "第一行应包含报告范围元数据"
+logger = logging.getLogger(__name__)
 
-        # 检查第二行是否是表头
-        second_line = lines[1].strip()
-        if '搜索频率排名' not in second_line or '搜索词' not in second_line:
-            return False, "第二行应为表头，包含'搜索频率排名'和'搜索词'"
+# UPSERT 写入的全部字段
+UPSERT_COLUMNS = [
+    'keyword', 'created_at', 'updated_at',
+    'current_rangking_day', 'report_date_day', 'previous_rangking_day',
+    'ranking_change_day', 'is_new_day', 'ranking_trend_day',
+    'current_rangking_week', 'report_date_week', 'previous_rangking_week',
+    'ranking_change_week', 'is_new_week',
+] + PRODUCT_COLUMNS
+
+# 趋势数组引擎（RANKING_TREND_ENGINE=array）写入的字段，新日期在前，最多保留7天
+TREND_ARRAY_COLUMNS = ['trend_dates', 'trend_ranks']
+TREND_DAYS = 7
+
+# COPY 模式的会话级临时表（每个数据库连接独立，无需清理）
+STAGING_TABLE = 'pg_temp.import_staging'
+STAGING_COLUMNS = ['seq', 'keyword', 'current_ranking'] + PRODUCT_COLUMNS
+STAGING_TABLE_DDL = f"""
+    CREATE TEMP TABLE IF NOT EXISTS import_staging (
+        seq integer NOT NULL,
+        keyword text NOT NULL,
+        current_ranking integer NOT NULL,
+        {', '.join(f'{col} numeric' if col in FLOAT_PRODUCT_COLUMNS else f'{col} text' for col in PRODUCT_COLUMNS)}
+    ) ON COMMIT DELETE ROWS
+"""
+
+
+class PreparedChunk(NamedTuple):
+    """准备阶段的输出：UPSERT 模式为各小批次的参数列表，COPY 模式为临时表 CSV 文本"""
+    rows: int
+    batches: Tuple[List[Dict[str, Any]], ...] = ()
+    staging_csv: Optional[str] = None
 
-        # 检查第三行是否有数据
-        if len(lines) > 2:
-            third_line = lines[2].strip()
-            if not third_line or len(third_line.split(',')) < 3:
-                return False, "第三行应包含实际数据"
 
-        return True, "文件结构验证通过"
+def validate_csv_structure(file_path: str) -> tuple[bool, str]:
+    """验证CSV文件结构（只读取前3行）"""
+    return CSVFileInspector(file_path).validate()
 
-    except Exception as e:
-        return False, f"文件验证失败: {str(e)}"
 
 class CSVProcessor:
     """CSV文件处理工具类 - 使用PostgreSQL UPSERT优化"""
 
-    def __init__(self, batch_size: int = settings.BATCH_SIZE):
+    def __init__(
+            self, batch_size: int = settings.BATCH_SIZE, loader: str = settings.IMPORT_LOADER,
+            trend_engine: str = settings.RANKING_TREND_ENGINE, branded_flag: bool = settings.BRANDED_KEYWORD_FLAG,
+            rank_history: bool = settings.RANK_HISTORY_ENABLED
+    ):
         self.batch_size = batch_size
+        self.loader = loader
+        self.trend_engine = trend_engine
+        self.branded_flag = branded_flag
+        self.rank_history = rank_history
         self.max_retries = 2
         self.retry_delay = 1
 
-    def read_csv_chunks(self, file_path: str) -> Iterator[pd.DataFrame]:
-        """分块读取大CSV文件"""
-        try:
-            # 先读取表头信息
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            if len(lines) < 3:
-                raise ValueError("CSV文件格式不正确，行数不足")
+    def read_csv_chunks(
+            self, file_path: str, headers: Optional[List[str]] = None,
+            byte_range: Optional[Tuple[int, int]] = None
+    ) -> Iterator[pd.DataFrame]:
+        """分块读取大CSV文件
 
-            # 获取表头行（第2行）
-            header_line = lines[1].strip()
-            headers = [h.strip() for h in header_line.split(',')]
+        headers: 已由 CSVFileInspector 解析的表头，未传入时只读取文件头获取
+        byte_range: 只读取数据区的 [start, end) 字节范围（多进程分片，不含表头）
+        """
+        source = None
+        try:
+            if headers is None:
+                headers = CSVFileInspector(file_path).headers
 
             # 创建列名映射
             column_mapping = self._create_column_mapping(len(headers))
             temp_column_names = [f'col_{i}' for i in range(len(headers))]
 
+            if byte_range is not None:
+                source = open_byte_range(file_path, *byte_range)
+                skiprows = 0
+            else:
+                source = file_path
+                skiprows = 2
+
             # 分块读取数据
             chunk_reader = pd.read_csv(
-                file_path,
-                skiprows=2,
+                source,
+                skiprows=skiprows,
                 header=None,
                 names=temp_column_names,
                 dtype=str,
@@ -95,6 +125,9 @@ class CSVProcessor:
         except Exception as e:
             logger.error(f"分块读取CSV文件失败: {e}")
             raise
+        finally:
+            if byte_range is not None and source is not None:
+                source.close()
 
     def process_chunk_with_upsert(
             self,
@@ -103,25 +136,60 @@ class CSVProcessor:
             data_type: str,
             db_session: Session
     ) -> int:
-        """使用连接重试机制的批量处理"""
+        """使用连接重试机制的批量处理（准备 + 写入两个阶段依次执行）"""
         if len(df) == 0:
             return 0
+        prepared = self.prepare_chunk(df, report_date, data_type)
+        return self.load_prepared(prepared, report_date, data_type, db_session)
+
+    def prepare_chunk(self, df: pd.DataFrame, report_date: date, data_type: str) -> PreparedChunk:
+        """准备阶段：整列转换生成写入数据，不访问数据库（导入流水线中与读取、写入并行执行）
+
+        - UPSERT 模式：按 MINIBATCH_SIZE 切分的参数列表，准备失败的小批次跳过
+        - COPY 模式：临时表的 CSV 文本
+        """
+        if self.loader == 'copy':
+            staging_df = self._build_staging_frame(df)
+            csv_buffer = io.StringIO()
+            staging_df.to_csv(csv_buffer, header=False, index=False, quoting=csv.QUOTE_ALL)
+            return PreparedChunk(rows=len(staging_df), staging_csv=csv_buffer.getvalue())
 
-        # 进一步减小批次处理大小
         mini_batch_size = settings.MINIBATCH_SIZE
-        total_processed = 0
+        now = datetime.now()
+        batches = []
+        for i in range(0, len(df), mini_batch_size):
+            try:
+                # 整列准备参数（替代 iterrows + 逐行 safe_get）
+                batch_data = prepare_batch_records(df.iloc[i:i + mini_batch_size], report_date, data_type, now)
+            except Exception as e:
+                logger.error(f"处理失败，跳过本批次: {e}")
+                continue
+            if batch_data:
+                batches.append(batch_data)
+        return PreparedChunk(rows=sum(len(batch) for batch in batches), batches=tuple(batches))
+
+    def load_prepared(
+            self,
+            prepared: PreparedChunk,
+            report_date: date,
+            data_type: str,
+            db_session: Session
+    ) -> int:
+        """写入阶段：执行 prepare_chunk 的结果并提交，返回写入行数"""
+        if prepared.rows == 0:
+            return 0
+
+        # COPY 模式：整块一次 COPY + 集合合并
+        if prepared.staging_csv is not None:
+            return self._load_staging_csv(prepared, report_date, data_type, db_session)
 
+        total_processed = 0
         try:
-            # 分小批次处理
-            for i in range(0, len(df), mini_batch_size):
-                mini_batch = df.iloc[i:i + mini_batch_size]
-                processed = self._process_mini_batch_with_retry(
-                    mini_batch, report_date, data_type, db_session
-                )
-                total_processed += processed
+            for index, batch_data in enumerate(prepared.batches, 1):
+                total_processed += self._execute_mini_batch_with_retry(batch_data, data_type, db_session)
 
                 # 每处理2个批次就提交
-                if (i // mini_batch_size + 1) % 2 == 0:
+                if index % 2 == 0:
                     self._safe_commit(db_session)
 
             # 最终提交
@@ -133,126 +201,121 @@ class CSVProcessor:
             self._safe_rollback(db_session)
             raise
 
-    def _process_mini_batch_with_retry(
+    def _execute_mini_batch_with_retry(
             self,
-            df: pd.DataFrame,
-            report_date: date,
+            batch_data: List[Dict[str, Any]],
             data_type: str,
             db_session: Session
     ) -> int:
-        """带重试机制的小批次处理"""
+        """带重试机制的小批次写入"""
+        # 执行批量UPSERT
+        upsert_sql = self._build_upsert_sql(data_type)
+
         for attempt in range(self.max_retries):
             try:
-                batch_data = []
-                now = datetime.now()
-
-                for _, row in df.iterrows():
-                    keyword = str(row.get('keyword', '')).strip()
-                    if not keyword:
-                        continue
-
-                    current_ranking = int(float(row.get('current_rangking_day', 0))) if row.get(
-                        'current_rangking_day') else 0
-                    record_data = self._prepare_record_data(row, report_date, data_type, current_ranking, now)
-                    batch_data.append(record_data)
-
-                if not batch_data:
-                    return 0
-
-                # 执行批量UPSERT
-                upsert_sql = self._build_upsert_sql(data_type)
-
-                try:
-                    # 使用 executemany 进行真正的批处理
-                    db_session.execute(text(upsert_sql), batch_data)
-                    return len(batch_data)
-                except (OperationalError, DisconnectionError, psycopg2.OperationalError) as e:
-                    logger.warning(f"连接错误，尝试重建连接并重试: {e}")
-                    if attempt < self.max_retries - 1:
-                        self._rebuild_connection(db_session)
-                        time.sleep(self.retry_delay * (attempt + 1))
-                        continue
-                    else:
-                        logger.error(f"批处理失败，跳过本批次: {e}")
-                        return 0
-                except Exception as e:
-                    logger.error(f"批处理失败，跳过本批次: {e}")
-                    return 0
-
-            except Exception as e:
-                logger.error(f"处理失败: {e}")
+                # 使用 executemany 进行真正的批处理
+                db_session.execute(text(upsert_sql), batch_data)
+                return len(batch_data)
+            except (OperationalError, DisconnectionError, psycopg2.OperationalError) as e:
+                logger.warning(f"连接错误，尝试重建连接并重试: {e}")
                 if attempt < self.max_retries - 1:
-                    time.sleep(self.retry_delay * (attempt + 1))
                     self._rebuild_connection(db_session)
+                    time.sleep(self.retry_delay * (attempt + 1))
                 else:
-                    logger.error(f"处理失败，跳过本批次: {e}")
-                    return 0
+                    logger.error(f"批处理失败，跳过本批次: {e}")
+            except Exception as e:
+                logger.error(f"批处理失败，跳过本批次: {e}")
+                return 0
 
         return 0
 
     def _build_upsert_sql(self, data_type: str) -> str:
         """构建UPSERT SQL语句 - 使用:param格式"""
+        value_exprs = {col: f':{col}' for col in UPSERT_COLUMNS}
+        value_exprs['ranking_trend_day'] = 'CAST(:ranking_trend_day AS jsonb)'
+        value_exprs.update(self._trend_value_exprs(data_type, ':report_date_day', ':current_rangking_day'))
+        value_exprs.update(self._branded_value_exprs(':keyword', ':top_brand'))
+
+        columns = ', '.join(value_exprs)
+        values = ', '.join(value_exprs.values())
+        return self._with_rank_history(f"""
+            INSERT INTO analysis.amazon_origin_search_data ({columns})
+            VALUES ({values})
+            {self._build_conflict_clause(data_type)}
+        """, data_type)
+
+    def _with_rank_history(self, upsert_sql: str, data_type: str) -> str:
+        """开启排名历史时，把主表合并包装成数据修改 CTE，同一条语句把合并后的 (id, 日期, 排名) 追加到 keyword_rank_history
+
+        同一关键词同一天重复导入时覆盖排名；排名为 0（该周期无排名）不写入
+        """
+        if not self.rank_history:
+            return upsert_sql
+        suffix, period = ('day', 'd') if data_type == 'daily' else ('week', 'w')
+        return f"""
+            WITH merged AS (
+                {upsert_sql}
+                RETURNING id, report_date_{suffix} AS rank_date, current_rangking_{suffix} AS rank
+            )
+            INSERT INTO analysis.keyword_rank_history (keyword_id, period, rank_date, rank)
+            SELECT id, '{period}', rank_date, rank FROM merged WHERE rank <> 0
+            ON CONFLICT (keyword_id, period, rank_date) DO UPDATE SET rank = EXCLUDED.rank
+        """
+
+    def _trend_value_exprs(self, data_type: str, date_expr: str, ranking_expr: str) -> Dict[str, str]:
+        """趋势字段的插入表达式：数组引擎写入单元素数组，jsonb 字段只保留默认空数组"""
+        if self.trend_engine != 'array':
+            return {}
+
         if data_type == 'daily':
-            return """
-                   INSERT INTO analysis.amazon_origin_search_data (keyword, created_at, updated_at, \
-                                                                   current_rangking_day, report_date_day, \
-                                                                   previous_rangking_day, \
-                                                                   ranking_change_day, is_new_day, ranking_trend_day, \
-                                                                   current_rangking_week, report_date_week, \
-                                                                   previous_rangking_week, \
-                                                                   ranking_change_week, is_new_week, \
-                                                                   top_brand, top_category, top_product_asin, \
-                                                                   top_product_title, \
-                                                                   top_product_click_share, \
-                                                                   top_product_conversion_share, \
-                                                                   brand_2nd, category_2nd, product_asin_2nd, \
-                                                                   product_title_2nd, \
-                                                                   product_click_share_2nd, \
-                                                                   product_conversion_share_2nd, \
-                                                                   brand_3rd, category_3rd, product_asin_3rd, \
-                                                                   product_title_3rd, \
-                                                                   product_click_share_3rd, \
-                                                                   product_conversion_share_3rd)
-                   VALUES (:keyword, :created_at, :updated_at, \
-                           :current_rangking_day, :report_date_day, :previous_rangking_day, \
-                           :ranking_change_day, :is_new_day, CAST(:ranking_trend_day AS jsonb), \
-                           :current_rangking_week, :report_date_week, :previous_rangking_week, \
-                           :ranking_change_week, :is_new_week, \
-                           :top_brand, :top_category, :top_product_asin, :top_product_title, \
-                           :top_product_click_share, :top_product_conversion_share, \
-                           :brand_2nd, :category_2nd, :product_asin_2nd, :product_title_2nd, \
-                           :product_click_share_2nd, :product_conversion_share_2nd, \
-                           :brand_3rd, :category_3rd, :product_asin_3rd, :product_title_3rd, \
-                           :product_click_share_3rd, :product_conversion_share_3rd) ON CONFLICT (keyword) DO \
-                   UPDATE SET
-                       updated_at = EXCLUDED.updated_at, \
-                       previous_rangking_day = CASE \
-                       WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day \
-                       THEN amazon_origin_search_data.previous_rangking_day \
-                       ELSE amazon_origin_search_data.current_rangking_day
-                   END \
-                   ,
-                    current_rangking_day = EXCLUDED.current_rangking_day,
-                    ranking_change_day = CASE 
-                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day 
-                        THEN amazon_origin_search_data.ranking_change_day
-                        ELSE EXCLUDED.current_rangking_day - amazon_origin_search_data.current_rangking_day
-                   END \
-                   ,
-                    report_date_day = EXCLUDED.report_date_day,
-                    is_new_day = CASE 
-                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day 
-                        THEN amazon_origin_search_data.is_new_day
-                        ELSE false
-                   END \
-                   ,
-                    ranking_trend_day = CASE 
-                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day 
+            return {
+                'ranking_trend_day': "'[]'::jsonb",
+                'trend_dates': f'ARRAY[CAST({date_expr} AS date)]',
+                'trend_ranks': f'ARRAY[CAST({ranking_expr} AS integer)]',
+            }
+        return {
+            'ranking_trend_day': "'[]'::jsonb",
+            'trend_dates': "'{}'::date[]",
+            'trend_ranks': "'{}'::integer[]",
+        }
+
+    def _branded_value_exprs(self, keyword_expr: str, brand_expr: str) -> Dict[str, str]:
+        """品牌词标记的插入表达式（与 004 迁移回填、原默认过滤的 LIKE 语义一致）"""
+        if not self.branded_flag:
+            return {}
+        return {'is_branded_keyword': f"lower({keyword_expr}) LIKE concat('%', lower({brand_expr}), '%')"}
+
+    def _build_trend_update(self) -> str:
+        """日数据趋势更新子句
+
+        jsonb 引擎：展开数组、排序、截取后重新聚合（相关子查询）
+        array 引擎：同日按下标替换排名，跨日在数组头部追加并截取前7个，只有定长数组运算
+        """
+        if self.trend_engine == 'array':
+            # 切片写成 [1:n]：text() 会把 [:name] 误识别为绑定参数
+            position = 'array_position(amazon_origin_search_data.trend_dates, EXCLUDED.report_date_day)'
+            return f"""
+                    trend_ranks = CASE
+                        WHEN {position} IS NOT NULL
+                        THEN amazon_origin_search_data.trend_ranks[1:{position} - 1]
+                            || EXCLUDED.current_rangking_day
+                            || amazon_origin_search_data.trend_ranks[{position} + 1:]
+                        ELSE (EXCLUDED.current_rangking_day || amazon_origin_search_data.trend_ranks)[1:{TREND_DAYS}]
+                    END,
+                    trend_dates = CASE
+                        WHEN {position} IS NOT NULL
+                        THEN amazon_origin_search_data.trend_dates
+                        ELSE (EXCLUDED.report_date_day || amazon_origin_search_data.trend_dates)[1:{TREND_DAYS}]
+                    END,"""
+
+        return """
+                    ranking_trend_day = CASE
+                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day
                         THEN (
                             -- 如果是同一天的数据，更新当天的排名
                             SELECT jsonb_agg(
-                                CASE 
-                                    WHEN item->>'date' = EXCLUDED.report_date_day::text 
+                                CASE
+                                    WHEN item->>'date' = EXCLUDED.report_date_day::text
                                     THEN jsonb_build_object('date', item->>'date', 'ranking', EXCLUDED.current_rangking_day)
                                     ELSE item
                                 END
@@ -279,185 +342,154 @@ class CSVProcessor:
                             SELECT jsonb_agg(item ORDER BY (item->>'date')::date DESC)
                             FROM combined
                         )
-                   END \
-                   ,
-                    top_brand = EXCLUDED.top_brand,
-                    top_category = EXCLUDED.top_category,
-                    top_product_asin = EXCLUDED.top_product_asin,
-                    top_product_title = EXCLUDED.top_product_title,
-                    top_product_click_share = EXCLUDED.top_product_click_share,
-                    top_product_conversion_share = EXCLUDED.top_product_conversion_share,
-                    brand_2nd = EXCLUDED.brand_2nd,
-                    category_2nd = EXCLUDED.category_2nd,
-                    product_asin_2nd = EXCLUDED.product_asin_2nd,
-                    product_title_2nd = EXCLUDED.product_title_2nd,
-                    product_click_share_2nd = EXCLUDED.product_click_share_2nd,
-                    product_conversion_share_2nd = EXCLUDED.product_conversion_share_2nd,
-                    brand_3rd = EXCLUDED.brand_3rd,
-                    category_3rd = EXCLUDED.category_3rd,
-                    product_asin_3rd = EXCLUDED.product_asin_3rd,
-                    product_title_3rd = EXCLUDED.product_title_3rd,
-                    product_click_share_3rd = EXCLUDED.product_click_share_3rd,
-                    product_conversion_share_3rd = EXCLUDED.product_conversion_share_3rd \
-                   """
+                    END,"""
+
+    def _build_conflict_clause(self, data_type: str) -> str:
+        """构建 ON CONFLICT 更新子句 - executemany 与 COPY 合并共用，保证日/周语义一致"""
+        product_updates = ',\n'.join(f'{col} = EXCLUDED.{col}' for col in PRODUCT_COLUMNS)
+        if self.branded_flag:
+            # top_brand 随新数据覆盖，标记同步更新
+            product_updates += ',\nis_branded_keyword = EXCLUDED.is_branded_keyword'
+
+        if data_type == 'daily':
+            return f"""
+                ON CONFLICT (keyword) DO UPDATE SET
+                    updated_at = EXCLUDED.updated_at,
+                    previous_rangking_day = CASE
+                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day
+                        THEN amazon_origin_search_data.previous_rangking_day
+                        ELSE amazon_origin_search_data.current_rangking_day
+                    END,
+                    current_rangking_day = EXCLUDED.current_rangking_day,
+                    ranking_change_day = CASE
+                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day
+                        THEN amazon_origin_search_data.ranking_change_day
+                        ELSE EXCLUDED.current_rangking_day - amazon_origin_search_data.current_rangking_day
+                    END,
+                    report_date_day = EXCLUDED.report_date_day,
+                    is_new_day = CASE
+                        WHEN amazon_origin_search_data.report_date_day = EXCLUDED.report_date_day
+                        THEN amazon_origin_search_data.is_new_day
+                        ELSE false
+                    END,
+                    {self._build_trend_update()}
+                    {product_updates}
+            """
         else:  # weekly
-            # 周数据的SQL保持不变
-            return """
-                   INSERT INTO analysis.amazon_origin_search_data (keyword, created_at, updated_at, \
-                                                                   current_rangking_week, report_date_week, \
-                                                                   previous_rangking_week, \
-                                                                   ranking_change_week, is_new_week, \
-                                                                   current_rangking_day, report_date_day, \
-                                                                   previous_rangking_day, \
-                                                                   ranking_change_day, is_new_day, ranking_trend_day, \
-                                                                   top_brand, top_category, top_product_asin, \
-                                                                   top_product_title, \
-                                                                   top_product_click_share, \
-                                                                   top_product_conversion_share, \
-                                                                   brand_2nd, category_2nd, product_asin_2nd, \
-                                                                   product_title_2nd, \
-                                                                   product_click_share_2nd, \
-                                                                   product_conversion_share_2nd, \
-                                                                   brand_3rd, category_3rd, product_asin_3rd, \
-                                                                   product_title_3rd, \
-                                                                   product_click_share_3rd, \
-                                                                   product_conversion_share_3rd)
-                   VALUES (:keyword, :created_at, :updated_at, \
-                           :current_rangking_week, :report_date_week, :previous_rangking_week, \
-                           :ranking_change_week, :is_new_week, \
-                           :current_rangking_day, :report_date_day, :previous_rangking_day, \
-                           :ranking_change_day, :is_new_day, CAST(:ranking_trend_day AS jsonb), \
-                           :top_brand, :top_category, :top_product_asin, :top_product_title, \
-                           :top_product_click_share, :top_product_conversion_share, \
-                           :brand_2nd, :category_2nd, :product_asin_2nd, :product_title_2nd, \
-                           :product_click_share_2nd, :product_conversion_share_2nd, \
-                           :brand_3rd, :category_3rd, :product_asin_3rd, :product_title_3rd, \
-                           :product_click_share_3rd, :product_conversion_share_3rd) ON CONFLICT (keyword) DO \
-                   UPDATE SET
-                       updated_at = EXCLUDED.updated_at, \
-                       previous_rangking_week = CASE \
-                       WHEN amazon_origin_search_data.report_date_week = EXCLUDED.report_date_week \
-                       THEN amazon_origin_search_data.previous_rangking_week \
-                       ELSE amazon_origin_search_data.current_rangking_week
-                   END \
-                   ,
+            return f"""
+                ON CONFLICT (keyword) DO UPDATE SET
+                    updated_at = EXCLUDED.updated_at,
+                    previous_rangking_week = CASE
+                        WHEN amazon_origin_search_data.report_date_week = EXCLUDED.report_date_week
+                        THEN amazon_origin_search_data.previous_rangking_week
+                        ELSE amazon_origin_search_data.current_rangking_week
+                    END,
                     current_rangking_week = EXCLUDED.current_rangking_week,
-                    ranking_change_week = CASE 
-                        WHEN amazon_origin_search_data.report_date_week = EXCLUDED.report_date_week 
+                    ranking_change_week = CASE
+                        WHEN amazon_origin_search_data.report_date_week = EXCLUDED.report_date_week
                         THEN amazon_origin_search_data.ranking_change_week
                         ELSE EXCLUDED.current_rangking_week - amazon_origin_search_data.current_rangking_week
-                   END \
-                   ,
+                    END,
                     report_date_week = EXCLUDED.report_date_week,
-                    is_new_week = CASE 
-                        WHEN amazon_origin_search_data.report_date_week = EXCLUDED.report_date_week 
+                    is_new_week = CASE
+                        WHEN amazon_origin_search_data.report_date_week = EXCLUDED.report_date_week
                         THEN amazon_origin_search_data.is_new_week
                         ELSE false
-                   END \
-                   ,
-                    top_brand = EXCLUDED.top_brand,
-                    top_category = EXCLUDED.top_category,
-                    top_product_asin = EXCLUDED.top_product_asin,
-                    top_product_title = EXCLUDED.top_product_title,
-                    top_product_click_share = EXCLUDED.top_product_click_share,
-                    top_product_conversion_share = EXCLUDED.top_product_conversion_share,
-                    brand_2nd = EXCLUDED.brand_2nd,
-                    category_2nd = EXCLUDED.category_2nd,
-                    product_asin_2nd = EXCLUDED.product_asin_2nd,
-                    product_title_2nd = EXCLUDED.product_title_2nd,
-                    product_click_share_2nd = EXCLUDED.product_click_share_2nd,
-                    product_conversion_share_2nd = EXCLUDED.product_conversion_share_2nd,
-                    brand_3rd = EXCLUDED.brand_3rd,
-                    category_3rd = EXCLUDED.category_3rd,
-                    product_asin_3rd = EXCLUDED.product_asin_3rd,
-                    product_title_3rd = EXCLUDED.product_title_3rd,
-                    product_click_share_3rd = EXCLUDED.product_click_share_3rd,
-                    product_conversion_share_3rd = EXCLUDED.product_conversion_share_3rd \
-                   """
-
-    def _prepare_record_data(self, row: pd.Series, report_date: date, data_type: str, current_ranking: int,
-                             now: datetime) -> Dict[str, Any]:
-        """准备记录数据"""
-
-        def safe_get(col, default='', dtype=str):
-            val = row.get(col, default)
-            if pd.isna(val) or val == '':
-                return default if dtype == str else (0.0 if dtype == float else 0)
-            try:
-                return dtype(val) if dtype != str else str(val).strip()
-            except:
-                return default if dtype == str else (0.0 if dtype == float else 0)
-
-        # 基础数据
-        data = {
-            'keyword': str(row.get('keyword', '')).strip(),
-            'created_at': now,
-            'updated_at': now,
+                    END,
+                    {product_updates}
+            """
+
+    # ==================== COPY 批量导入 ====================
+
+    def _load_staging_csv(
+            self,
+            prepared: PreparedChunk,
+            report_date: date,
+            data_type: str,
+            db_session: Session
+    ) -> int:
+        """COPY 模式：整块 COPY 到会话级临时表，再用一条 INSERT ... SELECT ... ON CONFLICT 合并"""
+        csv_buffer = io.StringIO(prepared.staging_csv)
+        merge_sql = self._build_merge_sql(data_type)
+        merge_params = {
+            'now': datetime.now(),
             'report_date': report_date,
-            'current_ranking': current_ranking,
-
-            # 商品信息
-            'top_brand': safe_get('top_brand'),
-            'top_category': safe_get('top_category'),
-            'top_product_asin': safe_get('top_product_asin'),
-            'top_product_title': safe_get('top_product_title'),
-            'top_product_click_share': safe_get('top_product_click_share', 0.0, float),
-            'top_product_conversion_share': safe_get('top_product_conversion_share', 0.0, float),
-
-            'brand_2nd': safe_get('brand_2nd'),
-            'category_2nd': safe_get('category_2nd'),
-            'product_asin_2nd': safe_get('product_asin_2nd'),
-            'product_title_2nd': safe_get('product_title_2nd'),
-            'product_click_share_2nd': safe_get('product_click_share_2nd', 0.0, float),
-            'product_conversion_share_2nd': safe_get('product_conversion_share_2nd', 0.0, float),
-
-            'brand_3rd': safe_get('brand_3rd'),
-            'category_3rd': safe_get('category_3rd'),
-            'product_asin_3rd': safe_get('product_asin_3rd'),
-            'product_title_3rd': safe_get('product_title_3rd'),
-            'product_click_share_3rd': safe_get('product_click_share_3rd', 0.0, float),
-            'product_conversion_share_3rd': safe_get('product_conversion_share_3rd', 0.0, float),
+            'report_date_text': report_date.isoformat(),
         }
 
-        import json
+        for attempt in range(self.max_retries):
+            try:
+                raw_connection = db_session.connection().connection
+                with raw_connection.cursor() as cursor:
+                    cursor.execute(STAGING_TABLE_DDL)
+                    cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+                    csv_buffer.seek(0)
+                    cursor.copy_expert(
+                        f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                        csv_buffer
+                    )
+
+                db_session.execute(text(merge_sql), merge_params)
+                self._safe_commit(db_session)
+                return prepared.rows
 
-        # 根据数据类型设置特定字段
-        if data_type == 'daily':
-            ranking_trend_data = [{"date": report_date.isoformat(), "ranking": current_ranking}]
-
-            data.update({
-                'current_rangking_day': current_ranking,
-                'report_date_day': report_date,
-                'previous_rangking_day': 0,  # 由数据库处理
-                'ranking_change_day': 0,  # 由数据库计算
-                'is_new_day': True,  # 由数据库处理
-                'ranking_trend_day': json.dumps(ranking_trend_data),
-
-                # 周数据默认值
-                'current_rangking_week': 0,
-                'report_date_week': report_date,
-                'previous_rangking_week': 0,
-                'ranking_change_week': 0,
-                'is_new_week': False
-            })
-        else:  # weekly
-            data.update({
-                'current_rangking_week': current_ranking,
-                'report_date_week': report_date,
-                'previous_rangking_week': 0,  # 由数据库处理
-                'ranking_change_week': 0,  # 由数据库计算
-                'is_new_week': True,  # 由数据库处理
-
-                # 日数据默认值
-                'current_rangking_day': 0,
-                'report_date_day': report_date,
-                'previous_rangking_day': 0,
-                'ranking_change_day': 0,
-                'is_new_day': False,
-                'ranking_trend_day': '[]'
-            })
-
-        return data
+            except (OperationalError, DisconnectionError, psycopg2.OperationalError) as e:
+                logger.warning(f"COPY导入连接错误，尝试重建连接并重试: {e}")
+                if attempt < self.max_retries - 1:
+                    self._rebuild_connection(db_session)
+                    time.sleep(self.retry_delay * (attempt + 1))
+                else:
+                    logger.error(f"COPY导入失败，跳过本批次: {e}")
+                    return 0
+            except Exception as e:
+                logger.error(f"COPY导入失败，跳过本批次: {e}")
+                self._safe_rollback(db_session)
+                return 0
+
+        return 0
+
+    def _build_staging_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """生成临时表数据（列顺序与 STAGING_COLUMNS 一致）"""
+        staging = prepare_columns(df)
+        staging.insert(0, 'seq', np.arange(len(staging)))
+        return staging
+
+    def _build_merge_sql(self, data_type: str) -> str:
+        """构建临时表 -> 主表的集合合并SQL（同一块内重复关键词保留最后一条，与逐行执行结果一致）"""
+        is_daily = data_type == 'daily'
+        ranking = 's.current_ranking'
+        select_exprs = {
+            'keyword': 's.keyword',
+            'created_at': ':now',
+            'updated_at': ':now',
+            'current_rangking_day': ranking if is_daily else '0',
+            'report_date_day': ':report_date',
+            'previous_rangking_day': '0',
+            'ranking_change_day': '0',
+            'is_new_day': 'true' if is_daily else 'false',
+            'ranking_trend_day': (
+                f"jsonb_build_array(jsonb_build_object('date', CAST(:report_date_text AS text), 'ranking', {ranking}))"
+                if is_daily else "'[]'::jsonb"
+            ),
+            'current_rangking_week': '0' if is_daily else ranking,
+            'report_date_week': ':report_date',
+            'previous_rangking_week': '0',
+            'ranking_change_week': '0',
+            'is_new_week': 'false' if is_daily else 'true',
+        }
+        select_exprs.update({col: f's.{col}' for col in PRODUCT_COLUMNS})
+        select_exprs.update(self._trend_value_exprs(data_type, ':report_date', ranking))
+        select_exprs.update(self._branded_value_exprs('s.keyword', 's.top_brand'))
+
+        columns = ', '.join(select_exprs)
+        selects = ', '.join(select_exprs.values())
+        return self._with_rank_history(f"""
+            INSERT INTO analysis.amazon_origin_search_data ({columns})
+            SELECT DISTINCT ON (s.keyword) {selects}
+            FROM {STAGING_TABLE} s
+            ORDER BY s.keyword, s.seq DESC
+            {self._build_conflict_clause(data_type)}
+        """, data_type)
 
     def _create_column_mapping(self, header_count: int) -> Dict[str, str]:
         """创建列名映射"""
@@ -559,25 +591,11 @@ class CSVProcessor:
         except Exception as e:
             logger.warning(f"回滚失败: {e}")
 
-    def get_file_info(self, file_path: str) -> Dict[str, Any]:
-        """获取CSV文件信息"""
+    def get_file_info(self, file_path: str, inspector: Optional[CSVFileInspector] = None) -> Dict[str, Any]:
+        """获取CSV文件信息（二进制缓冲扫描计数，内存占用与文件大小无关）"""
         try:
-            file_size = Path(file_path).stat().st_size
-
-            # 估算行数（快速方法）
-            with open(file_path, 'r', encoding='utf-8') as f:
-                # 跳过前两行
-                f.readline()
-                f.readline()
-                # 计算数据行数
-                line_count = sum(1 for line in f if line.strip())
-
-            return {
-                'file_size': file_size,
-                'file_size_mb': round(file_size / (1024 * 1024), 2),
-                'estimated_records': line_count,
-                'estimated_chunks': (line_count // self.batch_size) + 1
-            }
+            inspector = inspector or CSVFileInspector(file_path)
+            return inspector.inspect(self.batch_size)
 
         except Exception as e:
             logger.error(f"获取文件信息失败: {e}")
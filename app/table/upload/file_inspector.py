@@ -0,0 +1,172 @@
+# app/table/upload/file_inspector.py - 单次流式检查上传文件：只读文件头做校验，二进制缓冲扫描统计行数，按字节范围分片
+import io
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Tuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 文件前两行为元数据和表头，数据从第3行开始
+HEADER_LINES = 2
+# 二进制扫描缓冲区大小（内存占用固定，与文件大小无关）
+SCAN_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+class CSVFileInspector:
+    """CSV文件检查器 - 元数据/表头校验、数据行统计，结果缓存供分块读取复用"""
+
+    def __init__(self, file_path: str, buffer_size: int = SCAN_BUFFER_SIZE):
+        self.file_path = file_path
+        self.buffer_size = buffer_size
+        self._head_lines: Optional[List[str]] = None
+        self._data_offset = 0
+        self._data_rows: Optional[int] = None
+
+    @property
+    def head_lines(self) -> List[str]:
+        """文件前3行（元数据、表头、首行数据），只读取这3行"""
+        if self._head_lines is None:
+            lines = []
+            with open(self.file_path, 'rb') as f:
+                for i in range(HEADER_LINES + 1):
+                    line = f.readline()
+                    if not line:
+                        break
+                    lines.append(line.decode('utf-8'))
+                    if i == HEADER_LINES - 1:
+                        self._data_offset = f.tell()
+            self._head_lines = lines
+        return self._head_lines
+
+    @property
+    def data_offset(self) -> int:
+        """首行数据的字节偏移（跳过元数据和表头）"""
+        self.head_lines
+        return self._data_offset
+
+    @property
+    def metadata_line(self) -> str:
+        return self.head_lines[0].strip() if self.head_lines else ''
+
+    @property
+    def headers(self) -> List[str]:
+        """表头列名（第2行）"""
+        if len(self.head_lines) < HEADER_LINES:
+            raise ValueError("CSV文件格式不正确，行数不足")
+        return [h.strip() for h in self.head_lines[1].strip().split(',')]
+
+    def validate(self) -> Tuple[bool, str]:
+        """验证CSV文件结构"""
+        try:
+            lines = self.head_lines
+
+            if len(lines) < 3:
+                return False, "文件行数不足，至少需要3行（元数据、表头、数据）"
+
+            # 检查第一行是否包含元数据
+            if '报告范围' not in lines[0].strip():
+                return False, "第一行应包含报告范围元数据"
+
+            # 检查第二行是否是表头
+            second_line = lines[1].strip()
+            if '搜索频率排名' not in second_line or '搜索词' not in second_line:
+                return False, "第二行应为表头，包含'搜索频率排名'和'搜索词'"
+
+            # 检查第三行是否有数据
+            third_line = lines[2].strip()
+            if not third_line or len(third_line.split(',')) < 3:
+                return False, "第三行应包含实际数据"
+
+            return True, "文件结构验证通过"
+
+        except Exception as e:
+            return False, f"文件验证失败: {str(e)}"
+
+    def count_data_rows(self) -> int:
+        """统计数据行数：按固定缓冲区扫描换行符，不解码、不构造字符串
+
+        空白行同样计入（仅用于进度估算，实际导入数以处理结果为准）
+        """
+        if self._data_rows is None:
+            newlines = 0
+            last_byte = b''
+            with open(self.file_path, 'rb', buffering=0) as f:
+                while block := f.read(self.buffer_size):
+                    newlines += block.count(b'\n')
+                    last_byte = block[-1:]
+
+            # 最后一行没有换行符时补计一行
+            total_lines = newlines + (1 if last_byte and last_byte != b'\n' else 0)
+            self._data_rows = max(total_lines - HEADER_LINES, 0)
+        return self._data_rows
+
+    def inspect(self, batch_size: int) -> Dict[str, Any]:
+        """获取CSV文件信息（与 CSVProcessor.get_file_info 返回结构一致）"""
+        file_size = Path(self.file_path).stat().st_size
+        line_count = self.count_data_rows()
+        return {
+            'file_size': file_size,
+            'file_size_mb': round(file_size / (1024 * 1024), 2),
+            'estimated_records': line_count,
+            'estimated_chunks': (line_count // batch_size) + 1
+        }
+
+    def plan_byte_ranges(self, lines_per_range: int) -> List[Tuple[int, int]]:
+        """按换行对齐切分数据区的字节范围 [start, end)，供多进程直接读取原文件
+
+        按平均行长把 lines_per_range 换算为字节数，边界向后对齐到下一个换行符，
+        只需每个边界一次 seek + readline，不复制文件
+        """
+        file_size = os.path.getsize(self.file_path)
+        start = self.data_offset
+        data_bytes = file_size - start
+        if data_bytes <= 0:
+            return []
+
+        data_rows = max(self.count_data_rows(), 1)
+        range_bytes = max(data_bytes * lines_per_range // data_rows, 1)
+
+        ranges = []
+        with open(self.file_path, 'rb') as f:
+            while start < file_size:
+                end = start + range_bytes
+                if end < file_size:
+                    f.seek(end - 1)
+                    f.readline()  # 对齐到行尾（若 end-1 恰为换行符则不移动）
+                    end = f.tell()
+                end = min(end, file_size)
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+
+class ByteRangeReader(io.RawIOBase):
+    """只读取文件 [start, end) 字节范围的原始流，可直接交给 pandas.read_csv"""
+
+    def __init__(self, file_path: str, start: int, end: int):
+        super().__init__()
+        self._file = open(file_path, 'rb', buffering=0)
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[:self._remaining]
+        size = self._file.readinto(view)
+        self._remaining -= size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def open_byte_range(file_path: str, start: int, end: int) -> io.BufferedReader:
+    """打开文件字节范围的缓冲读取流"""
+    return io.BufferedReader(ByteRangeReader(file_path, start, end), buffer_size=1024 * 1024)
@@ -0,0 +1,48 @@
+# app/table/upload/import_hooks.py - 导入前后的派生数据维护：创建排名历史分区、刷新汇总表、使搜索/计数缓存失效
+import logging
+import time
+from datetime import date
+
+from config import settings
+from app.table.analysis.analysis_cache import search_result_cache
+from app.table.analysis.analysis_count import refresh_count_summary
+from app.table.analysis.analysis_crud import AnalysisCRUD
+
+logger = logging.getLogger(__name__)
+
+
+def on_import_started(report_date: date) -> None:
+    """导入开始前调用：开启排名历史时创建报告日期所在月份的分区（写入时分区必须已存在）"""
+    if not settings.RANK_HISTORY_ENABLED:
+        return
+    from database import SessionFactory
+    from app.table.analysis.analysis_trend import ensure_rank_history_partition
+
+    with SessionFactory() as db:
+        ensure_rank_history_partition(db, report_date)
+
+
+def on_import_finished() -> None:
+    """导入完成（有数据写入）后调用：先刷新汇总表，再递增数据版本号
+
+    版本号在刷新之后递增，避免缓存在刷新期间重新填入旧汇总表的计数
+    """
+    if settings.COUNT_SUMMARY_ENABLED or settings.CATEGORY_STATS_MATERIALIZED:
+        from database import SessionFactory
+        with SessionFactory() as db:
+            if settings.COUNT_SUMMARY_ENABLED:
+                try:
+                    refresh_count_summary(db)
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"刷新计数汇总表失败: {e}")
+            if settings.CATEGORY_STATS_MATERIALIZED:
+                try:
+                    started = time.perf_counter()
+                    AnalysisCRUD(db).refresh_category_stats()
+                    logger.info(f"类目统计刷新完成: {time.perf_counter() - started:.1f}s")
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"刷新类目统计失败: {e}")
+
+    search_result_cache.bump_version()
@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import BigInteger, Integer, String, Date, Boolean, Text, DateTime, Numeric, func, Enum as SQLEnum
+from sqlalchemy import BigInteger, Integer, String, Date, Boolean, Text, DateTime, Numeric, func, Enum as SQLEnum, Table, Column, MetaData
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime, date
 from typing import Optional
@@ -32,4 +32,13 @@ class ImportBatchRecords(Base):
     completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, server_default=func.now(),onupdate=func.now())
 
 
+# 导入流水线各阶段吞吐和队列深度（docs/migrations/010_import_stage_metrics.sql，IMPORT_PIPELINE=true 时读写）
+# 可选迁移添加的列不映射到 ImportBatchRecords，未执行 010 的库插入、查询导入记录不受影响；单独的 MetaData，不参与建表
+import_stage_metrics = Table(
+    'import_batch_records', MetaData(schema=Base.metadata.schema),
+    Column('id', Integer, primary_key=True),
+    Column('stage_metrics', JSONB),
+)
+
+
 
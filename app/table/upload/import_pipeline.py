@@ -0,0 +1,218 @@
+# app/table/upload/import_pipeline.py - 单线程导入流水线：读取 -> 准备 -> 写入 三个阶段各一个线程，阶段间为有界队列
+import logging
+import queue
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+from app.table.upload.csv_processor import CSVProcessor
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 上游阶段结束标记
+_DONE = object()
+# 等待队列时检查停止信号的间隔（秒）
+_POLL_SECONDS = 0.1
+
+STAGE_LABELS = {'read': '读取', 'prepare': '准备', 'load': '写入'}
+
+
+class StageStats:
+    """单个阶段的计数（只由本阶段线程写入）
+
+    busy: 本阶段工作耗时；idle: 等待上游队列的耗时；blocked: 下游队列已满的等待耗时
+    rows_per_second 按 busy 计算，是该阶段单独运行时的处理能力，最低的阶段即瓶颈
+    """
+
+    def __init__(self):
+        self.chunks = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+
+    def record(self, rows: int, seconds: float) -> None:
+        self.chunks += 1
+        self.rows += rows
+        self.busy += seconds
+
+    def snapshot(self) -> dict:
+        return {
+            'chunks': self.chunks,
+            'rows': self.rows,
+            'busy_seconds': round(self.busy, 2),
+            'idle_seconds': round(self.idle, 2),
+            'blocked_seconds': round(self.blocked, 2),
+            'rows_per_second': round(self.rows / self.busy) if self.busy > 0 else 0,
+        }
+
+
+class ImportPipeline:
+    """读取（pandas 解析）、准备（整列转换生成写入参数）、写入（UPSERT / COPY）重叠执行
+
+    - 阶段间队列容量为 queue_size 块，写入较慢时读取和准备最多领先 2 * queue_size 块，内存占用有上限
+    - 写入线程使用独立的数据库会话（session_factory），调用方的会话只用于更新进度
+    - 任一阶段出错时其余阶段停止，run() 在调用线程中重新抛出该异常
+    """
+
+    STAGES = ('read', 'prepare', 'load')
+
+    def __init__(
+            self, processor: CSVProcessor, session_factory: Callable,
+            queue_size: int = settings.IMPORT_PIPELINE_QUEUE_SIZE
+    ):
+        self.processor = processor
+        self.session_factory = session_factory
+        # 键为消费该队列的阶段
+        self.queues: Dict[str, queue.Queue] = {
+            'prepare': queue.Queue(maxsize=queue_size),
+            'load': queue.Queue(maxsize=queue_size),
+        }
+        self.max_depth = {name: 0 for name in self.queues}
+        self.stats = {stage: StageStats() for stage in self.STAGES}
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self._started_at: Optional[float] = None
+
+    def run(
+            self, file_path: str, headers: Optional[List[str]], report_date: date, data_type: str,
+            on_progress: Optional[Callable[[dict], None]] = None, progress_interval: float = 2.0
+    ) -> int:
+        """执行导入，返回写入行数；on_progress 在调用线程中每 progress_interval 秒收到一次 metrics()"""
+        self._started_at = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._run_stage, args=(self._read, file_path, headers),
+                             name='import-read', daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._prepare, report_date, data_type),
+                             name='import-prepare', daemon=True),
+            threading.Thread(target=self._run_stage, args=(self._load, report_date, data_type),
+                             name='import-load', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            while any(thread.is_alive() for thread in threads):
+                threads[-1].join(timeout=progress_interval)
+                if on_progress and threads[-1].is_alive():
+                    on_progress(self.metrics())
+        finally:
+            # 调用线程异常退出（如进度回调出错）时同样让各阶段停止
+            if any(thread.is_alive() for thread in threads):
+                self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats['load'].rows
+
+    def metrics(self) -> dict:
+        """各阶段吞吐和队列深度（可 JSON 序列化，写入 ImportBatchRecords.stage_metrics）"""
+        stages = {stage: stats.snapshot() for stage, stats in self.stats.items()}
+        busiest = max(self.STAGES, key=lambda stage: self.stats[stage].busy)
+        return {
+            'elapsed_seconds': round(time.perf_counter() - self._started_at, 1) if self._started_at else 0,
+            'stages': stages,
+            'queues': {
+                name: {'depth': q.qsize(), 'max_depth': self.max_depth[name], 'capacity': q.maxsize}
+                for name, q in self.queues.items()
+            },
+            'bottleneck': busiest if self.stats[busiest].busy > 0 else None,
+        }
+
+    # ==================== 阶段 ====================
+
+    def _run_stage(self, target: Callable, *args) -> None:
+        try:
+            target(*args)
+        except BaseException as e:
+            logger.error(f"导入流水线 {threading.current_thread().name} 失败: {e}")
+            self._errors.append(e)
+            self._stop.set()
+
+    def _read(self, file_path: str, headers: Optional[List[str]]) -> None:
+        stats = self.stats['read']
+        chunks = self.processor.read_csv_chunks(file_path, headers)
+        try:
+            while True:
+                started = time.perf_counter()
+                chunk_df = next(chunks, None)
+                if chunk_df is None:
+                    break
+                stats.record(len(chunk_df), time.perf_counter() - started)
+                if not self._put('prepare', chunk_df, stats):
+                    return
+        finally:
+            chunks.close()
+        self._put('prepare', _DONE, stats)
+
+    def _prepare(self, report_date: date, data_type: str) -> None:
+        stats = self.stats['prepare']
+        while True:
+            chunk_df = self._get('prepare', stats)
+            if chunk_df is _DONE:
+                break
+            started = time.perf_counter()
+            prepared = self.processor.prepare_chunk(chunk_df, report_date, data_type)
+            stats.record(prepared.rows, time.perf_counter() - started)
+            if not self._put('load', prepared, stats):
+                return
+        self._put('load', _DONE, stats)
+
+    def _load(self, report_date: date, data_type: str) -> None:
+        stats = self.stats['load']
+        with self.session_factory() as db_session:
+            while True:
+                prepared = self._get('load', stats)
+                if prepared is _DONE:
+                    return
+                started = time.perf_counter()
+                processed = self.processor.load_prepared(prepared, report_date, data_type, db_session)
+                stats.record(processed, time.perf_counter() - started)
+
+    # ==================== 队列 ====================
+
+    def _put(self, name: str, item, stats: StageStats) -> bool:
+        """放入下游队列（队列满时等待），其他阶段出错时返回 False"""
+        q = self.queues[name]
+        started = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            stats.blocked += time.perf_counter() - started
+            self.max_depth[name] = max(self.max_depth[name], q.qsize())
+            return True
+        return False
+
+    def _get(self, name: str, stats: StageStats):
+        """从上游队列取出（队列空时等待），其他阶段出错时返回 _DONE"""
+        q = self.queues[name]
+        started = time.perf_counter()
+        while not self._stop.is_set():
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                continue
+            stats.idle += time.perf_counter() - started
+            return item
+        return _DONE
+
+
+def format_stage_metrics(metrics: Optional[dict]) -> str:
+    """状态列表中的一行摘要，如：读取 52k/s · 准备 40k/s · 写入 9k/s（瓶颈: 写入）| 队列 2/2 · 2/2"""
+    if not metrics:
+        return ''
+    stages = ' · '.join(
+        f"{STAGE_LABELS[stage]} {values['rows_per_second'] / 1000:.1f}k/s"
+        for stage, values in metrics['stages'].items()
+    )
+    bottleneck = metrics.get('bottleneck')
+    if bottleneck:
+        stages += f"（瓶颈: {STAGE_LABELS[bottleneck]}）"
+    queues = ' · '.join(f"{values['depth']}/{values['capacity']}" for values in metrics['queues'].values())
+    return f"{stages} | 队列 {queues}"
@@ -0,0 +1,232 @@
+# app/table/upload/import_worker_pool.py - 常驻导入进程池：应用启动时创建，工作进程保持预热的数据库连接和 CSVProcessor
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# 工作进程内常驻的处理器（由 _init_worker 创建）
+_worker_processor = None
+
+# 保留最近的分片耗时用于统计
+LATENCY_WINDOW = 1000
+# 队列已满时检查空位的间隔（秒）
+SLOT_POLL_SECONDS = 0.05
+
+
+def _init_worker() -> None:
+    """工作进程初始化：丢弃从父进程继承的连接，预热连接池并预加载处理器"""
+    global _worker_processor
+    from sqlalchemy import text
+    from database import engine
+    from app.table.upload.csv_processor import CSVProcessor
+
+    # fork 继承的连接不能跨进程共享，只丢弃引用不关闭（父进程仍在使用）
+    engine.dispose(close=False)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    _worker_processor = CSVProcessor(batch_size=settings.BATCH_SIZE)
+    logger.info(f"导入工作进程已就绪: pid={os.getpid()}")
+
+
+def _warmup_worker() -> int:
+    """空任务：启动时促使进程池拉起全部工作进程"""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def run_import_chunk(
+        file_path: str, start: int, end: int, headers: List[str],
+        report_date_str: str, data_type: str, chunk_id: int
+) -> dict:
+    """工作进程任务 - 直接读取原文件的 [start, end) 字节范围并写入数据库"""
+    started = time.perf_counter()
+    try:
+        from datetime import date
+        from database import SessionFactory
+
+        report_date = date.fromisoformat(report_date_str)
+        processed_count = 0
+
+        # 会话从本进程的常驻连接池取连接，任务之间复用
+        with SessionFactory() as db_session:
+            for chunk_df in _worker_processor.read_csv_chunks(file_path, headers, byte_range=(start, end)):
+                processed_count += _worker_processor.process_chunk_with_upsert(
+                    chunk_df, report_date, data_type, db_session
+                )
+
+        return {
+            'chunk_id': chunk_id, 'processed_count': processed_count, 'status': 'success',
+            'worker_pid': os.getpid(), 'seconds': time.perf_counter() - started
+        }
+
+    except Exception as e:
+        return {
+            'chunk_id': chunk_id, 'processed_count': 0, 'status': 'failed', 'error': str(e),
+            'worker_pid': os.getpid(), 'seconds': time.perf_counter() - started
+        }
+
+
+class ImportWorkerPool:
+    """常驻导入进程池 - 有界提交队列、优雅关闭、利用率和分片耗时统计
+
+    工作进程初始化失败或异常退出后进程池不可再用（BrokenProcessPool），此时丢弃进程池，下次提交分片时重新创建
+    """
+
+    def __init__(self, max_workers: int, queue_depth: int):
+        self.max_workers = max_workers
+        self.queue_depth = max(queue_depth, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 提交方可能来自不同线程/事件循环（后台任务用 asyncio.run），所以用线程信号量限流（等待方式见 _acquire_slot）
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._lock = threading.Lock()
+        self._started_at = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+    @property
+    def is_running(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> ProcessPoolExecutor:
+        """创建进程池并拉起全部工作进程（工作进程初始化失败时丢弃进程池并抛出异常）"""
+        with self._lock:
+            if self._executor is not None:
+                return self._executor
+            executor = self._executor = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker)
+            self._started_at = time.monotonic()
+
+        try:
+            pids = {f.result() for f in [executor.submit(_warmup_worker) for _ in range(self.max_workers)]}
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+        logger.info(f"导入进程池启动: {len(pids)}/{self.max_workers} 个工作进程, 队列深度 {self.queue_depth}")
+        return executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """优雅关闭：不再接收新任务，等待已提交分片完成"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+            logger.info("导入进程池已关闭")
+
+    async def run_chunk(
+            self, file_path: str, start: int, end: int, headers: List[str],
+            report_date_str: str, data_type: str, chunk_id: int
+    ) -> dict:
+        """提交一个分片；队列已满时等待空位（不阻塞事件循环）"""
+        with self._lock:
+            self._waiting += 1
+        try:
+            await self._acquire_slot()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        executor = None
+        try:
+            executor = self._executor or self.start()
+            future = executor.submit(
+                run_import_chunk, file_path, start, end, headers, report_date_str, data_type, chunk_id
+            )
+        except Exception as e:
+            self._slots.release()
+            if isinstance(e, BrokenProcessPool) and executor is not None:
+                self._discard(executor)
+            raise
+
+        with self._lock:
+            self._in_flight += 1
+            self._submitted += 1
+        future.add_done_callback(self._on_done)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """丢弃已损坏的进程池（并发分片同时失败时只处理一次），下次提交时由 start() 重新创建"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning("导入进程池已损坏（工作进程初始化失败或异常退出），下次提交分片时重新创建")
+
+    async def _acquire_slot(self) -> None:
+        """等待提交空位：非阻塞尝试 + asyncio.sleep 轮询
+
+        不在线程中阻塞等待（排队的分片不占用事件循环默认线程池）；等待期间被取消时尚未持有空位，不会丢失名额
+        """
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(SLOT_POLL_SECONDS)
+
+    def _on_done(self, future) -> None:
+        self._slots.release()
+        result = None if future.cancelled() or future.exception() else future.result()
+        with self._lock:
+            self._in_flight -= 1
+            if isinstance(result, dict) and result.get('status') == 'success':
+                self._completed += 1
+            else:
+                self._failed += 1
+            if isinstance(result, dict) and 'seconds' in result:
+                self._busy_seconds += result['seconds']
+                self._latencies.append(result['seconds'])
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """进程池状态：工作进程利用率、队列、分片耗时"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = time.monotonic() - self._started_at if self._executor else 0.0
+
+            def percentile(p: float) -> float:
+                if not latencies:
+                    return 0.0
+                return round(latencies[min(int(len(latencies) * p), len(latencies) - 1)], 3)
+
+            return {
+                'running': self._executor is not None,
+                'max_workers': self.max_workers,
+                'queue_depth': self.queue_depth,
+                'busy_workers': min(self._in_flight, self.max_workers),
+                'queued_chunks': max(self._in_flight - self.max_workers, 0),
+                'waiting_submits': self._waiting,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                # 累计忙碌时间 / (工作进程数 × 运行时长)
+                'utilization': round(self._busy_seconds / (self.max_workers * uptime), 3) if uptime > 0 else 0.0,
+                'chunk_latency_seconds': {
+                    'count': len(latencies),
+                    'avg': round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+                    'p50': percentile(0.5),
+                    'p95': percentile(0.95),
+                    'max': round(latencies[-1], 3) if latencies else 0.0,
+                },
+            }
+
+
+# 全局进程池实例（main.py lifespan 中启动和关闭）
+# 每个 uvicorn worker 进程各自创建一个进程池：导入工作进程总数 = uvicorn workers × MAX_WORKERS
+import_worker_pool = ImportWorkerPool(
+    max_workers=min(settings.MAX_WORKERS, os.cpu_count()),
+    queue_depth=settings.IMPORT_POOL_QUEUE_DEPTH,
+)
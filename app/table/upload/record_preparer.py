@@ -0,0 +1,109 @@
+# app/table/upload/record_preparer.py - 列式记录准备：整列转换替代 iterrows 逐行处理
+from datetime import datetime, date
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+# 商品信息字段（日/周数据共用，冲突时直接覆盖）
+PRODUCT_COLUMNS = [
+    'top_brand', 'top_category', 'top_product_asin', 'top_product_title',
+    'top_product_click_share', 'top_product_conversion_share',
+    'brand_2nd', 'category_2nd', 'product_asin_2nd', 'product_title_2nd',
+    'product_click_share_2nd', 'product_conversion_share_2nd',
+    'brand_3rd', 'category_3rd', 'product_asin_3rd', 'product_title_3rd',
+    'product_click_share_3rd', 'product_conversion_share_3rd',
+]
+FLOAT_PRODUCT_COLUMNS = {
+    'top_product_click_share', 'top_product_conversion_share',
+    'product_click_share_2nd', 'product_conversion_share_2nd',
+    'product_click_share_3rd', 'product_conversion_share_3rd',
+}
+
+
+def _prepare_series(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    """整列类型转换和默认值填充，规则与逐行 safe_get 一致，并过滤空关键词"""
+    if 'keyword' in df.columns:
+        keyword = df['keyword'].astype(str).str.strip()
+    else:
+        keyword = pd.Series('', index=df.index)
+
+    # 排名: int(float(x))，空值/无法解析/非有限值按0处理
+    if 'current_rangking_day' in df.columns:
+        ranking = pd.to_numeric(df['current_rangking_day'], errors='coerce').fillna(0)
+        ranking = np.trunc(ranking.where(np.isfinite(ranking), 0)).astype('int64')
+    else:
+        ranking = pd.Series(0, index=df.index, dtype='int64')
+
+    prepared = {'keyword': keyword, 'current_ranking': ranking}
+    for col in PRODUCT_COLUMNS:
+        if col not in df.columns:
+            prepared[col] = pd.Series(0.0 if col in FLOAT_PRODUCT_COLUMNS else '', index=df.index)
+        elif col in FLOAT_PRODUCT_COLUMNS:
+            prepared[col] = pd.to_numeric(df[col], errors='coerce').fillna(0.0).astype(float)
+        else:
+            prepared[col] = df[col].where(df[col].notna(), '').astype(str).str.strip()
+
+    # 逐列过滤而不是先拼 DataFrame，省去 object 块合并的开销
+    valid = (keyword != '').to_numpy()
+    if not valid.all():
+        prepared = {col: series[valid] for col, series in prepared.items()}
+    return {col: series.reset_index(drop=True) for col, series in prepared.items()}
+
+
+def prepare_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """整列类型转换和默认值填充，规则与逐行 safe_get 一致，并过滤空关键词
+
+    返回列: keyword, current_ranking, PRODUCT_COLUMNS
+    """
+    return pd.DataFrame(_prepare_series(df))
+
+
+def prepare_batch_records(df: pd.DataFrame, report_date: date, data_type: str, now: datetime) -> List[Dict[str, Any]]:
+    """把清洗后的数据块整列转换为 UPSERT 参数列表，结果与原逐行实现完全一致"""
+    columns = _prepare_series(df)
+    if len(columns['keyword']) == 0:
+        return []
+
+    # tolist() 直接得到 Python 原生类型（int/float/str）
+    ranking = columns['current_ranking'].tolist()
+    variable = {
+        'keyword': columns['keyword'].tolist(),
+        'current_ranking': ranking,
+    }
+    for col in PRODUCT_COLUMNS:
+        variable[col] = columns[col].tolist()
+
+    # 整批相同的常量字段，逐行 copy 后再 update 变量字段（比 dict(zip(...)) 构造快一个数量级）
+    constant = {
+        'created_at': now,
+        'updated_at': now,
+        'report_date': report_date,
+        'report_date_day': report_date,
+        'report_date_week': report_date,
+        'previous_rangking_day': 0,
+        'ranking_change_day': 0,
+        'previous_rangking_week': 0,
+        'ranking_change_week': 0,
+    }
+    if data_type == 'daily':
+        trend_prefix = '[{"date": "' + report_date.isoformat() + '", "ranking": '
+        variable['current_rangking_day'] = ranking
+        # 与 json.dumps([{"date": ..., "ranking": ...}]) 输出格式一致
+        variable['ranking_trend_day'] = (trend_prefix + columns['current_ranking'].astype(str) + '}]').tolist()
+        constant.update({'is_new_day': True, 'current_rangking_week': 0, 'is_new_week': False})
+    else:  # weekly
+        variable['current_rangking_week'] = ranking
+        constant.update({'is_new_week': True, 'current_rangking_day': 0, 'is_new_day': False,
+                         'ranking_trend_day': '[]'})
+
+    keys = list(variable.keys())
+    # 模板预先包含全部键，copy 后 update 只覆盖值，不触发字典扩容
+    template = dict.fromkeys(keys)
+    template.update(constant)
+    records = []
+    for values in zip(*variable.values()):
+        record = template.copy()
+        record.update(zip(keys, values))
+        records.append(record)
+    return records
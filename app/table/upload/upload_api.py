@@ -1,15 +1,18 @@
+import hashlib
 import logging
 import os
-import uuid
+import time
 import aiofiles
-import tempfile
 import asyncio
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
 from fastapi import APIRouter, UploadFile, File, Form, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 
+from app.table.upload.chunk_sessions import get_chunk_session_store, merge_parts
+from app.table.upload.import_pipeline import format_stage_metrics
 from app.table.upload.upload_schemas import ChunkStartRequest, FinishChunkRequest
 from database import SessionFactory
 from app.table.upload.upload_service import UploadService
@@ -19,9 +22,7 @@ import database
 logger = logging.getLogger(__name__)
 upload_router = APIRouter()
 
-# 分块上传状态管理（单用户场景无需锁）
-chunk_sessions: Dict[str, Dict[str, Any]] = {}
-
+# 分块上传会话存储在 Redis 或 CHUNK_UPLOAD_DIR 下的会话文件中（多个 worker 共享，重启后可续传），见 chunk_sessions.py
 # 单用户场景优化
 MAX_CONCURRENT_UPLOADS = 2  # 最多2个同时上传（防止误操作）
 upload_semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
@@ -66,50 +67,23 @@ def process_csv_background(file_path: str, original_filename: str, data_type: st
                 logger.error(f"清理文件失败: {cleanup_error}")
 
 
-async def _cleanup_chunk_session(session_key: str, delay: int = 300) -> None:
-    """延迟清理分块上传会话（默认5分钟后清理）"""
-    await asyncio.sleep(delay)
-    if session_key in chunk_sessions:
-        session = chunk_sessions.pop(session_key, None)
-        if session:
-            # 清理临时目录（防止merge失败遗留）
-            import shutil
-            temp_dir = session.get("temp_dir")
-            if temp_dir and os.path.exists(temp_dir):
-                try:
-                    shutil.rmtree(temp_dir)
-                except Exception as e:
-                    logger.warning(f"清理临时目录失败: {e}")
-        logger.info(f"已延迟清理会话: {session_key}")
-
-
 @upload_router.post("/startChunkApi")
 async def start_chunk_api(chunk: ChunkStartRequest) -> Dict[str, Any]:
     """AMIS分块上传 - 开始上传接口"""
     logger.info(f"收到AMIS分块上传请求 - filename: {chunk.filename}, data_type: {chunk.data_type}")
 
-    if len(chunk_sessions) >= MAX_CONCURRENT_UPLOADS:
+    store = get_chunk_session_store()
+    # 顺带清理超时未完成的会话；并发数只统计最近 CHUNK_SESSION_IDLE_SECONDS 内有活动的会话
+    store.purge_expired()
+    if store.active_count() >= MAX_CONCURRENT_UPLOADS:
         return {"status": 1, "msg": "已有上传任务进行中，请稍后"}
 
-    # 生成唯一标识
-    upload_id = str(uuid.uuid4())
-    key = f"{uuid.uuid4().hex}_{chunk.filename}"
-    temp_dir = tempfile.mkdtemp(prefix="amis_chunk_")
-
-    # 保存会话信息
-    chunk_sessions[key] = {
-        "upload_id": upload_id,
-        "filename": chunk.filename,
-        "data_type": chunk.data_type,
-        "temp_dir": temp_dir,
-        "chunks": {},
-    }
-
-    logger.info(f"AMIS分块上传会话创建: key={key}, upload_id={upload_id}")
+    session = store.create(chunk.filename, chunk.data_type)
+    logger.info(f"AMIS分块上传会话创建: key={session['key']}, upload_id={session['upload_id']}, 存储={store.backend}")
 
     return {
         "status": 0,
-        "data": {"key": key, "uploadId": upload_id, "date": datetime.now().isoformat()},
+        "data": {"key": session["key"], "uploadId": session["upload_id"], "date": datetime.now().isoformat()},
         "msg": "分块上传会话创建成功"
     }
 
@@ -118,10 +92,12 @@ async def start_chunk_api(chunk: ChunkStartRequest) -> Dict[str, Any]:
 async def chunk_api(
         key: str = Form(..., description="上传会话key"),
         partNumber: str = Form(..., description="分块序号"),
-        file: UploadFile = File(..., description="分块文件")
+        file: UploadFile = File(..., description="分块文件"),
+        partHash: Optional[str] = Form(None, description="分块 MD5（可选，与已收到的分块相同时跳过写入）")
 ) -> Dict[str, Any]:
-    """AMIS分块上传 - 上传分块接口"""
-    session = chunk_sessions.get(key)
+    """AMIS分块上传 - 上传分块接口（幂等：重复上传相同内容的分块直接返回成功，响应中的 eTag 为分块 MD5）"""
+    store = get_chunk_session_store()
+    session = store.get(key)
     if not session:
         return {"status": 1, "msg": "无效的上传会话key"}
 
@@ -132,38 +108,61 @@ async def chunk_api(
     part_num = int(partNumber)
     logger.info(f"收到分块上传: key={key}, partNumber={part_num}")
 
-    # 保存分块文件
-    chunk_filename = f"part_{part_num:04d}.chunk"
-    chunk_path = os.path.join(session["temp_dir"], chunk_filename)
+    existing = store.parts(key).get(part_num)
+    if partHash and existing and existing["md5"] == partHash.lower():
+        logger.info(f"分块 {part_num} 已存在，跳过: key={key}")
+        return {"status": 0, "msg": "分块已存在", "data": {"partNumber": part_num, "key": key, "eTag": existing["md5"]}}
 
+    # 先写临时文件并计算 MD5，完成后原子改名为分块文件
+    temp_path = store.temp_part_path(key, part_num)
+    digest = hashlib.md5()
     chunk_size = 0
-    async with aiofiles.open(chunk_path, 'wb') as f:
+    async with aiofiles.open(temp_path, 'wb') as f:
         while upload_chunk := await file.read(65536):
             await f.write(upload_chunk)
+            digest.update(upload_chunk)
             chunk_size += len(upload_chunk)
 
-    # 记录分块信息
-    session["chunks"][part_num] = {
-        "path": chunk_path,
-        "size": chunk_size,
-        "uploaded_at": datetime.now()
-    }
+    md5 = digest.hexdigest()
+    written = store.commit_part(key, part_num, temp_path, chunk_size, md5)
+    logger.info(f"分块 {part_num} {'上传完成' if written else '重复上传，已跳过'}, key={key}, size={chunk_size}")
+
+    return {"status": 0, "msg": "分块上传成功", "data": {"partNumber": part_num, "key": key, "eTag": md5}}
+
 
-    logger.info(f"分块 {part_num} 上传完成, key={key}, size={chunk_size}")
+@upload_router.get("/chunkParts")
+async def chunk_parts(key: str) -> Dict[str, Any]:
+    """续传：返回会话已收到的分块（客户端只需补传缺少的分块，再调用 finishChunkApi）"""
+    store = get_chunk_session_store()
+    session = store.get(key)
+    if not session:
+        return {"status": 1, "msg": "无效的上传会话key"}
 
-    return {"status": 0, "msg": "分块上传成功", "data": {"partNumber": part_num, "key": key}}
+    parts = [
+        {"partNumber": record["partNumber"], "size": record["size"], "eTag": record["md5"]}
+        for record in sorted(store.parts(key).values(), key=lambda record: record["partNumber"])
+    ]
+    return {
+        "status": 0,
+        "data": {
+            "key": key,
+            "uploadId": session["upload_id"],
+            "filename": session["filename"],
+            "locked": session["locked"],
+            "parts": parts
+        }
+    }
 
 
 def merge_chunks_and_process(
         session_key: str,
         session_data: Dict[str, Any],
-        _: FinishChunkRequest = None
+        part_numbers: List[int]
 ) -> None:
     """后台任务：合并分块文件并处理CSV"""
-    import shutil
-    temp_dir = session_data.get("temp_dir")
+    store = get_chunk_session_store()
     try:
-        logger.info(f"开始后台合并分块文件: key={session_key}, 分块数量={len(session_data['chunks'])}")
+        logger.info(f"开始后台合并分块文件: key={session_key}, 分块数量={len(part_numbers)}")
 
         # 创建最终文件路径
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -172,22 +171,22 @@ def merge_chunks_and_process(
         upload_dir.mkdir(parents=True, exist_ok=True)
         final_path = upload_dir / final_filename
 
-        # 按序号合并分块文件
-        total_size = 0
-        with open(final_path, 'wb') as outfile:
-            sorted_parts = sorted(session_data["chunks"].items())
-            for part_num, chunk_info in sorted_parts:
-                chunk_path = chunk_info["path"]
-                if os.path.exists(chunk_path):
-                    with open(chunk_path, 'rb') as chunk_file:
-                        chunk_data = chunk_file.read()
-                        outfile.write(chunk_data)
-                        total_size += len(chunk_data)
-                else:
-                    logger.error(f"分块文件不存在: {chunk_path}")
-                    return
-
-        logger.info(f"文件合并完成: {final_filename}, 总大小: {total_size / 1024 / 1024:.2f}MB")
+        # 按序号合并分块文件（copy 模式由内核拼接，不把分块读入内存，拼接完的分块立即删除）
+        part_paths = [store.part_path(session_key, part_num) for part_num in sorted(part_numbers)]
+        missing = [str(path) for path in part_paths if not path.exists()]
+        if missing:
+            logger.error(f"分块文件不存在: {missing[:5]}")
+            return
+
+        merge_start = time.perf_counter()
+        try:
+            total_size = merge_parts(part_paths, final_path, settings.CHUNK_MERGE_MODE)
+        except Exception:
+            final_path.unlink(missing_ok=True)
+            raise
+
+        logger.info(f"文件合并完成: {final_filename}, 总大小: {total_size / 1024 / 1024:.2f}MB, "
+                    f"耗时: {time.perf_counter() - merge_start:.1f}s（{settings.CHUNK_MERGE_MODE}）")
 
         # 触发CSV处理
         process_csv_background(str(final_path), session_data['filename'], session_data['data_type'])
@@ -195,15 +194,10 @@ def merge_chunks_and_process(
     except Exception as e:
         logger.error(f"后台合并处理失败: {e}", exc_info=True)
     finally:
-        # 清理临时目录
+        # 删除会话和临时目录
         try:
-            if temp_dir and os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-
-                # 从全局字典中删除会话
-                chunk_sessions.pop(session_key, None)
-                
-                logger.info(f"已清理临时目录: {temp_dir}")
+            store.delete(session_key)
+            logger.info(f"已清理分块上传会话: {session_key}")
         except Exception as e:
             logger.warning(f"清理临时目录失败: {e}")
 
@@ -213,38 +207,47 @@ async def finish_chunk_api(
         background_tasks: BackgroundTasks,
         finish_chunk: FinishChunkRequest,
 ) -> Dict[str, Any]:
-    """AMIS分块上传 - 完成上传接口（后台合并，避免504超时）"""
-    session = chunk_sessions.get(finish_chunk.key)
+    """AMIS分块上传 - 完成上传接口（后台合并，避免504超时；重复调用只合并一次）"""
+    store = get_chunk_session_store()
+    session = store.get(finish_chunk.key)
     if not session:
         return {"status": 1, "msg": "无效的上传会话key"}
 
-    # 验证分块完整性
+    # 验证分块完整性（partList 带 eTag 时同时校验内容）
+    received = store.parts(finish_chunk.key)
     expected = len(finish_chunk.partList)
-    actual = len(session["chunks"])
-    if actual < expected:
-        logger.warning(f"分块不完整: {actual}/{expected}, key={finish_chunk.key}")
-        return {"status": 1, "msg": f"分块未完成: {actual}/{expected}"}
-
-    # 标记会话为已锁定，拒绝新分块
-    session["locked"] = True
-    session_copy = session.copy()
-
-    # 后台合并
-    background_tasks.add_task(merge_chunks_and_process, finish_chunk.key, session_copy)
-
-    # 延迟删除会话（5分钟后）
-    # background_tasks.add_task(_cleanup_chunk_session, finish_chunk.key, 300)
+    missing = [
+        part.partNumber for part in finish_chunk.partList
+        if part.partNumber not in received or (part.eTag and part.eTag.strip('"').lower() != received[part.partNumber]["md5"])
+    ]
+    if missing:
+        logger.warning(f"分块不完整: {expected - len(missing)}/{expected}, key={finish_chunk.key}")
+        return {
+            "status": 1,
+            "msg": f"分块未完成: {expected - len(missing)}/{expected}",
+            "data": {"missingParts": missing[:100]}
+        }
 
-    return {
+    result = {
         "status": 0,
         "msg": "文件上传成功，正在后台处理",
         "data": {
-            "filename": session_copy['filename'],
-            "chunks_count": actual,
+            "filename": session['filename'],
+            "chunks_count": expected,
             "status": "processing"
         }
     }
 
+    # 标记会话为已锁定，拒绝新分块；已锁定时说明合并已在进行（重复提交），直接返回
+    if not store.finish(finish_chunk.key):
+        logger.info(f"会话已提交合并，忽略重复请求: {finish_chunk.key}")
+        return result
+
+    # 后台合并
+    part_numbers = [part.partNumber for part in finish_chunk.partList]
+    background_tasks.add_task(merge_chunks_and_process, finish_chunk.key, session, part_numbers)
+    return result
+
 
 # 保持原有的传统上传接口和状态查询接口不变
 @upload_router.post("/upload-csv")
@@ -302,7 +305,7 @@ async def get_processing_status(data_type: Optional[str] = None) -> Dict[str, An
     """获取处理状态"""
     async with database.AsyncSessionFactory() as db:
         try:
-            from app.table.upload.import_model import ImportBatchRecords
+            from app.table.upload.import_model import ImportBatchRecords, import_stage_metrics
             from sqlalchemy import desc, select
 
             stmt = select(ImportBatchRecords)
@@ -315,21 +318,36 @@ async def get_processing_status(data_type: Optional[str] = None) -> Dict[str, An
             result = await db.execute(stmt)
             records = list(result.scalars().all())
 
+            # 阶段指标列来自可选的 010 迁移，仅在开启流水线时单独查询
+            stage_metrics = {}
+            if settings.IMPORT_PIPELINE and records:
+                metrics_result = await db.execute(
+                    select(import_stage_metrics.c.id, import_stage_metrics.c.stage_metrics)
+                    .where(import_stage_metrics.c.id.in_([r.id for r in records]))
+                )
+                stage_metrics = dict(metrics_result.all())
+
             items = []
             for r in records:
                 progress = round((r.processed_keywords / max(r.total_records, 1)) * 100, 1)
-                items.append({
+                item = {
                     "batch_name": r.batch_name,
                     "progress_percent": progress,
                     "total_records": r.total_records,
                     "status": "处理中" if r.status.value == 'PROCESSING' else r.status.value
-                })
+                }
+                if settings.IMPORT_PIPELINE:
+                    item["stage_metrics"] = stage_metrics.get(r.id)
+                    item["stage_summary"] = format_stage_metrics(stage_metrics.get(r.id))
+                items.append(item)
 
+            # 会话存储为同步调用（文件 / Redis），在线程池中执行，不阻塞事件循环
+            active_sessions = await run_in_threadpool(get_chunk_session_store().active_count)
             return {
                 "status": 0,
                 "data": {
                     "items": items,
-                    "active_sessions": len(chunk_sessions)
+                    "active_sessions": active_sessions
                 }
             }
 
@@ -341,10 +359,12 @@ async def get_processing_status(data_type: Optional[str] = None) -> Dict[str, An
 @upload_router.get("/concurrent-status")
 async def get_concurrent_status() -> Dict[str, Any]:
     """获取上传会话状态"""
+    store = get_chunk_session_store()
     return {
         "status": 0,
         "data": {
-            "active_chunk_sessions": len(chunk_sessions),
-            "chunk_session_keys": list(chunk_sessions.keys())[:10]  # 只返回前10个key用于调试
+            "active_chunk_sessions": await run_in_threadpool(store.active_count),
+            "chunk_session_keys": await run_in_threadpool(store.active_keys, 10),  # 只返回前10个key用于调试
+            "store": store.backend
         }
     }
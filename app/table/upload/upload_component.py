@@ -102,7 +102,10 @@ class UploadComponent:
                                 {"name": "progress_percent", "label": "进度", "type": "progress", "width": 150},
                                 {"name": "total_records", "label": "总记录数", "width": 100},
                                 {"name": "status", "label": "状态", "width": 100}
-                            ],
+                            ] + ([
+                                # 导入流水线各阶段吞吐和队列深度
+                                {"name": "stage_summary", "label": "导入阶段"}
+                            ] if config.settings.IMPORT_PIPELINE else []),
                             "placeholder": "暂无处理任务"
                         }
                     }
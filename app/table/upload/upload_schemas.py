@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import List
+from typing import List, Optional
 
 
 class ChunkStartRequest(BaseModel):
@@ -9,6 +9,7 @@ class ChunkStartRequest(BaseModel):
 
 class Part(BaseModel):
     partNumber: int = Field(..., description="分块编号")
+    eTag: Optional[str] = Field(None, description="chunkApi 返回的分块 MD5（可选，提供时校验分块内容）")
 
 
 class FinishChunkRequest(BaseModel):
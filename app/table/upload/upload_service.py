@@ -2,60 +2,29 @@ import asyncio
 import logging
 import os
 import re
-import tempfile
-from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple, Optional, List
 from datetime import datetime, date
 from pathlib import Path
 from sqlalchemy.orm import Session
-from sqlalchemy import select
-
-from app.table.upload.import_model import ImportBatchRecords, StatusEnum
-from app.table.upload.csv_processor import CSVProcessor, validate_csv_structure
+from sqlalchemy import select, update
+
+from app.table.upload.import_model import ImportBatchRecords, StatusEnum, import_stage_metrics
+from app.table.upload.csv_processor import CSVProcessor
+from app.table.upload.file_inspector import CSVFileInspector
+from app.table.upload.import_worker_pool import import_worker_pool
+from app.table.upload.import_pipeline import ImportPipeline
+from app.table.upload.import_hooks import on_import_started, on_import_finished
 from config import settings
 
 logger = logging.getLogger(__name__)
 
 
-def _process_chunk_worker(chunk_file: str, report_date_str: str, data_type: str, chunk_id: int) -> dict:
-    """独立工作进程 - 处理单个分片文件"""
-    try:
-        from datetime import date
-        from database import SessionFactory
-        from app.table.upload.csv_processor import CSVProcessor
-
-        report_date = date.fromisoformat(report_date_str)
-        processor = CSVProcessor(batch_size=settings.BATCH_SIZE)
-        processed_count = 0
-
-        # 独立数据库会话
-        with SessionFactory() as db_session:
-            for chunk_df in processor.read_csv_chunks(chunk_file):
-                chunk_processed = processor.process_chunk_with_upsert(
-                    chunk_df, report_date, data_type, db_session
-                )
-                processed_count += chunk_processed
-
-        # 清理分片文件
-        if os.path.exists(chunk_file):
-            os.unlink(chunk_file)
-
-        return {'chunk_id': chunk_id, 'processed_count': processed_count, 'status': 'success'}
-
-    except Exception as e:
-        # 确保清理文件
-        if os.path.exists(chunk_file):
-            os.unlink(chunk_file)
-        return {'chunk_id': chunk_id, 'processed_count': 0, 'status': 'failed', 'error': str(e)}
-
-
 class UploadService:
     """CSV文件上传处理服务"""
 
     def __init__(self, db: Session):
         self.db = db
         self.csv_processor = CSVProcessor(batch_size=settings.BATCH_SIZE)
-        self.max_workers = min(settings.MAX_WORKERS, os.cpu_count())
         self.multiprocess_threshold = settings.MULTIPROCESSING_THRESHOLD_MB * 1024 * 1024
 
     async def process_csv_file(
@@ -63,8 +32,9 @@ class UploadService:
     ) -> Tuple[bool, str, Optional[ImportBatchRecords]]:
         """选择处理策略：大文件多进程，小文件单线程"""
 
-        # 1. 验证文件结构
-        is_valid, validation_message = validate_csv_structure(file_path)
+        # 1. 验证文件结构（只读取文件头，检查结果在后续步骤中复用）
+        inspector = CSVFileInspector(file_path)
+        is_valid, validation_message = inspector.validate()
         if not is_valid:
             return False, validation_message, None
 
@@ -76,13 +46,14 @@ class UploadService:
 
         if file_size >= self.multiprocess_threshold:
             logger.info(f"使用多进程处理大文件: {file_size_mb:.1f}MB")
-            return await self._process_with_multiprocessing(file_path, original_filename, data_type)
+            return await self._process_with_multiprocessing(file_path, original_filename, data_type, inspector)
         else:
             logger.info(f"使用单线程处理小文件: {file_size_mb:.1f}MB")
-            return await self._process_with_single_thread(file_path, original_filename, data_type)
+            return await self._process_with_single_thread(file_path, original_filename, data_type, inspector)
 
     async def _process_with_single_thread(
-            self, file_path: str, original_filename: str, data_type: str
+            self, file_path: str, original_filename: str, data_type: str,
+            inspector: Optional[CSVFileInspector] = None
     ) -> Tuple[bool, str, Optional[ImportBatchRecords]]:
         """单线程处理小文件"""
         batch_record = None
@@ -91,9 +62,11 @@ class UploadService:
             report_date = self._extract_date_from_filename(original_filename)
             if not report_date:
                 return False, "无法从文件名中解析出日期", None
+            on_import_started(report_date)
 
             # 获取文件信息
-            file_info = self.csv_processor.get_file_info(file_path)
+            inspector = inspector or CSVFileInspector(file_path)
+            file_info = self.csv_processor.get_file_info(file_path, inspector)
 
             # 创建导入批次记录
             batch_record = self._create_batch_record(
@@ -104,8 +77,9 @@ class UploadService:
             logger.info(f"开始单线程处理: {original_filename}, 预估记录数: {file_info['estimated_records']}")
 
             # 处理CSV文件（内部已原子化：数据处理+状态标记在同一事务）
-            success, message = await self._process_csv_with_upsert(
-                file_path, batch_record, report_date, data_type
+            process = self._process_csv_with_pipeline if settings.IMPORT_PIPELINE else self._process_csv_with_upsert
+            success, message = await process(
+                file_path, batch_record, report_date, data_type, inspector.headers
             )
 
             if success:
@@ -120,11 +94,11 @@ class UploadService:
             return False, f"文件处理失败: {str(e)}", batch_record
 
     async def _process_with_multiprocessing(
-            self, file_path: str, original_filename: str, data_type: str
+            self, file_path: str, original_filename: str, data_type: str,
+            inspector: Optional[CSVFileInspector] = None
     ) -> Tuple[bool, str, Optional[ImportBatchRecords]]:
         """多进程处理大文件"""
         batch_record = None
-        temp_dir = None
         start_time = datetime.now()
         processing_done = asyncio.Event()  # 协调监控任务退出
 
@@ -133,42 +107,42 @@ class UploadService:
             report_date = self._extract_date_from_filename(original_filename)
             if not report_date:
                 return False, "无法解析文件日期", None
+            on_import_started(report_date)
 
-            file_info = self.csv_processor.get_file_info(file_path)
+            inspector = inspector or CSVFileInspector(file_path)
+            file_info = self.csv_processor.get_file_info(file_path, inspector)
             batch_record = self._create_batch_record(
                 original_filename, report_date, file_info['estimated_records'],
                 data_type == 'daily', data_type == 'weekly'
             )
 
-            # 2. 文件分片
-            temp_dir = tempfile.mkdtemp(prefix="upload_")
-            chunk_files = await self._split_file_by_lines(file_path, temp_dir, settings.FILE_SPLIT_LINES)
-            logger.info(f"文件分片完成: {len(chunk_files)} 个分片")
-
-            # 3. 并行处理
-            loop = asyncio.get_event_loop()
-            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
-                tasks = [
-                    loop.run_in_executor(executor, _process_chunk_worker, chunk_file, str(report_date), data_type, i)
-                    for i, chunk_file in enumerate(chunk_files)
-                ]
-
-                # 启动进度监控（传递 Event 用于协调退出）
-                monitor_task = asyncio.create_task(
-                    self._monitor_progress(batch_record, start_time, processing_done)
-                )
+            # 2. 文件分片（按换行对齐的字节范围，工作进程直接读取原文件）
+            byte_ranges = inspector.plan_byte_ranges(settings.FILE_SPLIT_LINES)
+            headers = inspector.headers
+            logger.info(f"文件分片完成: {len(byte_ranges)} 个分片")
+
+            # 3. 并行处理（常驻进程池，工作进程已预热数据库连接）
+            tasks = [
+                import_worker_pool.run_chunk(file_path, start, end, headers, str(report_date), data_type, i)
+                for i, (start, end) in enumerate(byte_ranges)
+            ]
+
+            # 启动进度监控（传递 Event 用于协调退出）
+            monitor_task = asyncio.create_task(
+                self._monitor_progress(batch_record, start_time, processing_done)
+            )
+            try:
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                # 通知监控任务停止并等待
+                processing_done.set()
                 try:
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                finally:
-                    # 通知监控任务停止并等待
-                    processing_done.set()
-                    try:
-                        await asyncio.wait_for(monitor_task, timeout=10.0)
-                    except asyncio.TimeoutError:
-                        logger.warning("监控任务超时，强制取消")
-                        monitor_task.cancel()
-                    except Exception as e:
-                        logger.warning(f"监控任务异常: {e}")
+                    await asyncio.wait_for(monitor_task, timeout=10.0)
+                except asyncio.TimeoutError:
+                    logger.warning("监控任务超时，强制取消")
+                    monitor_task.cancel()
+                except Exception as e:
+                    logger.warning(f"监控任务异常: {e}")
 
             # 4. 统计结果
             total_processed = sum(r.get('processed_count', 0) for r in results if isinstance(r, dict))
@@ -205,6 +179,10 @@ class UploadService:
 
                     fresh_db.commit()
 
+            # 分片部分失败时已成功的分片同样写入了数据
+            if total_processed > 0:
+                on_import_finished()
+
             return success, message, batch_record
 
         except Exception as e:
@@ -213,13 +191,9 @@ class UploadService:
                 self._update_batch_record_error(batch_record, str(e))
             return False, str(e), batch_record
 
-        finally:
-            # 清理临时目录
-            if temp_dir and os.path.exists(temp_dir):
-                await self._cleanup_temp_dir(temp_dir)
-
     async def _process_csv_with_upsert(
-            self, file_path: str, batch_record: ImportBatchRecords, report_date: date, data_type: str
+            self, file_path: str, batch_record: ImportBatchRecords, report_date: date, data_type: str,
+            headers: Optional[List[str]] = None
     ) -> Tuple[bool, str]:
         """单线程去重处理CSV文件 - 原子化：数据处理+状态标记在同一事务"""
         try:
@@ -228,7 +202,7 @@ class UploadService:
 
             # 分块读取和处理
             chunk_count = 0
-            for chunk_df in self.csv_processor.read_csv_chunks(file_path):
+            for chunk_df in self.csv_processor.read_csv_chunks(file_path, headers):
                 chunk_processed = self.csv_processor.process_chunk_with_upsert(
                     chunk_df, report_date, data_type, self.db
                 )
@@ -261,6 +235,7 @@ class UploadService:
             batch_record.status = StatusEnum.COMPLETED
             batch_record.completed_at = datetime.now()
             self.db.commit()
+            on_import_finished()
 
             logger.info(f"处理完成，总记录数: {processed_count}, 总耗时: {final_processing_time}秒")
             return True, f"处理成功 {processed_count} 条记录，耗时 {final_processing_time} 秒"
@@ -269,41 +244,48 @@ class UploadService:
             logger.error(f"处理失败: {e}")
             return False, f"处理失败: {str(e)}"
 
-    async def _split_file_by_lines(self, file_path: str, temp_dir: str, lines_per_chunk: int) -> List[str]:
-        """按行数 分片文件"""
-        chunk_files = []
-
-        with open(file_path, 'r', encoding='utf-8') as source:
-            # 保存头部
-            headers = [source.readline(), source.readline()]
-
-            chunk_id = 0
-            current_lines = 0
-            chunk_file = None
+    async def _process_csv_with_pipeline(
+            self, file_path: str, batch_record: ImportBatchRecords, report_date: date, data_type: str,
+            headers: Optional[List[str]] = None
+    ) -> Tuple[bool, str]:
+        """流水线处理CSV文件：读取、准备、写入三个线程重叠执行，进度和各阶段指标定期写入批次记录"""
+        try:
+            from database import SessionFactory
+            start_time = datetime.now()
+            pipeline = ImportPipeline(self.csv_processor, SessionFactory)
 
-            for line in source:
-                # 创建新分片
-                if chunk_file is None:
-                    chunk_path = os.path.join(temp_dir, f"chunk_{chunk_id:03d}.csv")
-                    chunk_file = open(chunk_path, 'w', encoding='utf-8')
-                    chunk_file.writelines(headers)
-                    chunk_files.append(chunk_path)
-                    current_lines = 0
+            def report_progress(metrics: dict):
+                batch_record.processed_keywords = metrics['stages']['load']['rows']
+                batch_record.processing_seconds = int((datetime.now() - start_time).total_seconds())
+                try:
+                    self._save_stage_metrics(batch_record, metrics)
+                    self.db.commit()
+                except Exception as e:
+                    logger.warning(f"_process_csv_with_pipeline:更新进度失败: {e}")
 
-                chunk_file.write(line)
-                current_lines += 1
+            processed_count = pipeline.run(file_path, headers, report_date, data_type, on_progress=report_progress)
 
-                # 检查是否需要切换分片
-                if current_lines >= lines_per_chunk:
-                    chunk_file.close()
-                    chunk_file = None
-                    chunk_id += 1
+            # 最终原子化更新：记录数 + 状态 + 时间 + 阶段指标
+            metrics = pipeline.metrics()
+            batch_record.processed_keywords = processed_count
+            batch_record.total_records = processed_count
+            final_processing_time = int((datetime.now() - start_time).total_seconds())
+            batch_record.processing_seconds = final_processing_time
+            self._save_stage_metrics(batch_record, metrics)
+            batch_record.status = StatusEnum.COMPLETED
+            batch_record.completed_at = datetime.now()
+            self.db.commit()
+            on_import_finished()
 
-            # 关闭最后一个文件
-            if chunk_file:
-                chunk_file.close()
+            stages = ', '.join(
+                f"{stage} {values['rows_per_second']}行/秒" for stage, values in metrics['stages'].items()
+            )
+            logger.info(f"处理完成，总记录数: {processed_count}, 总耗时: {final_processing_time}秒, 各阶段: {stages}")
+            return True, f"处理成功 {processed_count} 条记录，耗时 {final_processing_time} 秒"
 
-        return chunk_files
+        except Exception as e:
+            logger.error(f"处理失败: {e}")
+            return False, f"处理失败: {str(e)}"
 
     async def _monitor_progress(
         self, batch_record: ImportBatchRecords, start_time: datetime, stop_event: asyncio.Event
@@ -348,15 +330,6 @@ class UploadService:
         except Exception as e:
             logger.warning(f"进度监控异常: {e}")
 
-    async def _cleanup_temp_dir(self, temp_dir: str):
-        """清理临时目录"""
-        try:
-            import shutil
-            shutil.rmtree(temp_dir)
-            logger.info(f"清理临时目录: {temp_dir}")
-        except Exception as e:
-            logger.warning(f"清理临时目录失败: {e}")
-
     def _extract_date_from_filename(self, filename: str) -> Optional[date]:
         """从文件名中提取日期"""
         try:
@@ -402,6 +375,14 @@ class UploadService:
             logger.error(f"创建导入批次记录失败: {e}")
             raise
 
+    def _save_stage_metrics(self, batch_record: ImportBatchRecords, metrics: dict):
+        """写入流水线各阶段指标（010 迁移添加的列，不经 ORM 映射）"""
+        self.db.execute(
+            update(import_stage_metrics)
+            .where(import_stage_metrics.c.id == batch_record.id)
+            .values(stage_metrics=metrics)
+        )
+
     def _update_batch_record_error(self, batch_record: ImportBatchRecords, error_message: str):
         """更新批次记录错误状态"""
         try:
@@ -6,6 +6,7 @@ import logging
 from passlib.context import CryptContext
 from app.user.user_model import UserCenter
 from app.user.user_schemas import UserCenterCreate, UserCenterUpdate, UserCenterList
+from app.auth.principal_cache import principal_cache
 
 logger = logging.getLogger(__name__)
 
@@ -198,6 +199,8 @@ class UserCenterCRUD:
 
             self.db.commit()
             self.db.refresh(db_user)
+            # 已认证用户缓存立即失效（禁用、改名、改密码后不再使用旧记录）
+            principal_cache.invalidate(user_id)
 
             logger.info(f"用户更新成功: {user_id}")
             return True, "用户更新成功", db_user
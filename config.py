@@ -32,6 +32,59 @@ class Settings(BaseSettings):
     MULTIPROCESSING_THRESHOLD_MB: float
     FILE_SPLIT_LINES: int
 
+    # 导入写入方式：upsert（executemany 逐批UPSERT）/ copy（COPY 到临时表后集合合并）
+    IMPORT_LOADER: str = "upsert"
+    # 日排名趋势存储：jsonb（ranking_trend_day 子查询维护）/ array（trend_dates + trend_ranks 定长数组，
+    # 需先执行 docs/migrations/001_ranking_trend_arrays.sql）
+    RANKING_TREND_ENGINE: str = "jsonb"
+    # 文本搜索方式：ilike（'%词%' 模糊匹配，原行为）/ trigram（配合 pg_trgm 索引的前缀、精确、相似度匹配，
+    # 需先执行 docs/migrations/003_trigram_indexes.sql）
+    SEARCH_TEXT_MODE: str = "ilike"
+    # trigram 模式下包含/相似度匹配的最短词长（更短的词改为前缀匹配）
+    SEARCH_MIN_TRIGRAM_LENGTH: int = 3
+    # 品牌词标记：导入时计算 is_branded_keyword，默认过滤改用该列和部分索引
+    # （需先执行 docs/migrations/004_branded_keyword_flag.sql）
+    BRANDED_KEYWORD_FLAG: bool = False
+    # 排名历史：导入时追加日/周排名到按月分区的 keyword_rank_history，/api/analysis/trend 查询 30/90/365 天趋势
+    # （需先执行 docs/migrations/009_keyword_rank_history.sql）
+    RANK_HISTORY_ENABLED: bool = False
+    # 搜索结果缓存：进程内 LRU 条目数和有效期（秒，0 关闭缓存），导入完成时整体失效
+    SEARCH_CACHE_MAX_ENTRIES: int = 512
+    SEARCH_CACHE_TTL_SECONDS: float = 60
+    # Redis 地址（如 redis://localhost:6379/0），配置后搜索缓存在多个应用进程间共享
+    REDIS_URL: str = ""
+    # 搜索/计数缓存的数据版本文件：未配置 Redis 时同一台机器上的各 worker 通过它得知导入已完成
+    CACHE_VERSION_FILE: str = "uploads/.cache_version"
+    # 搜索总数：精确计数到该行数为止，超过时返回规划器估算值（响应中 countExact=false）
+    COUNT_ESTIMATE_THRESHOLD: int = 100000
+    # 只有类目/日期条件时从汇总表精确计数（需先执行 docs/migrations/006_search_count_summary.sql）
+    COUNT_SUMMARY_ENABLED: bool = False
+    # 计数缓存：同一筛选条件的总数在导入完成时失效，有效期不超过 SEARCH_CACHE_TTL_SECONDS
+    COUNT_CACHE_MAX_ENTRIES: int = 4096
+    COUNT_CACHE_TTL_SECONDS: float = 60
+    # 类目下拉选项读取导入后刷新的物化视图 category_stats（需先执行 docs/migrations/007_category_stats.sql）
+    CATEGORY_STATS_MATERIALIZED: bool = False
+    # 类目下拉选项的浏览器缓存时间（秒，Cache-Control max-age；过期后凭 ETag 协商）
+    CATEGORIES_CACHE_MAX_AGE: int = 300
+    # 已认证用户缓存时间（秒，0 关闭）：令牌校验后复用用户记录，用户修改/禁用时立即失效
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30
+    # 导出：服务端游标每批读取行数；最大导出行数（0 不限制）
+    EXPORT_BATCH_SIZE: int = 5000
+    EXPORT_MAX_ROWS: int = 0
+    # 常驻导入进程池的最大未完成分片数（提交超过时等待）
+    IMPORT_POOL_QUEUE_DEPTH: int = 8
+    # 分块上传：分块临时目录（多个 worker 共享，重启后保留以便续传）；会话无活动超过该秒数后连同临时目录清理
+    CHUNK_UPLOAD_DIR: str = "uploads/chunks"
+    CHUNK_SESSION_TTL_SECONDS: int = 24 * 3600
+    # 并发上传数只统计该秒数内有活动（创建、收到分块）的会话，中断的上传超过该时间后不再占用名额（仍可续传）
+    CHUNK_SESSION_IDLE_SECONDS: int = 300
+    # 分块合并方式：copy（copy_file_range / sendfile 由内核拼接，不占用内存）/ read（逐个分块读入内存后写入，原实现）
+    CHUNK_MERGE_MODE: str = "copy"
+    # 单线程导入流水线：读取、准备、写入三个线程重叠执行，各阶段吞吐和队列深度写入导入记录
+    # （需先执行 docs/migrations/010_import_stage_metrics.sql）；阶段间队列容量（块数，每块 BATCH_SIZE 行）
+    IMPORT_PIPELINE: bool = False
+    IMPORT_PIPELINE_QUEUE_SIZE: int = 2
+
     # 数据库连接优化配置
     DB_POOL_SIZE: int = 20  # 连接池大小
     DB_MAX_OVERFLOW: int = 10  # 最大溢出连接
@@ -0,0 +1,24 @@
+-- ----------------------------
+-- 日排名趋势数组引擎（RANKING_TREND_ENGINE=array）
+-- trend_dates / trend_ranks 按下标一一对应，新日期在前，最多7个元素
+-- ----------------------------
+ALTER TABLE "analysis"."amazon_origin_search_data"
+    ADD COLUMN IF NOT EXISTS "trend_dates" date[] NOT NULL DEFAULT '{}',
+    ADD COLUMN IF NOT EXISTS "trend_ranks" int4[] NOT NULL DEFAULT '{}';
+
+COMMENT ON COLUMN "analysis"."amazon_origin_search_data"."trend_dates" IS '排名趋势日期（新日期在前）';
+COMMENT ON COLUMN "analysis"."amazon_origin_search_data"."trend_ranks" IS '排名趋势排名（与 trend_dates 下标对应）';
+
+-- 从现有 jsonb 趋势回填（切换引擎前执行一次）
+UPDATE "analysis"."amazon_origin_search_data" t
+SET trend_dates = s.dates,
+    trend_ranks = s.ranks
+FROM (
+    SELECT d.id,
+           array_agg((item->>'date')::date ORDER BY (item->>'date')::date DESC) AS dates,
+           array_agg((item->>'ranking')::int ORDER BY (item->>'date')::date DESC) AS ranks
+    FROM "analysis"."amazon_origin_search_data" d,
+         jsonb_array_elements(d.ranking_trend_day) AS item
+    GROUP BY d.id
+) s
+WHERE t.id = s.id;
@@ -0,0 +1,71 @@
+-- ----------------------------
+-- 主表按 keyword HASH 分区 + keyword 唯一索引
+--
+-- 1. ON CONFLICT (keyword) 依赖 keyword 唯一索引（analysis.sql 中 idx_keyword 不是唯一索引）
+-- 2. 分区键为 keyword：唯一索引在每个分区内独立维护，并行导入的不同关键词落在不同分区，
+--    减少同一堆表/索引页上的锁争用；按关键词精确查找只扫描一个分区
+-- 3. 分区表的主键必须包含分区键，主键改为 (id, keyword)，id 仍由原序列生成
+--
+-- 执行前停止导入任务；迁移在单个事务中完成，原表保留为 amazon_origin_search_data_unpartitioned
+-- 分区数修改 partition_count（建议为导入进程数的 2~4 倍）
+-- ----------------------------
+BEGIN;
+
+SET LOCAL search_path = analysis;
+
+CREATE TABLE "analysis"."amazon_origin_search_data_partitioned" (
+    LIKE "analysis"."amazon_origin_search_data" INCLUDING DEFAULTS INCLUDING COMMENTS
+) PARTITION BY HASH ("keyword");
+
+DO $$
+DECLARE
+    partition_count CONSTANT int := 16;
+BEGIN
+    FOR i IN 0..partition_count - 1 LOOP
+        EXECUTE format(
+            'CREATE TABLE "analysis"."amazon_origin_search_data_p%s" '
+            'PARTITION OF "analysis"."amazon_origin_search_data_partitioned" '
+            'FOR VALUES WITH (MODULUS %s, REMAINDER %s)',
+            lpad(i::text, 2, '0'), partition_count, i
+        );
+    END LOOP;
+END $$;
+
+-- 原表中的重复关键词只保留最近更新的一条
+INSERT INTO "analysis"."amazon_origin_search_data_partitioned"
+SELECT DISTINCT ON ("keyword") *
+FROM "analysis"."amazon_origin_search_data"
+ORDER BY "keyword", "updated_at" DESC, "id" DESC;
+
+ALTER TABLE "analysis"."amazon_origin_search_data" RENAME TO "amazon_origin_search_data_unpartitioned";
+ALTER INDEX IF EXISTS "analysis"."amazon_origin_search_data_pkey" RENAME TO "amazon_origin_search_data_unpartitioned_pkey";
+ALTER TABLE "analysis"."amazon_origin_search_data_partitioned" RENAME TO "amazon_origin_search_data";
+ALTER SEQUENCE "analysis"."amazon_origin_search_data_id_seq" OWNED BY "analysis"."amazon_origin_search_data"."id";
+
+-- 约束和索引建在父表上，自动在每个分区创建
+ALTER TABLE "analysis"."amazon_origin_search_data"
+    ADD CONSTRAINT "amazon_origin_search_data_pkey" PRIMARY KEY ("id", "keyword");
+CREATE UNIQUE INDEX "uk_amazon_keyword" ON "analysis"."amazon_origin_search_data" USING btree ("keyword");
+
+-- 原表的二级索引（索引名加 _p 后缀，避免与保留的原表冲突）
+CREATE INDEX "idx_amazon_click_share_desc_p" ON "analysis"."amazon_origin_search_data" ("top_product_click_share" DESC NULLS FIRST);
+CREATE INDEX "idx_amazon_click_share_range_p" ON "analysis"."amazon_origin_search_data" ("top_product_click_share") WHERE top_product_click_share > 0::numeric;
+CREATE INDEX "idx_amazon_conversion_share_desc_p" ON "analysis"."amazon_origin_search_data" ("top_product_conversion_share" DESC NULLS FIRST);
+CREATE INDEX "idx_amazon_conversion_share_range_p" ON "analysis"."amazon_origin_search_data" ("top_product_conversion_share") WHERE top_product_conversion_share > 0::numeric;
+CREATE INDEX "idx_amazon_new_day_p" ON "analysis"."amazon_origin_search_data" ("is_new_day") WHERE is_new_day = true;
+CREATE INDEX "idx_amazon_new_week_p" ON "analysis"."amazon_origin_search_data" ("is_new_week") WHERE is_new_week = true;
+CREATE INDEX "idx_amazon_product_asin_p" ON "analysis"."amazon_origin_search_data" ("top_product_asin");
+CREATE INDEX "idx_amazon_ranking_change_day_p" ON "analysis"."amazon_origin_search_data" ("ranking_change_day");
+CREATE INDEX "idx_amazon_ranking_change_week_p" ON "analysis"."amazon_origin_search_data" ("ranking_change_week");
+CREATE INDEX "idx_amazon_report_date_day_p" ON "analysis"."amazon_origin_search_data" ("report_date_day" DESC NULLS FIRST);
+CREATE INDEX "idx_amazon_report_date_week_p" ON "analysis"."amazon_origin_search_data" ("report_date_week" DESC NULLS FIRST);
+CREATE INDEX "idx_amazon_top_brand_p" ON "analysis"."amazon_origin_search_data" ("top_brand");
+CREATE INDEX "idx_amazon_top_category_p" ON "analysis"."amazon_origin_search_data" ("top_category");
+CREATE INDEX "idx_keyword_text_p" ON "analysis"."amazon_origin_search_data" USING gin (to_tsvector('english'::regconfig, keyword::text));
+
+COMMIT;
+
+ANALYZE "analysis"."amazon_origin_search_data";
+
+-- 确认无误后删除原表：
+-- DROP TABLE "analysis"."amazon_origin_search_data_unpartitioned";
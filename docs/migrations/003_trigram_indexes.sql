@@ -0,0 +1,22 @@
+-- ----------------------------
+-- 文本搜索 trigram 索引（SEARCH_TEXT_MODE=trigram）
+--
+-- gin_trgm_ops 支持 ILIKE '%词%' / ILIKE '词%' / % 相似度运算符，原 to_tsvector('english') 索引
+-- 对这些条件无效；ASIN 前缀匹配使用 text_pattern_ops btree（不受排序规则影响）
+-- 建索引期间会阻塞写入，请在导入空闲时执行；未分区的表可改为 CREATE INDEX CONCURRENTLY
+-- ----------------------------
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS "idx_amazon_keyword_trgm" ON "analysis"."amazon_origin_search_data"
+    USING gin ("keyword" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_amazon_top_brand_trgm" ON "analysis"."amazon_origin_search_data"
+    USING gin ("top_brand" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_amazon_top_product_title_trgm" ON "analysis"."amazon_origin_search_data"
+    USING gin ("top_product_title" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS "idx_amazon_product_asin_pattern" ON "analysis"."amazon_origin_search_data"
+    USING btree ("top_product_asin" text_pattern_ops);
+
+ANALYZE "analysis"."amazon_origin_search_data";
+
+-- 切换到 trigram 模式且确认无其他查询使用后，可删除无效的全文索引：
+-- DROP INDEX IF EXISTS "analysis"."idx_keyword_text";
@@ -0,0 +1,30 @@
+-- ----------------------------
+-- 品牌词标记 + 默认列表部分索引（BRANDED_KEYWORD_FLAG=true）
+--
+-- 默认过滤「关键词中包含品牌词」原为逐行计算 lower(keyword) LIKE concat('%', lower(top_brand), '%')，
+-- 无法使用索引；改为导入时计算一次写入 is_branded_keyword
+-- 部分索引的条件与 AnalysisCRUD 默认过滤一致（类目黑名单与 analysis_crud.CATEGORY_BLACKLIST 保持同步），
+-- 按默认排序（report_date_day DESC, current_rangking_day）建索引，无筛选的列表页直接按索引顺序取前 N 行
+-- 回填和建索引期间会阻塞写入，请在导入空闲时执行；回填先于建索引（更新走 HOT，不维护新索引）
+-- ----------------------------
+ALTER TABLE "analysis"."amazon_origin_search_data"
+    ADD COLUMN IF NOT EXISTS "is_branded_keyword" bool NOT NULL DEFAULT false;
+
+COMMENT ON COLUMN "analysis"."amazon_origin_search_data"."is_branded_keyword" IS '关键词中是否包含 Top1 品牌词（导入时计算）';
+
+-- 回填（表达式与导入时一致）
+UPDATE "analysis"."amazon_origin_search_data"
+SET is_branded_keyword = lower(keyword) LIKE concat('%', lower(top_brand), '%')
+WHERE is_branded_keyword IS DISTINCT FROM (lower(keyword) LIKE concat('%', lower(top_brand), '%'));
+
+CREATE INDEX IF NOT EXISTS "idx_amazon_default_listing" ON "analysis"."amazon_origin_search_data"
+    USING btree ("report_date_day" DESC, "current_rangking_day")
+    WHERE is_branded_keyword = false
+      AND current_rangking_day <> 0
+      AND top_brand <> ''
+      AND top_category NOT IN (
+          'Books', 'Grocery', 'Video Games',
+          'Digital_Video_Download', 'Digital_Ebook_Purchase', 'Digital_Music_Purchase'
+      );
+
+ANALYZE "analysis"."amazon_origin_search_data";
@@ -0,0 +1,14 @@
+-- ----------------------------
+-- 游标分页索引（/api/analysis/search?pagination=cursor）
+--
+-- 游标分页按 (排序字段, id) 排序并以行值比较 (col, id) > (:v, :id) 定位下一页，
+-- 复合索引使该条件成为索引扫描边界，任意深度的页只读取 perPage 行；
+-- 接口默认按 current_rangking_day 排序，且该列原来没有索引
+-- 其他可排序字段已有单列索引，行值比较的首列可作为扫描边界，按需补充同样的复合索引
+-- ----------------------------
+CREATE INDEX IF NOT EXISTS "idx_amazon_rangking_day_id" ON "analysis"."amazon_origin_search_data"
+    USING btree ("current_rangking_day", "id");
+CREATE INDEX IF NOT EXISTS "idx_amazon_rangking_week_id" ON "analysis"."amazon_origin_search_data"
+    USING btree ("current_rangking_week", "id");
+
+ANALYZE "analysis"."amazon_origin_search_data";
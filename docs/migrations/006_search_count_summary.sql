@@ -0,0 +1,29 @@
+-- ----------------------------
+-- 搜索计数汇总表（COUNT_SUMMARY_ENABLED=true）
+--
+-- 按 类目 × 日报告日期 × 周报告日期 预先统计默认过滤后的行数：
+-- 只有类目/报告日期条件（或无条件）的搜索总数由该表 SUM(cnt) 得到，无需对主表 count(*)
+-- 过滤条件与 AnalysisCRUD 默认过滤一致（类目黑名单与 analysis_crud.CATEGORY_BLACKLIST 保持同步）
+-- 导入完成后由 import_hooks.on_import_finished 执行 REFRESH MATERIALIZED VIEW CONCURRENTLY，
+-- CONCURRENTLY 需要唯一索引
+-- ----------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS "analysis"."search_count_summary" AS
+SELECT top_category,
+       report_date_day,
+       report_date_week,
+       count(*) AS cnt
+FROM "analysis"."amazon_origin_search_data"
+WHERE top_brand IS NOT NULL
+  AND top_brand <> ''
+  AND lower(keyword) NOT LIKE concat('%', lower(top_brand), '%')
+  AND current_rangking_day <> 0
+  AND top_category NOT IN (
+      'Books', 'Grocery', 'Video Games',
+      'Digital_Video_Download', 'Digital_Ebook_Purchase', 'Digital_Music_Purchase'
+  )
+GROUP BY top_category, report_date_day, report_date_week;
+
+CREATE UNIQUE INDEX IF NOT EXISTS "uk_search_count_summary"
+    ON "analysis"."search_count_summary" ("top_category", "report_date_day", "report_date_week");
+
+COMMENT ON MATERIALIZED VIEW "analysis"."search_count_summary" IS '默认过滤后按类目、报告日期汇总的行数（搜索总数）';
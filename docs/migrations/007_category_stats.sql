@@ -0,0 +1,30 @@
+-- ----------------------------
+-- 类目统计物化视图（CATEGORY_STATS_MATERIALIZED=true）
+--
+-- 类目下拉选项原读取 analysis.my_category_stats（未纳入仓库的普通视图，每次打开下拉框都全表聚合），
+-- 改为物化视图：导入完成后由 import_hooks.on_import_finished 执行 REFRESH MATERIALIZED VIEW CONCURRENTLY
+-- 计数条件与 AnalysisCRUD 默认过滤一致，下拉框中的数量即选择该类目后的搜索结果数
+-- （类目黑名单与 analysis_crud.CATEGORY_BLACKLIST 保持同步）
+-- ----------------------------
+CREATE MATERIALIZED VIEW IF NOT EXISTS "analysis"."category_stats" AS
+SELECT top_category,
+       count(*)             AS cnt,
+       max(report_date_day) AS latest_report_date
+FROM "analysis"."amazon_origin_search_data"
+WHERE top_category IS NOT NULL
+  AND top_category <> ''
+  AND top_brand IS NOT NULL
+  AND top_brand <> ''
+  AND lower(keyword) NOT LIKE concat('%', lower(top_brand), '%')
+  AND current_rangking_day <> 0
+  AND top_category NOT IN (
+      'Books', 'Grocery', 'Video Games',
+      'Digital_Video_Download', 'Digital_Ebook_Purchase', 'Digital_Music_Purchase'
+  )
+GROUP BY top_category;
+
+-- CONCURRENTLY 刷新需要唯一索引
+CREATE UNIQUE INDEX IF NOT EXISTS "uk_category_stats_category"
+    ON "analysis"."category_stats" ("top_category");
+
+COMMENT ON MATERIALIZED VIEW "analysis"."category_stats" IS '类目下拉选项统计（导入完成后刷新）';
@@ -0,0 +1,25 @@
+-- ----------------------------
+-- 默认列表覆盖索引（可选，需先执行 004_branded_keyword_flag.sql 并设置 BRANDED_KEYWORD_FLAG=true）
+--
+-- 搜索接口按 fields 参数只查询表格渲染的列，后台表格默认排序 (report_date_day DESC, current_rangking_day)；
+-- 索引键与默认排序一致，表格字段放入 INCLUDE，部分索引条件与默认过滤一致，
+-- 无筛选的列表页可走 Index Only Scan，不再回表读取整行（含第二、三名商品等不展示的列）
+-- Index Only Scan 依赖可见性映射：导入后由 autovacuum 更新，大批量导入后可手动 VACUUM
+-- 使用数组趋势引擎（RANKING_TREND_ENGINE=array）时，INCLUDE 中的 ranking_trend_day 换成 trend_dates, trend_ranks
+-- 索引较大（约为表的一半），建索引期间阻塞写入，请在导入空闲时执行；
+-- 建好后可删除同键的 idx_amazon_default_listing
+-- ----------------------------
+CREATE INDEX IF NOT EXISTS "idx_amazon_default_listing_covering" ON "analysis"."amazon_origin_search_data"
+    USING btree ("report_date_day" DESC, "current_rangking_day", "id")
+    INCLUDE ("keyword", "ranking_change_day", "current_rangking_week", "ranking_change_week", "ranking_trend_day",
+             "top_category", "top_product_asin", "top_product_title",
+             "top_product_click_share", "top_product_conversion_share", "is_new_day", "is_new_week")
+    WHERE is_branded_keyword = false
+      AND current_rangking_day <> 0
+      AND top_brand <> ''
+      AND top_category NOT IN (
+          'Books', 'Grocery', 'Video Games',
+          'Digital_Video_Download', 'Digital_Ebook_Purchase', 'Digital_Music_Purchase'
+      );
+
+VACUUM ANALYZE "analysis"."amazon_origin_search_data";
@@ -0,0 +1,52 @@
+-- ----------------------------
+-- 排名历史（配合 RANK_HISTORY_ENABLED=true）
+--
+-- ranking_trend_day 只保留最近7天且每次导入覆盖，周排名没有历史；
+-- keyword_rank_history 为只追加的窄表（每个关键词每天/每周一行，约 30 字节），导入时与主表合并在同一条语句中写入，
+-- /api/analysis/trend 按 30/90/365 天窗口在服务端降采样
+-- 按月 RANGE 分区：窗口查询只扫描涉及的月份，过期数据按月 DROP 分区；
+-- 主键 (keyword_id, period, rank_date) 服务单个关键词的窗口查询，BRIN(rank_date) 服务按日期的全表扫描（体积很小，按日期追加写入时效果最好）
+-- 分区由 analysis.ensure_rank_history_partition() 按需创建，导入开始时自动调用
+-- ----------------------------
+CREATE TABLE IF NOT EXISTS "analysis"."keyword_rank_history" (
+    "keyword_id" int8 NOT NULL,
+    "period" char(1) NOT NULL,
+    "rank_date" date NOT NULL,
+    "rank" int4 NOT NULL,
+    PRIMARY KEY ("keyword_id", "period", "rank_date")
+) PARTITION BY RANGE ("rank_date");
+
+COMMENT ON TABLE "analysis"."keyword_rank_history" IS '关键词排名历史（按月分区，只追加）';
+COMMENT ON COLUMN "analysis"."keyword_rank_history"."keyword_id" IS 'amazon_origin_search_data.id';
+COMMENT ON COLUMN "analysis"."keyword_rank_history"."period" IS 'd=日排名 w=周排名';
+
+CREATE INDEX IF NOT EXISTS "idx_rank_history_date_brin" ON "analysis"."keyword_rank_history"
+    USING brin ("rank_date");
+
+CREATE OR REPLACE FUNCTION "analysis"."ensure_rank_history_partition"(day date) RETURNS void AS $$
+DECLARE
+    month_start date := date_trunc('month', day)::date;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS analysis.%I PARTITION OF analysis.keyword_rank_history FOR VALUES FROM (%L) TO (%L)',
+        'keyword_rank_history_' || to_char(month_start, 'YYYYMM'), month_start, (month_start + interval '1 month')::date
+    );
+END
+$$ LANGUAGE plpgsql;
+
+-- 从现有的7天日趋势回填（RANKING_TREND_ENGINE=array 时改为 unnest(trend_dates, trend_ranks)）
+SELECT "analysis"."ensure_rank_history_partition"(month::date)
+FROM generate_series(
+    (SELECT date_trunc('month', min((item->>'date')::date))
+     FROM "analysis"."amazon_origin_search_data", jsonb_array_elements(ranking_trend_day) AS item),
+    date_trunc('month', current_date),
+    interval '1 month'
+) AS month;
+
+INSERT INTO "analysis"."keyword_rank_history" (keyword_id, period, rank_date, rank)
+SELECT d.id, 'd', (item->>'date')::date, (item->>'ranking')::int
+FROM "analysis"."amazon_origin_search_data" d, jsonb_array_elements(d.ranking_trend_day) AS item
+WHERE (item->>'ranking')::int <> 0
+ON CONFLICT DO NOTHING;
+
+ANALYZE "analysis"."keyword_rank_history";
@@ -0,0 +1,11 @@
+-- ----------------------------
+-- 导入流水线阶段指标（IMPORT_PIPELINE=true）
+--
+-- 单线程导入拆成读取 -> 准备 -> 写入三个线程，导入过程中定期把各阶段的行数、工作/等待耗时、
+-- 吞吐（行/秒）和阶段间队列深度写入 stage_metrics，/api/upload/processing-status 返回给上传页面；
+-- 可空列，添加时不重写表
+-- ----------------------------
+ALTER TABLE "analysis"."import_batch_records"
+    ADD COLUMN IF NOT EXISTS "stage_metrics" jsonb;
+
+COMMENT ON COLUMN "analysis"."import_batch_records"."stage_metrics" IS '导入流水线各阶段吞吐和队列深度';
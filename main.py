@@ -15,6 +15,10 @@ from app.admin_site import site
 from monitoring import SystemMonitor
 from app.auth.login_admin import auth_router
 from app.auth.auth_middleware import AdminAuthMiddleware
+from app.table.upload.import_worker_pool import import_worker_pool
+from app.table.upload.chunk_sessions import get_chunk_session_store
+from app.table.analysis.analysis_cache import search_result_cache
+from app.table.analysis.analysis_count import count_cache
 
 
 # 配置应用日志，每天自动生成新文件
@@ -64,6 +68,13 @@ async def lifespan(app: FastAPI):
     # 初始化上传目录
     init_upload_dir()
 
+    # 清理超时未完成的分块上传会话（进行中的会话保留，重启后可续传）
+    try:
+        removed = get_chunk_session_store().purge_expired()
+        logger.info(f"✅ 分块上传会话清理完成，删除 {removed} 个过期会话")
+    except Exception as e:
+        logger.error(f"❌ 分块上传会话清理失败: {e}")
+
     # 检查数据库连接
     try:
         with engine.connect() as conn:
@@ -79,6 +90,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"❌ 异步数据库连接测试失败: {e}")
 
+    # 启动常驻导入进程池（工作进程预热数据库连接）
+    try:
+        import_worker_pool.start()
+        logger.info("✅ 导入进程池启动成功")
+    except Exception as e:
+        logger.error(f"❌ 导入进程池启动失败: {e}")
+
     logger.info("🎉 应用启动完成，准备接收请求")
 
     yield
@@ -86,6 +104,13 @@ async def lifespan(app: FastAPI):
     # ==================== 关闭事件 ====================
     logger.info("🛑 应用正在关闭...")
 
+    # 等待进行中的导入分片完成后关闭进程池
+    try:
+        import_worker_pool.shutdown(wait=True)
+        logger.info("✅ 导入进程池关闭成功")
+    except Exception as e:
+        logger.error(f"❌ 导入进程池关闭失败: {e}")
+
     # 关闭数据库连接池
     try:
         engine.dispose()
@@ -199,6 +224,18 @@ async def pool_status():
     }
 
 
+@app.get("/health/import-pool")
+async def import_pool_status():
+    """获取常驻导入进程池状态 - 工作进程利用率、队列和分片耗时"""
+    return import_worker_pool.get_metrics()
+
+
+@app.get("/health/search-cache")
+def search_cache_status():
+    """获取搜索结果缓存和计数缓存状态 - 命中/未命中/淘汰统计和当前数据版本（读取 Redis，在线程池中执行）"""
+    return {**search_result_cache.get_stats(), 'count_cache': count_cache.get_stats()}
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -206,7 +243,7 @@ if __name__ == "__main__":
         "main:app",
         host="0.0.0.0",
         port=8000,
-        workers=2,  # 使用2个worker
+        workers=2,  # 使用2个worker（每个 worker 各有一个 MAX_WORKERS 个进程的导入进程池）
         timeout_keep_alive=600,
         reload=settings.DEBUG,
     )
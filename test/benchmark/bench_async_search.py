@@ -0,0 +1,147 @@
+"""
+搜索接口并发基准测试：同步会话（阻塞事件循环）vs 异步会话（asyncpg）
+
+同一个 FastAPI 应用挂两个搜索路由：
+  - /sync：async def 处理函数内调用同步 AnalysisCRUD（原实现，数据库调用期间整个事件循环被阻塞）
+  - /async：AsyncAnalysisService + AsyncSession（当前实现）
+通过 httpx ASGITransport 在同一事件循环内运行 N 个并发客户端（各自按间隔发请求），统计 p50/p99 延迟和吞吐。
+数据表复用 bench_keyset_pagination 的生成方式（独立 schema，通过 schema_translate_map 指向），
+搜索结果缓存和计数缓存在测试期间关闭，每个请求都访问数据库。
+
+用法（需要可用的数据库，结束后删除测试 schema）：
+    python -m test.benchmark.bench_async_search --rows 500000 --clients 200 --requests 5 --interval 2
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.table.analysis.analysis_cache import search_result_cache
+from app.table.analysis.analysis_count import count_cache
+from app.table.analysis.analysis_crud import AnalysisCRUD
+from app.table.analysis.analysis_service import AnalysisResponseBuilder, AsyncAnalysisService
+from app.table.search.search_schemas import AnalysisSearchRequest
+from database import engine, async_engine
+from test.benchmark.bench_keyset_pagination import SCHEMA, create_table, execute
+
+CATEGORIES = [f'category {i}' for i in range(40)]
+
+
+def build_app() -> FastAPI:
+    translate = {'analysis': SCHEMA}
+    sync_factory = sessionmaker(bind=engine.execution_options(schema_translate_map=translate))
+    async_factory = async_sessionmaker(
+        bind=async_engine.execution_options(schema_translate_map=translate), class_=AsyncSession
+    )
+
+    app = FastAPI()
+
+    # 会话在处理函数内打开和关闭：依赖注入的会话在响应发送后才释放连接，
+    # 同步路由阻塞事件循环时会占满连接池，无法得到有意义的对比
+    @app.get('/sync')
+    async def search_sync(category: str, page: int):
+        params = AnalysisSearchRequest(category=category, page=page, perPage=50)
+        with sync_factory() as db:
+            return AnalysisResponseBuilder()._build_response(params, *AnalysisCRUD(db).search(params)).model_dump()
+
+    @app.get('/async')
+    async def search_async(category: str, page: int):
+        params = AnalysisSearchRequest(category=category, page=page, perPage=50)
+        async with async_factory() as db:
+            return (await AsyncAnalysisService(db).search_data(params)).model_dump()
+
+    @app.get('/ping')
+    async def ping():
+        return {'ok': True}
+
+    return app
+
+
+async def run_load(app: FastAPI, path: str, clients: int, requests_per_client: int, interval: float) -> tuple:
+    """返回 (每个请求的延迟 ms 列表, /ping 延迟 ms 列表, 总耗时 s)
+
+    每个客户端按固定间隔（带随机偏移）在预定时刻发出请求，延迟从预定时刻算起：
+    事件循环被阻塞时请求无法按时发出，等待时间同样计入延迟
+    """
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+
+    async def client_loop(client: httpx.AsyncClient, seed: int, started: float):
+        rng = random.Random(seed)
+        offset = rng.uniform(0, interval)
+        for i in range(requests_per_client):
+            scheduled = started + offset + i * interval
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            query = {'category': rng.choice(CATEGORIES), 'page': rng.randint(1, 20)}
+            response = await client.get(path, params=query)
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            response.raise_for_status()
+
+    async def probe_loop(client: httpx.AsyncClient, done: asyncio.Event):
+        """负载期间每 50ms 请求一次不访问数据库的 /ping，衡量事件循环是否被阻塞"""
+        while not done.is_set():
+            scheduled = time.perf_counter() + 0.05
+            await asyncio.sleep(0.05)
+            await client.get('/ping')
+            ping_latencies.append((time.perf_counter() - scheduled) * 1000)
+
+    ping_latencies = []
+    done = asyncio.Event()
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        started = time.perf_counter()
+        probe = asyncio.create_task(probe_loop(client, done))
+        await asyncio.gather(*(client_loop(client, seed, started) for seed in range(clients)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe
+        return latencies, ping_latencies, elapsed
+
+
+def percentile(values: list, pct: float) -> float:
+    return statistics.quantiles(values, n=100)[int(pct) - 1]
+
+
+async def run(args) -> None:
+    app = build_app()
+    # 预热连接池
+    await run_load(app, '/sync', 4, 2, 0.01)
+    await run_load(app, '/async', 4, 2, 0.01)
+
+    print(f"  {'路由':<8} {'p50':>10} {'p99':>10} {'吞吐':>12} {'/ping p99':>12}")
+    for path in ('/sync', '/async'):
+        latencies, ping_latencies, elapsed = await run_load(app, path, args.clients, args.requests, args.interval)
+        print(f"  {path:<8} {statistics.median(latencies):8.1f}ms {percentile(latencies, 99):8.1f}ms "
+              f"{len(latencies) / elapsed:8.1f} req/s {percentile(ping_latencies, 99):10.1f}ms")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='同步/异步搜索接口并发基准测试')
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5, help='每个客户端的请求数')
+    parser.add_argument('--interval', type=float, default=2.0, help='每个客户端两次请求的间隔（秒）')
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+
+    # 关闭结果缓存和计数缓存，每个请求都查询数据库
+    search_result_cache.ttl_seconds = 0
+    count_cache.ttl_seconds = 0
+
+    print(f"数据行数: {args.rows:,}, 并发客户端: {args.clients}, 每客户端请求: {args.requests}")
+    create_table(args.rows)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
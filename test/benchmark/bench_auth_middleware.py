@@ -0,0 +1,117 @@
+"""
+认证中间件基准测试：纯 ASGI AdminAuthMiddleware vs 同样逻辑的 BaseHTTPMiddleware 实现
+
+通过 httpx ASGITransport 请求完整中间件栈（CORS + 认证 + 路由），测量每秒请求数：
+  - 小 JSON 接口（已认证，用户由路由依赖从 principal_cache 取得，不访问数据库）
+  - 流式 CSV 接口（模拟 /api/analysis/export，分块返回）
+  - 无需认证的路径
+
+用法（不需要数据库）：
+    python -m test.benchmark.bench_auth_middleware --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Depends
+from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+from app.auth.auth_middleware import AdminAuthMiddleware
+from app.auth.login_auth import auth_service
+from app.auth.principal_cache import principal_cache
+from app.auth.simple_auth import simple_auth
+from app.user.user_model import UserCenter
+
+
+class BaseHTTPAuthMiddleware(BaseHTTPMiddleware):
+    """对照组：原 BaseHTTPMiddleware 结构（逐个 startswith 判断路径）"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.protected_paths = ["/api/analysis/", "/api/user/", "/api/upload/"]
+        self.exclude_paths = ["/admin/login", "/api/auth/login", "/api/auth/profile",
+                              "/static", "/docs", "/redoc", "/health", "/"]
+
+    async def dispatch(self, request: Request, call_next):
+        path = request.url.path
+        if path.startswith('/admin') or any(path.startswith(p) for p in self.exclude_paths):
+            return await call_next(request)
+        if not any(path.startswith(p) for p in self.protected_paths):
+            return await call_next(request)
+
+        auth_header = request.headers.get('Authorization')
+        if not auth_header or not auth_header.startswith('Bearer '):
+            return AdminAuthMiddleware(None)._handle_unauthorized(path)
+        user = principal_cache.resolve(auth_header.split(' ')[1])
+        if not user:
+            return AdminAuthMiddleware(None)._handle_unauthorized(path)
+        request.state.current_user = user
+        return await call_next(request)
+
+
+def build_app(middleware_class) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+    app.add_middleware(middleware_class)
+
+    @app.get('/api/analysis/ping')
+    async def ping(user: UserCenter = Depends(simple_auth.get_current_user)):
+        return {'user': user.user_name}
+
+    @app.get('/api/analysis/stream')
+    async def stream(user: UserCenter = Depends(simple_auth.get_current_user)):
+        rows = (f'keyword {i},2024-01-15\n'.encode() for i in range(200))
+        return StreamingResponse(rows, media_type='text/csv')
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok'}
+
+    return app
+
+
+async def measure(app: FastAPI, path: str, headers: dict, requests: int, concurrency: int) -> float:
+    """返回每秒请求数"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', headers=headers) as client:
+        async def worker(count: int):
+            for _ in range(count):
+                (await client.get(path)).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+        return (requests // concurrency * concurrency) / (time.perf_counter() - start)
+
+
+async def run(args) -> None:
+    principal_cache.ttl_seconds = 3600
+    principal_cache.set(UserCenter(id=1, user_name='bench', hashed_pwd='x', is_active=True, is_super=False))
+    headers = {'Authorization': f"Bearer {auth_service.create_access_token(1, 'bench', False)}"}
+
+    apps = {'BaseHTTPMiddleware': build_app(BaseHTTPAuthMiddleware), '纯 ASGI': build_app(AdminAuthMiddleware)}
+    paths = {'JSON 接口': '/api/analysis/ping', '流式 CSV': '/api/analysis/stream', '无需认证': '/health'}
+
+    print(f"  {'接口':<10} " + ' '.join(f'{name:>20}' for name in apps))
+    for label, path in paths.items():
+        results = []
+        for app in apps.values():
+            await measure(app, path, headers, args.concurrency * 2, args.concurrency)  # 预热
+            results.append(await measure(app, path, headers, args.requests, args.concurrency))
+        print(f"  {label:<10} " + ' '.join(f'{rps:14.0f} req/s' for rps in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='认证中间件吞吐基准测试')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    print(f"请求数: {args.requests}, 并发: {args.concurrency}")
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
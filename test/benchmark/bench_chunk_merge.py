@@ -0,0 +1,103 @@
+"""
+分块合并基准测试：逐个分块读入内存后写入（read，原实现）vs 内核拼接（copy：copy_file_range / sendfile）
+
+在 CHUNK_UPLOAD_DIR 所在文件系统上生成与 AMIS 分块上传相同大小的分块（默认 10MB），分别合并，统计：
+  - 合并耗时（完成上传到开始解析 CSV 的等待时间）
+  - Python 内存峰值（tracemalloc）
+  - 合并过程中的磁盘占用峰值（分块 + 合并文件）
+两种方式都在拼接完每个分块后立即删除该分块；每种方式合并前重新生成分块（写入后 fsync）。
+
+用法：
+    python -m test.benchmark.bench_chunk_merge --size-mb 1024 --chunk-mb 10
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from config import settings
+from app.table.upload import chunk_sessions
+from app.table.upload.chunk_sessions import merge_parts
+
+
+def write_parts(directory: Path, size_mb: int, chunk_mb: int) -> list:
+    """生成分块文件（CSV 文本，最后一块不足 chunk_mb）"""
+    line = b'keyword example,12345,brand,category,B000000000,product title,12.34,5.67\n'
+    block = line * (1024 * 1024 // len(line) + 1)
+    paths, remaining, number = [], size_mb * 1024 * 1024, 1
+    while remaining > 0:
+        size = min(chunk_mb * 1024 * 1024, remaining)
+        path = directory / f'part_{number:04d}.chunk'
+        with open(path, 'wb') as f:
+            written = 0
+            while written < size:
+                written += f.write(block[:size - written])
+            os.fsync(f.fileno())
+        paths.append(path)
+        remaining -= size
+        number += 1
+    return paths
+
+
+def directory_size(directory: Path) -> int:
+    total = 0
+    for entry in os.scandir(directory):
+        try:
+            total += entry.stat().st_size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+def measure(directory: Path, paths: list, mode: str) -> tuple:
+    """返回 (耗时 s, Python 内存峰值 MB, 磁盘占用峰值 MB)"""
+    destination = directory / f'merged_{mode}.csv'
+    peak_disk, done = [0], threading.Event()
+
+    def sample_disk():
+        while not done.is_set():
+            peak_disk[0] = max(peak_disk[0], directory_size(directory))
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample_disk)
+    sampler.start()
+    tracemalloc.start()
+    start = time.perf_counter()
+    merge_parts(paths, destination, mode)
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    done.set()
+    sampler.join()
+    destination.unlink()
+    return elapsed, peak_memory / 1024 / 1024, peak_disk[0] / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分块合并基准测试')
+    parser.add_argument('--size-mb', type=int, default=1024, help='文件大小（MB）')
+    parser.add_argument('--chunk-mb', type=int, default=10, help='分块大小（MB，与上传组件 chunkSize 一致）')
+    parser.add_argument('--dir', default=settings.CHUNK_UPLOAD_DIR, help='测试目录所在位置（应与上传目录同一文件系统）')
+    args = parser.parse_args()
+
+    base = Path(args.dir)
+    base.mkdir(parents=True, exist_ok=True)
+    directory = Path(tempfile.mkdtemp(prefix='bench_merge_', dir=base))
+    kernel_copy = 'copy_file_range' if hasattr(chunk_sessions.os, 'copy_file_range') else 'sendfile'
+    print(f"文件: {args.size_mb}MB, 分块: {args.chunk_mb}MB, 目录: {directory}, 内核拼接: {kernel_copy}")
+    print(f"  {'方式':<6} {'耗时':>8} {'吞吐':>12} {'内存峰值':>10} {'磁盘峰值':>10}")
+    try:
+        for mode in ('copy', 'read'):
+            paths = write_parts(directory, args.size_mb, args.chunk_mb)
+            elapsed, memory, disk = measure(directory, paths, mode)
+            print(f"  {mode:<6} {elapsed:7.2f}s {args.size_mb / elapsed:8.0f}MB/s {memory:8.1f}MB {disk:8.0f}MB")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+导入写入方式基准测试：executemany UPSERT vs COPY + 集合合并
+
+用法（需要可用的数据库，写入的测试关键词以 __bench__ 开头，结束后自动删除）：
+    python -m test.benchmark.bench_copy_loader --rows 100000
+"""
+import argparse
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from app.table.upload.csv_processor import CSVProcessor
+from config import settings
+from database import SessionFactory
+
+BENCH_PREFIX = '__bench__'
+
+
+def build_synthetic_chunk(rows: int, seed: int = 42) -> pd.DataFrame:
+    """生成与 _clean_chunk_data 输出结构一致的合成数据块"""
+    rng = np.random.default_rng(seed)
+    data = {
+        'current_rangking_day': rng.integers(1, 3_000_000, rows).astype(float),
+        'keyword': [f'{BENCH_PREFIX}keyword {i}' for i in range(rows)],
+    }
+    for rank in ('top', '2nd', '3rd'):
+        prefix = 'top_product' if rank == 'top' else 'product'
+        suffix = '' if rank == 'top' else f'_{rank}'
+        data['top_brand' if rank == 'top' else f'brand_{rank}'] = [f'brand {i % 5000}' for i in range(rows)]
+        data['top_category' if rank == 'top' else f'category_{rank}'] = [f'category {i % 40}' for i in range(rows)]
+        data[f'{prefix}_asin{suffix}'] = [f'B0{i:08d}' for i in range(rows)]
+        data[f'{prefix}_title{suffix}'] = [f'product title {i} for benchmark' for i in range(rows)]
+        data[f'{prefix}_click_share{suffix}'] = rng.uniform(0, 50, rows).round(2)
+        data[f'{prefix}_conversion_share{suffix}'] = rng.uniform(0, 50, rows).round(2)
+    return pd.DataFrame(data)
+
+
+def run_loader(loader: str, chunk: pd.DataFrame, report_date: date) -> float:
+    """按 BATCH_SIZE 分块导入，返回 rows/sec"""
+    processor = CSVProcessor(batch_size=settings.BATCH_SIZE, loader=loader)
+    with SessionFactory() as db:
+        start = time.perf_counter()
+        for i in range(0, len(chunk), processor.batch_size):
+            processor.process_chunk_with_upsert(
+                chunk.iloc[i:i + processor.batch_size].reset_index(drop=True), report_date, 'daily', db
+            )
+        elapsed = time.perf_counter() - start
+    return len(chunk) / elapsed
+
+
+def cleanup():
+    with SessionFactory() as db:
+        db.execute(
+            text("DELETE FROM analysis.amazon_origin_search_data WHERE keyword LIKE :prefix"),
+            {'prefix': f'{BENCH_PREFIX}%'}
+        )
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导入写入方式基准测试')
+    parser.add_argument('--rows', type=int, default=100_000)
+    args = parser.parse_args()
+
+    chunk = build_synthetic_chunk(args.rows)
+    print(f"数据行数: {args.rows}, BATCH_SIZE: {settings.BATCH_SIZE}, MINIBATCH_SIZE: {settings.MINIBATCH_SIZE}")
+
+    try:
+        for loader in ('upsert', 'copy'):
+            cleanup()
+            insert_rate = run_loader(loader, chunk, date(2024, 1, 1))
+            # 第二天再导入一次，覆盖 ON CONFLICT 更新路径
+            update_rate = run_loader(loader, chunk, date(2024, 1, 2))
+            print(f"{loader:>6}: 新增 {insert_rate:,.0f} rows/s, 跨日更新 {update_rate:,.0f} rows/s")
+    finally:
+        cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+导出格式基准测试：CSV / CSV+gzip / Parquet / Arrow 的导出耗时、文件大小和峰值内存
+
+数据表复用 bench_keyset_pagination 的生成方式（独立 schema，通过 schema_translate_map 指向），
+全部格式走 AnalysisExporter 的同一条服务端游标查询。接口的 CSV 只含关键词和报告日期两列，
+另加一组“CSV 全部列”（与 Parquet/Arrow 相同的列，逐批 csv.writer 写出），对比同等数据量下的差异。
+
+用法（需要可用的数据库，结束后删除测试 schema）：
+    python -m test.benchmark.bench_export_formats --rows 1000000 --batch-size 5000
+"""
+import argparse
+import asyncio
+import csv
+import io
+import time
+import tracemalloc
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.table.analysis.analysis_export import AnalysisExporter, columnar_columns
+from app.table.search.search_schemas import AnalysisSearchRequest
+from database import async_engine
+from test.benchmark.bench_keyset_pagination import SCHEMA, create_table, execute
+
+
+async def csv_all_columns(exporter: AnalysisExporter, params: AnalysisSearchRequest):
+    """与 Parquet/Arrow 同列的 CSV 导出（仅用于对比）"""
+    columns = columnar_columns()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    async for rows in exporter._iter_row_batches(exporter.export_statement(params, columns)):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+
+async def measure(chunks) -> tuple:
+    """消费导出流，返回 (耗时 s, 字节数, 峰值内存 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, peak / 1024 / 1024
+
+
+async def run(args) -> None:
+    factory = async_sessionmaker(
+        bind=async_engine.execution_options(schema_translate_map={'analysis': SCHEMA}), class_=AsyncSession
+    )
+    exporter = AnalysisExporter(session_factory=factory, batch_size=args.batch_size, max_rows=0)
+    params = AnalysisSearchRequest(orderBy='current_rangking_day')
+
+    cases = [
+        ('CSV(2 列)', lambda: exporter.stream(params, 'csv')),
+        ('CSV+gzip(2 列)', lambda: exporter.stream(params, 'csv', compress=True)),
+        ('CSV(全部列)', lambda: csv_all_columns(exporter, params)),
+        ('Parquet(全部列)', lambda: exporter.stream(params, 'parquet')),
+        ('Arrow(全部列)', lambda: exporter.stream(params, 'arrow')),
+    ]
+    print(f"  {'格式':<16} {'耗时':>8} {'大小':>10} {'峰值内存':>10}")
+    for name, build in cases:
+        elapsed, size, peak = await measure(build())
+        print(f"  {name:<16} {elapsed:7.2f}s {size / 1024 / 1024:8.1f}MB {peak:8.1f}MB")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出格式基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+
+    print(f"数据行数: {args.rows:,}, 每批: {args.batch_size}, 列式格式列数: {len(columnar_columns())}")
+    create_table(args.rows)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+单线程导入基准测试：顺序执行（读取 -> 准备 -> 写入 逐块依次执行，原实现）vs 导入流水线（三个阶段各一个线程）
+
+生成与亚马逊报表格式相同的 CSV 文件，两种方式都从文件读取并写入主表，统计总耗时和吞吐；
+流水线额外输出各阶段的行/秒（按工作耗时计算）、等待时间和队列最大深度，用于判断瓶颈阶段。
+CPU 核数较少时读取/准备与数据库争用 CPU，重叠收益会下降，结果中同时打印 CPU 核数。
+
+用法（需要可用的数据库，写入的测试关键词以 __bench__ 开头，结束后自动删除）：
+    python -m test.benchmark.bench_import_pipeline --rows 200000 --loader copy
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+from app.table.upload.csv_processor import CSVProcessor
+from app.table.upload.file_inspector import CSVFileInspector
+from app.table.upload.import_pipeline import ImportPipeline
+from config import settings
+from database import SessionFactory
+from test.benchmark.bench_copy_loader import BENCH_PREFIX, cleanup
+
+METADATA = '"报告范围=[\'每日\']","选择日期=[\'2024-01-15\']"\n'
+HEADER = ','.join(f'列{i}' for i in range(20)) + '\n'
+
+
+def write_csv(path: str, rows: int) -> None:
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(METADATA + HEADER)
+        for i in range(1, rows + 1):
+            products = ','.join(
+                f'B0{i:08d},"product title {i} for benchmark, rank {n}",{i % 50 / 3:.2f},{i % 30 / 7:.2f}'
+                for n in range(3)
+            )
+            f.write(f'{i},{BENCH_PREFIX}keyword {i},brand {i % 5000},brand b,brand c,'
+                    f'category {i % 40},category b,category c,{products}\n')
+
+
+def run_sequential(processor: CSVProcessor, path: str, headers: list, report_date: date) -> int:
+    processed = 0
+    with SessionFactory() as db:
+        for chunk_df in processor.read_csv_chunks(path, headers):
+            processed += processor.process_chunk_with_upsert(chunk_df, report_date, 'daily', db)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='单线程导入流水线基准测试')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--loader', default=settings.IMPORT_LOADER, choices=('upsert', 'copy'))
+    parser.add_argument('--queue-size', type=int, default=settings.IMPORT_PIPELINE_QUEUE_SIZE)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    write_csv(path, args.rows)
+    headers = CSVFileInspector(path).headers
+    processor = CSVProcessor(batch_size=settings.BATCH_SIZE, loader=args.loader)
+    print(f"数据行数: {args.rows:,}, 写入方式: {args.loader}, BATCH_SIZE: {settings.BATCH_SIZE}, "
+          f"队列容量: {args.queue_size}, CPU: {os.cpu_count()}")
+
+    try:
+        # 第一天新增，第二天覆盖 ON CONFLICT 更新路径；两种方式导入前都清空测试数据
+        for name in ('顺序', '流水线'):
+            for report_date in (date(2024, 1, 15), date(2024, 1, 16)):
+                if report_date == date(2024, 1, 15):
+                    cleanup()
+                start = time.perf_counter()
+                if name == '顺序':
+                    processed = run_sequential(processor, path, headers, report_date)
+                else:
+                    pipeline = ImportPipeline(processor, SessionFactory, queue_size=args.queue_size)
+                    processed = pipeline.run(path, headers, report_date, 'daily')
+                elapsed = time.perf_counter() - start
+                print(f"  {name:<4} {report_date} {processed:>9,} 行 {elapsed:7.2f}s {processed / elapsed:10,.0f} 行/秒")
+
+                if name == '流水线':
+                    metrics = pipeline.metrics()
+                    for stage, values in metrics['stages'].items():
+                        print(f"      {stage:<8} {values['rows_per_second']:>10,} 行/秒  工作 {values['busy_seconds']:6.2f}s"
+                              f"  等待上游 {values['idle_seconds']:6.2f}s  等待下游 {values['blocked_seconds']:6.2f}s")
+                    depths = ', '.join(f"{name} {q['max_depth']}/{q['capacity']}" for name, q in metrics['queues'].items())
+                    print(f"      队列最大深度: {depths}, 瓶颈: {metrics['bottleneck']}")
+    finally:
+        cleanup()
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
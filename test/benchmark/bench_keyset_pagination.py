@@ -0,0 +1,122 @@
+"""
+分页基准测试：OFFSET 分页 vs 游标（keyset）分页的第 N 页延迟
+
+在独立 schema bench_keyset 中建与主表结构相同的表并生成数据，通过 schema_translate_map
+让 AnalysisCRUD 生成的查询指向该表，分别测量两种模式取第 N 页的 p50 延迟。
+游标模式先顺序翻页取得各页游标（不计时），再单独测量带游标取该页的耗时。
+
+用法（需要可用的数据库，结束后删除 bench_keyset schema）：
+    python -m test.benchmark.bench_keyset_pagination --rows 2000000 --per-page 100 --pages 1,10,100,500
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy.orm import Session
+
+from app.table.analysis.analysis_crud import AnalysisCRUD
+from app.table.search.search_schemas import AnalysisSearchRequest
+from database import engine
+from test.benchmark.bench_partitioned_table import execute
+
+SCHEMA = 'bench_keyset'
+TABLE = f'{SCHEMA}.amazon_origin_search_data'
+
+# 默认排序 + 接口默认的按日排名排序
+SORTS = {
+    '默认排序(日期↓ 排名↑)': {},
+    '日排名↑': {'orderBy': 'current_rangking_day', 'orderDir': 'asc'},
+}
+
+# 与 docs/migrations 中的索引一致
+INDEXES = [
+    '(report_date_day DESC)',
+    '(report_date_day DESC, current_rangking_day)',
+    '(current_rangking_day, id)',
+]
+
+
+def create_table(rows: int) -> None:
+    """创建测试表并用 generate_series 在服务端生成数据"""
+    execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    execute(f"CREATE TABLE {TABLE} (LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS)")
+
+    start = time.perf_counter()
+    execute(f"""
+        INSERT INTO {TABLE} (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                             current_rangking_week, report_date_week, previous_rangking_week,
+                             top_brand, top_category, top_product_asin, top_product_title)
+        SELECT i, 'keyword ' || i, 1 + ((i::bigint * 7919) % 3000000)::int, DATE '2024-01-15' - (i % 2), 0,
+               0, DATE '2024-01-14', 0,
+               'brand ' || (i % 5000), 'category ' || (i % 40), 'B0' || lpad(i::text, 8, '0'),
+               'product title ' || i
+        FROM generate_series(1, {rows}) AS i
+    """)
+    for columns in INDEXES:
+        execute(f"CREATE INDEX ON {TABLE} {columns}")
+    execute(f"ANALYZE {TABLE}")
+    print(f"生成 {rows:,} 行及索引 {time.perf_counter() - start:.1f}s")
+
+
+def measure(fetch, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fetch()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_sort(crud: AnalysisCRUD, sort: dict, pages: list, per_page: int, repeat: int) -> list:
+    """返回 [(页码, offset ms, cursor ms)]"""
+    # 顺序翻页记录每页的起始游标
+    cursors, cursor = {1: None}, None
+    for page in range(2, max(pages) + 1):
+        request = AnalysisSearchRequest(perPage=per_page, pagination='cursor', cursor=cursor, **sort)
+        _, _, cursor = crud.search_data_keyset(request)
+        if cursor is None:
+            break
+        cursors[page] = cursor
+
+    results = []
+    for page in pages:
+        if page not in cursors:
+            print(f"  第 {page} 页超出数据范围，跳过")
+            continue
+        offset_request = AnalysisSearchRequest(page=page, perPage=per_page, **sort)
+        cursor_request = AnalysisSearchRequest(perPage=per_page, pagination='cursor', cursor=cursors[page], **sort)
+
+        offset_ms = measure(lambda: crud.search_data_paginated(offset_request), repeat)
+        cursor_ms = measure(lambda: crud.search_data_keyset(cursor_request), repeat)
+        results.append((page, offset_ms, cursor_ms))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OFFSET 分页与游标分页基准测试')
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--pages', default='1,10,100,500')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+    pages = [int(p) for p in args.pages.split(',')]
+
+    print(f"数据行数: {args.rows:,}, 每页: {args.per_page}, 页码: {pages}")
+    create_table(args.rows)
+    try:
+        translated = engine.execution_options(schema_translate_map={'analysis': SCHEMA})
+        with Session(bind=translated) as session:
+            crud = AnalysisCRUD(session)
+            for name, sort in SORTS.items():
+                print(f"\n[{name}]")
+                print(f"  {'页码':>6} {'OFFSET p50':>12} {'游标 p50':>12} {'加速比':>8}")
+                for page, offset_ms, cursor_ms in run_sort(crud, sort, pages, args.per_page, args.repeat):
+                    print(f"  {page:>8} {offset_ms:10.2f}ms {cursor_ms:10.2f}ms {offset_ms / cursor_ms:8.1f}x")
+    finally:
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
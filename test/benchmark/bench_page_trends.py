@@ -0,0 +1,111 @@
+"""
+表格趋势图基准测试：搜索结果内嵌 ranking_trend_day vs 搜索不返回趋势 + /trends 按页批量获取
+
+直接挂载 analysis_router（数据库会话指向测试 schema，跳过登录校验），按表格的请求参数比较每页：
+  - 内嵌趋势：/search?fields=<表格字段>（原实现，每行一个 [{"date", "ranking"}] 数组）
+  - 不含趋势：/search?fields=<表格字段>&include_trend=false
+  - 批量趋势：POST /trends {ids: 当前页 id}（dates 只返回一次，ranks 为整数数组）
+统计响应字节数（原始 / gzip）和 p50 延迟；搜索结果缓存在测试期间关闭（计数缓存保留，总数只统计一次）。
+
+用法（需要可用的数据库，结束后删除测试 schema）：
+    python -m test.benchmark.bench_page_trends --rows 1000000 --per-page 500 --pages 1,20
+"""
+import argparse
+import asyncio
+import gzip
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.auth.simple_auth import simple_auth
+from app.table.analysis.analysis_api import analysis_router
+from app.table.analysis.analysis_cache import search_result_cache
+from database import async_engine, get_async_db
+from test.benchmark.bench_keyset_pagination import SCHEMA, TABLE, create_table, execute
+from test.benchmark.bench_search_projection import execute_autocommit, table_fields
+
+
+def build_app() -> FastAPI:
+    factory = async_sessionmaker(
+        bind=async_engine.execution_options(schema_translate_map={'analysis': SCHEMA}), class_=AsyncSession
+    )
+
+    async def bench_db():
+        async with factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(analysis_router, prefix='/api/analysis')
+    app.dependency_overrides[get_async_db] = bench_db
+    app.dependency_overrides[simple_auth.get_current_user] = lambda: {'user_name': 'bench'}
+    return app
+
+
+async def measure(client: httpx.AsyncClient, method: str, url: str, repeat: int, **kwargs) -> tuple:
+    """返回 (p50 ms, 原始字节数, gzip 字节数, 响应数据)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+    return statistics.median(timings), len(response.content), len(gzip.compress(response.content)), response.json()
+
+
+async def run(args) -> None:
+    fields = table_fields()
+    print(f"  {'请求':<20} {'页码':>6} {'p50':>10} {'响应':>10} {'gzip':>10}")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=build_app()), base_url='http://bench') as client:
+        for page in args.pages:
+            query = {'page': page, 'perPage': args.per_page, 'fields': fields}
+            cases = [('内嵌趋势', query), ('不含趋势', {**query, 'include_trend': 'false'})]
+            results = {}
+            for name, params in cases:
+                results[name] = await measure(client, 'GET', '/api/analysis/search', args.repeat, params=params)
+            ids = [item['id'] for item in results['不含趋势'][3]['data']['items']]
+            results['批量趋势'] = await measure(client, 'POST', '/api/analysis/trends', args.repeat, json={'ids': ids})
+
+            lean, trends = results['不含趋势'], results['批量趋势']
+            results['不含趋势 + 批量趋势'] = tuple(a + b for a, b in zip(lean[:3], trends[:3])) + (None,)
+            for name, (latency, size, compressed, _) in results.items():
+                print(f"  {name:<20} {page:>6} {latency:8.1f}ms {size / 1024:8.0f}KB {compressed / 1024:8.0f}KB")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='表格趋势图批量获取基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--per-page', type=int, default=500)
+    parser.add_argument('--pages', default='1,20', help='页码，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+    args.pages = [int(page) for page in args.pages.split(',')]
+
+    # 关闭结果缓存，每个请求都查询数据库；计数缓存保留（与翻页时相同，总数只统计一次）
+    search_result_cache.ttl_seconds = 0
+
+    print(f"数据行数: {args.rows:,}, 每页: {args.per_page}")
+    create_table(args.rows)
+    # 与真实数据相同：每行 7 天的日趋势
+    execute(f"""
+        UPDATE {TABLE} SET ranking_trend_day = (
+            SELECT jsonb_agg(jsonb_build_object('date', DATE '2024-01-15' - d, 'ranking', current_rangking_day + d * 7))
+            FROM generate_series(0, 6) AS d)
+    """)
+    # 生产表的主键和 keyword 唯一索引（/trends 按 id / keyword 查询）
+    execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+    execute(f"CREATE UNIQUE INDEX ON {TABLE} (keyword)")
+    execute_autocommit(f"VACUUM ANALYZE {TABLE}")
+    try:
+        asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
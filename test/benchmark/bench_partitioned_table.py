@@ -0,0 +1,173 @@
+"""
+主表分区基准测试：单表 + keyword 唯一索引 vs 按 keyword HASH 分区
+
+在独立 schema bench_partition 中建两张结构与主表相同的表，服务端批量生成数据后测量：
+  - 并行 UPSERT 吞吐（多个连接同时写入，模拟多进程导入）
+  - 典型查询延迟（关键词精确查找、前缀匹配、类目筛选排序、条件计数）
+
+用法（需要可用的数据库，结束后删除 bench_partition schema）：
+    python -m test.benchmark.bench_partitioned_table --rows 10000000 --workers 4 --partitions 16
+"""
+import argparse
+import random
+import statistics
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+from database import engine
+
+SCHEMA = 'bench_partition'
+TABLES = {'plain': f'{SCHEMA}.search_plain', 'partitioned': f'{SCHEMA}.search_partitioned'}
+
+SECONDARY_INDEXES = ['top_category', 'report_date_day DESC', 'current_rangking_day']
+
+SEARCH_QUERIES = {
+    '关键词精确查找': "SELECT * FROM {table} WHERE keyword = %(keyword)s",
+    '关键词前缀匹配': "SELECT * FROM {table} WHERE keyword LIKE %(prefix)s ORDER BY current_rangking_day LIMIT 50",
+    '类目筛选+排名排序': (
+        "SELECT * FROM {table} WHERE top_category = %(category)s "
+        "ORDER BY current_rangking_day LIMIT 50"
+    ),
+    '条件计数': "SELECT count(*) FROM {table} WHERE top_category = %(category)s AND current_rangking_day < 100000",
+}
+
+UPSERT_SQL = """
+    INSERT INTO {table} (keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                         current_rangking_week, report_date_week, previous_rangking_week, top_category)
+    VALUES %s
+    ON CONFLICT (keyword) DO UPDATE SET
+        previous_rangking_day = {table_name}.current_rangking_day,
+        current_rangking_day = EXCLUDED.current_rangking_day,
+        ranking_change_day = EXCLUDED.current_rangking_day - {table_name}.current_rangking_day,
+        report_date_day = EXCLUDED.report_date_day,
+        updated_at = now()
+"""
+
+
+def execute(sql: str) -> None:
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def create_tables(rows: int, partitions: int) -> None:
+    """创建两张测试表并用 generate_series 在服务端生成数据"""
+    execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    like = "LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS"
+    execute(f"CREATE TABLE {TABLES['plain']} ({like})")
+    execute(f"CREATE TABLE {TABLES['partitioned']} ({like}) PARTITION BY HASH (keyword)")
+    for i in range(partitions):
+        execute(
+            f"CREATE TABLE {TABLES['partitioned']}_p{i:02d} PARTITION OF {TABLES['partitioned']} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {i})"
+        )
+
+    for name, table in TABLES.items():
+        start = time.perf_counter()
+        execute(f"""
+            INSERT INTO {table} (keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                                 current_rangking_week, report_date_week, previous_rangking_week,
+                                 top_brand, top_category, top_product_asin, top_product_title)
+            SELECT 'keyword ' || i, ((i::bigint * 7919) % 3000000)::int, DATE '2024-01-15', 0,
+                   0, DATE '2024-01-15', 0,
+                   'brand ' || (i % 5000), 'category ' || (i % 40), 'B0' || lpad(i::text, 8, '0'),
+                   'product title ' || i
+            FROM generate_series(1, {rows}) AS i
+        """)
+        execute(f"CREATE UNIQUE INDEX ON {table} (keyword)")
+        for column in SECONDARY_INDEXES:
+            execute(f"CREATE INDEX ON {table} ({column})")
+        execute(f"ANALYZE {table}")
+        print(f"  {name}: 生成 {rows:,} 行及索引 {time.perf_counter() - start:.1f}s")
+
+
+def run_parallel_upserts(table: str, rows: int, workers: int, batches: int, batch_size: int) -> float:
+    """多个连接并行 UPSERT（90% 已有关键词 + 10% 新关键词），返回 rows/sec"""
+    table_name = table.split('.')[-1]
+    sql = UPSERT_SQL.format(table=table, table_name=table_name)
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                for _ in range(batches):
+                    keys = {rng.randint(1, int(rows * 1.1)) for _ in range(batch_size)}
+                    values = [
+                        (f'keyword {k}', rng.randint(1, 3_000_000), '2024-01-16', 0, 0, '2024-01-16', 0,
+                         f'category {k % 40}')
+                        for k in sorted(keys)  # 固定加锁顺序，避免死锁
+                    ]
+                    execute_values(cursor, sql, values, page_size=batch_size)
+                    conn.commit()
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(workers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return workers * batches * batch_size / elapsed
+
+
+def measure_search(table: str, rows: int, repeat: int) -> dict:
+    """各类查询的 p50 延迟（毫秒）"""
+    rng = random.Random(0)
+    conn = engine.raw_connection()
+    results = {}
+    try:
+        with conn.cursor() as cursor:
+            for name, query in SEARCH_QUERIES.items():
+                timings = []
+                for _ in range(repeat):
+                    key = rng.randint(1, rows)
+                    params = {'keyword': f'keyword {key}', 'prefix': f'keyword {key}%',
+                              'category': f'category {key % 40}'}
+                    start = time.perf_counter()
+                    cursor.execute(query.format(table=table), params)
+                    cursor.fetchall()
+                    timings.append((time.perf_counter() - start) * 1000)
+                results[name] = statistics.median(timings)
+        conn.rollback()
+    finally:
+        conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='主表分区基准测试')
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--partitions', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batches', type=int, default=20)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+
+    print(f"数据行数: {args.rows:,}, 分区数: {args.partitions}, 并行连接: {args.workers}")
+    create_tables(args.rows, args.partitions)
+    try:
+        for name, table in TABLES.items():
+            throughput = run_parallel_upserts(table, args.rows, args.workers, args.batches, args.batch_size)
+            execute(f"ANALYZE {table}")
+            latencies = measure_search(table, args.rows, args.repeat)
+            print(f"\n[{name}] 并行 UPSERT: {throughput:,.0f} rows/s")
+            for query_name, ms in latencies.items():
+                print(f"  {query_name:<12} p50 {ms:8.2f} ms")
+    finally:
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
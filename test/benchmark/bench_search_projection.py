@@ -0,0 +1,125 @@
+"""
+搜索列投影基准测试：完整 ORM 行 vs 只查询需要的列（可选覆盖索引）
+
+在 bench_keyset_pagination 生成的测试表上，按默认排序取第 N 页，比较：
+  - 完整行：select(AmazonOriginSearchData)，读取全部列（原实现）
+  - 全部字段：listing_columns()，AnalysisDataItem 需要的列
+  - 表格字段：listing_columns(表格 fields)，只查询 Amis 表格渲染的列
+  - 表格字段 + 覆盖索引：执行 docs/migrations/008_covering_listing_index.sql 后再测
+统计每页 p50 延迟、数据库返回的字节数（pg_column_size 求和）以及执行计划的扫描方式。
+测试期间开启 BRANDED_KEYWORD_FLAG（默认列表部分索引的前提）。
+
+用法（需要可用的数据库，结束后删除测试 schema）：
+    python -m test.benchmark.bench_search_projection --rows 1000000 --per-page 500 --pages 1,20,100
+"""
+import argparse
+import pathlib
+import re
+import statistics
+import time
+
+from sqlalchemy import select, text, func
+from sqlalchemy.orm import sessionmaker
+
+from config import settings
+from app.table.analysis.analysis_crud import AnalysisCRUD
+from app.table.analysis.table_component import TableComponent
+from app.table.analysis.analysis_serializer import listing_columns, resolve_fields
+from app.table.search.search_schemas import AnalysisSearchRequest
+from database import engine
+from test.benchmark.bench_keyset_pagination import SCHEMA, TABLE, create_table, execute
+
+MIGRATION = pathlib.Path(__file__).resolve().parents[2] / 'docs' / 'migrations' / '008_covering_listing_index.sql'
+
+
+def execute_autocommit(sql: str) -> None:
+    """VACUUM 不能在事务中执行"""
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text(sql))
+
+
+def table_fields() -> str:
+    return ",".join(column["name"] for column in TableComponent._get_table_columns())
+
+
+def page_statement(crud: AnalysisCRUD, columns: list, page: int, per_page: int):
+    params = AnalysisSearchRequest(page=page, perPage=per_page)
+    return crud._paginated_statement(crud._build_search_query(params), params, columns)
+
+
+def measure(crud: AnalysisCRUD, columns: list, page: int, per_page: int, repeat: int) -> tuple:
+    """返回 (p50 ms, 返回字节数, 扫描方式)"""
+    stmt = page_statement(crud, columns, page, per_page)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = crud.db.execute(stmt)
+        result.all() if columns else result.scalars().all()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    page_rows = stmt.subquery('page_rows')
+    size = crud.db.execute(select(func.sum(func.pg_column_size(text('page_rows.*')))).select_from(page_rows)).scalar()
+    plan = '\n'.join(crud.db.execute(text(f'EXPLAIN {compile_sql(stmt)}')).scalars())
+    scan = 'Index Only Scan' if 'Index Only Scan' in plan else ('Index Scan' if 'Index Scan' in plan else 'Seq Scan')
+    return statistics.median(timings), size or 0, scan
+
+
+def compile_sql(stmt) -> str:
+    """EXPLAIN 用的 SQL 文本（文本语句不经过 schema_translate_map，手动替换为测试表）"""
+    sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+    return sql.replace('analysis.amazon_origin_search_data', TABLE)
+
+
+def run(crud: AnalysisCRUD, cases: list, pages: list, per_page: int, repeat: int) -> None:
+    for name, columns in cases:
+        for page in pages:
+            latency, size, scan = measure(crud, columns, page, per_page, repeat)
+            print(f"  {name:<16} {page:>6} {latency:8.1f}ms {size / 1024:9.0f}KB  {scan}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索列投影基准测试')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--per-page', type=int, default=500)
+    parser.add_argument('--pages', default='1,20,100', help='页码，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+    pages = [int(page) for page in args.pages.split(',')]
+
+    settings.BRANDED_KEYWORD_FLAG = True
+    print(f"数据行数: {args.rows:,}, 每页: {args.per_page}, 趋势引擎: {settings.RANKING_TREND_ENGINE}")
+    create_table(args.rows)
+    execute(f"""
+        UPDATE {TABLE} SET top_product_click_share = 12.34, top_product_conversion_share = 5.67,
+            product_title_2nd = top_product_title || ' (2nd)', product_title_3rd = top_product_title || ' (3rd)',
+            ranking_trend_day = (SELECT jsonb_agg(jsonb_build_object('date', DATE '2024-01-15' - d, 'ranking', d + 1))
+                                 FROM generate_series(0, 6) AS d)
+    """)
+    execute_autocommit(f"VACUUM ANALYZE {TABLE}")
+
+    session = sessionmaker(bind=engine.execution_options(schema_translate_map={'analysis': SCHEMA}))()
+    crud = AnalysisCRUD(session)
+    table_columns = listing_columns(resolve_fields(table_fields()))
+    try:
+        print(f"  {'查询':<16} {'页码':>6} {'p50':>10} {'返回数据':>11}  扫描方式")
+        run(crud, [('完整行', None), ('全部字段', listing_columns()), ('表格字段', table_columns)],
+            pages, args.per_page, args.repeat)
+
+        # 结束会话事务，否则建索引会等待表锁
+        session.rollback()
+        start = time.perf_counter()
+        migration = re.sub(r'"analysis"\."amazon_origin_search_data"', TABLE, MIGRATION.read_text(encoding='utf-8'))
+        for statement in migration.split(';'):
+            if statement.strip():
+                execute_autocommit(statement)
+        print(f"  建覆盖索引 {time.perf_counter() - start:.1f}s")
+        run(crud, [('表格字段+覆盖索引', table_columns)], pages, args.per_page, args.repeat)
+    finally:
+        session.close()
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
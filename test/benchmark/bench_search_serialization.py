@@ -0,0 +1,145 @@
+"""
+搜索响应序列化基准测试：逐行 Pydantic 模型（原实现）vs 精简序列化（按列查询 + 按列格式化 + orjson）
+
+同一个 FastAPI 应用挂两个路由：
+  - /model：search_data() 逐行构造 AnalysisDataItem，model_dump 后由 response_model 重新校验并编码
+  - /lean：search_payload() 只查询列表需要的列，按列格式化后直接编码为 JSON 字节（当前实现）
+通过 httpx ASGITransport 顺序请求，统计 100/500/1000 行每页的 p50 延迟和响应大小；
+另对同一页已取出的数据单独计时格式化 + 编码部分（不含查询）。
+数据表复用 bench_keyset_pagination 的生成方式（独立 schema，通过 schema_translate_map 指向），
+并写入 7 天趋势数据；搜索结果缓存和计数缓存在测试期间关闭。
+
+用法（需要可用的数据库，结束后删除测试 schema）：
+    python -m test.benchmark.bench_search_serialization --rows 200000 --page-sizes 100,500,1000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from starlette.responses import Response
+
+from app.table.analysis.analysis_cache import search_result_cache
+from app.table.analysis.analysis_count import CountResult, count_cache
+from app.table.analysis.analysis_serializer import dumps, listing_columns
+from app.table.analysis.analysis_service import AsyncAnalysisService
+from app.table.search.search_schemas import AnalysisSearchRequest, AnalysisSearchResponse
+from database import async_engine
+from test.benchmark.bench_keyset_pagination import SCHEMA, TABLE, create_table, execute
+
+
+def build_app() -> FastAPI:
+    factory = async_sessionmaker(
+        bind=async_engine.execution_options(schema_translate_map={'analysis': SCHEMA}), class_=AsyncSession
+    )
+    app = FastAPI()
+
+    @app.get('/model', response_model=AnalysisSearchResponse)
+    async def search_model(page: int, per_page: int):
+        params = AnalysisSearchRequest(page=page, perPage=per_page, orderBy='current_rangking_day')
+        async with factory() as db:
+            return (await AsyncAnalysisService(db).search_data(params)).model_dump()
+
+    @app.get('/lean', response_model=AnalysisSearchResponse)
+    async def search_lean(page: int, per_page: int):
+        params = AnalysisSearchRequest(page=page, perPage=per_page, orderBy='current_rangking_day')
+        async with factory() as db:
+            payload = await AsyncAnalysisService(db).search_payload(params)
+        return Response(content=dumps(payload), media_type='application/json')
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, per_page: int, repeat: int) -> tuple:
+    """返回 (p50 ms, 响应字节数)"""
+    timings, size = [], 0
+    for i in range(repeat):
+        start = time.perf_counter()
+        response = await client.get(path, params={'page': 1 + i % 5, 'per_page': per_page})
+        timings.append((time.perf_counter() - start) * 1000)
+        size = len(response.content)
+    return statistics.median(timings), size
+
+
+async def measure_serialization(per_page: int, repeat: int) -> tuple:
+    """同一页数据只计格式化 + 编码：返回 (模型路径 p50 ms, 精简路径 p50 ms)"""
+    factory = async_sessionmaker(
+        bind=async_engine.execution_options(schema_translate_map={'analysis': SCHEMA}), class_=AsyncSession
+    )
+    params = AnalysisSearchRequest(perPage=per_page, orderBy='current_rangking_day')
+    count_result = CountResult(per_page, True)
+    async with factory() as db:
+        service = AsyncAnalysisService(db)
+        items, _ = await service.crud.search_data_paginated(params)
+        rows, _ = await service.crud.search_data_paginated(params, listing_columns())
+
+    def model_path():
+        # 逐行模型 -> model_dump -> response_model 校验 -> JSON 编码（FastAPI 默认流程）
+        data = service._build_response(params, '', items, count_result, None).model_dump()
+        body = AnalysisSearchResponse.model_validate(data).model_dump(mode='json')
+        return json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+    def lean_path():
+        return dumps(service._build_payload(params, '', rows, count_result, None))
+
+    results = []
+    for serialize in (model_path, lean_path):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            timings.append((time.perf_counter() - start) * 1000)
+        results.append(statistics.median(timings))
+    return tuple(results)
+
+
+async def run(args) -> None:
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        # 预热连接池和语句缓存
+        for path in ('/model', '/lean'):
+            await measure(client, path, 10, 3)
+
+        print(f"  {'每页':>6} {'/model p50':>12} {'/lean p50':>12} {'序列化(模型)':>14} {'序列化(精简)':>14} {'响应大小':>10}")
+        for per_page in args.page_sizes:
+            model_ms, size = await measure(client, '/model', per_page, args.repeat)
+            lean_ms, _ = await measure(client, '/lean', per_page, args.repeat)
+            model_only, lean_only = await measure_serialization(per_page, args.repeat)
+            print(f"  {per_page:>6} {model_ms:10.1f}ms {lean_ms:10.1f}ms "
+                  f"{model_only:12.1f}ms {lean_only:12.1f}ms {size / 1024:8.0f}KB")
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索响应序列化基准测试')
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--page-sizes', default='100,500,1000', help='每页行数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keep', action='store_true', help='保留测试 schema')
+    args = parser.parse_args()
+    args.page_sizes = [int(size) for size in args.page_sizes.split(',')]
+
+    # 关闭结果缓存和计数缓存，每个请求都查询数据库并重新序列化
+    search_result_cache.ttl_seconds = 0
+    count_cache.ttl_seconds = 0
+
+    print(f"数据行数: {args.rows:,}, 每组请求: {args.repeat}")
+    create_table(args.rows)
+    execute(f"""
+        UPDATE {TABLE} SET top_product_click_share = 12.34, top_product_conversion_share = 5.67,
+            ranking_trend_day = (SELECT jsonb_agg(jsonb_build_object('date', DATE '2024-01-15' - d, 'ranking', d + 1))
+                                 FROM generate_series(0, 6) AS d)
+    """)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if not args.keep:
+            execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from app.table.analysis import analysis_crud, analysis_service
+from app.table.analysis.analysis_cache import SearchResultCache
+from app.table.analysis.analysis_crud import AsyncAnalysisCRUD
+from app.table.analysis.analysis_serializer import dumps
+from app.table.analysis.analysis_service import AsyncAnalysisService
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+
+class TestAsyncAnalysisCRUD(unittest.IsolatedAsyncioTestCase):
+    """异步 CRUD 在临时表上的分页、游标分页与计数（无数据库时跳过）"""
+
+    async def asyncSetUp(self):
+        # 每个测试独立的事件循环，不使用全局引擎的连接池
+        engine = create_async_engine(settings.DATABASE_URL_ASYNC, poolclass=NullPool)
+        self.addAsyncCleanup(engine.dispose)
+        try:
+            conn = await engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addAsyncCleanup(conn.close)
+        await conn.begin()
+        await conn.execute(text(
+            "CREATE TEMP TABLE amazon_origin_search_data "
+            "(LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        await conn.execute(text("""
+            INSERT INTO pg_temp.amazon_origin_search_data
+                (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week, top_brand, top_category)
+            SELECT i, 'keyword ' || i, i, DATE '2024-01-15' - (i % 2), 0,
+                   i, DATE '2024-01-14', 0, 'brand', CASE WHEN i % 2 = 0 THEN 'Toys' ELSE 'Electronics' END
+            FROM generate_series(1, 120) AS i
+        """))
+        translated = await conn.execution_options(schema_translate_map={'analysis': 'pg_temp'})
+        self.crud = AsyncAnalysisCRUD(AsyncSession(bind=translated))
+
+        patcher = patch.object(analysis_crud, 'count_cache', SearchResultCache(max_entries=10, ttl_seconds=60))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_paginated_with_exact_count(self):
+        params = AnalysisSearchRequest(category='Toys', perPage=25, page=2, orderBy='current_rangking_day')
+        with patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 10 ** 9):
+            items, count_result = await self.crud.search_data_paginated(params)
+        self.assertEqual([item.current_rangking_day for item in items], list(range(52, 101, 2)))
+        self.assertEqual((count_result.total, count_result.exact), (60, True))
+
+    async def test_planner_estimate_through_async_session(self):
+        with patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 1):
+            _, count_result = await self.crud.search_data_paginated(AnalysisSearchRequest())
+        self.assertFalse(count_result.exact)
+        self.assertGreater(count_result.total, 0)
+
+    async def test_keyset_walk(self):
+        ids, cursor = [], None
+        while True:
+            request = AnalysisSearchRequest(perPage=50, pagination='cursor', cursor=cursor)
+            items, _, cursor = await self.crud.search_data_keyset(request)
+            ids.extend(item.id for item in items)
+            if cursor is None:
+                break
+        self.assertEqual(sorted(ids), list(range(1, 121)))
+
+    async def test_lean_payload_matches_model_path(self):
+        await self.crud.db.execute(text("""
+            UPDATE pg_temp.amazon_origin_search_data
+            SET top_product_click_share = CASE WHEN id % 3 = 0 THEN 0 ELSE 12.34 END,
+                top_product_conversion_share = 5.67,
+                ranking_trend_day = '[{"date": "2024-01-15", "ranking": 3}]'::jsonb
+        """))
+        service = AsyncAnalysisService(self.crud.db)
+        for params in (AnalysisSearchRequest(category='Toys', perPage=30, orderBy='current_rangking_day'),
+                       AnalysisSearchRequest(perPage=40, pagination='cursor')):
+            with patch.object(analysis_service, 'search_result_cache', SearchResultCache(max_entries=0, ttl_seconds=0)):
+                expected = (await service.search_data(params)).model_dump()
+                payload = await service.search_payload(params)
+            self.assertTrue(payload['data']['items'])
+            self.assertEqual(payload, expected)
+            self.assertEqual(json.loads(dumps(payload)), expected)
+
+    async def test_fields_projection(self):
+        service = AsyncAnalysisService(self.crud.db)
+        ids, cursor = [], None
+        with patch.object(analysis_service, 'search_result_cache', SearchResultCache(max_entries=0, ttl_seconds=0)):
+            while True:
+                # 游标排序字段不在 fields 中时也能生成下一页游标
+                request = AnalysisSearchRequest(perPage=50, pagination='cursor', cursor=cursor,
+                                                orderBy='current_rangking_week', fields='keyword,conversion_rate')
+                data = (await service.search_payload(request))['data']
+                self.assertEqual(list(data['items'][0]), ['id', 'keyword', 'conversion_rate'])
+                ids.extend(item['id'] for item in data['items'])
+                cursor = data['nextCursor']
+                if cursor is None:
+                    break
+
+            invalid = await service.search_payload(AnalysisSearchRequest(fields='keyword,hashed_pwd'))
+            # 趋势由 /trends 批量获取时不返回趋势字段
+            lean = await service.search_payload(AnalysisSearchRequest(perPage=5, include_trend=False))
+        self.assertEqual(sorted(ids), list(range(1, 121)))
+        self.assertEqual(invalid['status'], 1)
+        self.assertNotIn('ranking_trend_day', lean['data']['items'][0])
+        self.assertIn('top_product_title', lean['data']['items'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
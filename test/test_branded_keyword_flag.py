@@ -0,0 +1,113 @@
+import re
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import text, desc, asc
+from sqlalchemy.dialects import postgresql
+
+from app.table.analysis.analysis_crud import AnalysisCRUD, CATEGORY_BLACKLIST
+from app.table.analysis.analysis_model import AmazonOriginSearchData
+from app.table.search.search_schemas import AnalysisSearchRequest
+from app.table.upload.csv_processor import CSVProcessor
+from config import settings
+
+MIGRATION = Path(__file__).resolve().parents[1] / 'docs' / 'migrations' / '004_branded_keyword_flag.sql'
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(paramstyle='named'), compile_kwargs={"literal_binds": True}))
+
+
+def default_listing(limit: int = 50):
+    """无筛选条件的默认列表查询（与 search_data_paginated 默认排序一致）"""
+    with patch.object(settings, 'BRANDED_KEYWORD_FLAG', True):
+        stmt = AnalysisCRUD(db=None)._build_search_query(AnalysisSearchRequest())
+    return stmt.order_by(
+        desc(AmazonOriginSearchData.report_date_day),
+        asc(AmazonOriginSearchData.current_rangking_day)
+    ).limit(limit)
+
+
+class TestBrandedKeywordFlag(unittest.TestCase):
+    def test_default_filter_uses_flag(self):
+        sql = compile_sql(default_listing()).split('WHERE', 1)[1]
+        self.assertIn('is_branded_keyword = false', sql)
+        self.assertNotIn('concat', sql)
+
+        with patch.object(settings, 'BRANDED_KEYWORD_FLAG', False):
+            stmt = AnalysisCRUD(db=None)._build_search_query(AnalysisSearchRequest())
+        sql = compile_sql(stmt).split('WHERE', 1)[1]
+        self.assertIn('concat', sql)
+        self.assertNotIn('is_branded_keyword', sql)
+
+    def test_import_sql_computes_flag(self):
+        processor = CSVProcessor(branded_flag=True)
+        for data_type in ('daily', 'weekly'):
+            upsert_sql = processor._build_upsert_sql(data_type)
+            merge_sql = processor._build_merge_sql(data_type)
+            self.assertIn("lower(:keyword) LIKE concat('%', lower(:top_brand), '%')", upsert_sql)
+            self.assertIn("lower(s.keyword) LIKE concat('%', lower(s.top_brand), '%')", merge_sql)
+            self.assertIn('is_branded_keyword = EXCLUDED.is_branded_keyword', upsert_sql)
+
+        self.assertNotIn('is_branded_keyword', CSVProcessor(branded_flag=False)._build_upsert_sql('daily'))
+
+    def test_migration_blacklist_matches_crud(self):
+        predicate = MIGRATION.read_text(encoding='utf-8').split('NOT IN', 1)[1]
+        categories = re.findall(r"'([^']+)'", predicate.split(')', 1)[0])
+        self.assertEqual(sorted(categories), sorted(CATEGORY_BLACKLIST))
+
+
+class TestBrandedKeywordIndexPlan(unittest.TestCase):
+    """对主表结构的临时副本执行 004 迁移并 EXPLAIN 默认列表查询（无数据库时跳过）"""
+
+    TABLE = '"analysis"."amazon_origin_search_data"'
+    TEMP_TABLE = 'pg_temp.amazon_origin_search_data'
+
+    def setUp(self):
+        from database import engine
+        try:
+            self.conn = engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addCleanup(self.conn.close)
+        self.transaction = self.conn.begin()
+        self.addCleanup(self.transaction.rollback)
+        self.conn.execute(text(
+            f"CREATE TEMP TABLE amazon_origin_search_data (LIKE {self.TABLE} INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+
+    def _run_migration(self):
+        sql = re.sub(r'--[^\n]*', '', MIGRATION.read_text(encoding='utf-8')).replace(self.TABLE, self.TEMP_TABLE)
+        for statement in filter(str.strip, sql.split(';')):
+            self.conn.execute(text(statement))
+
+    def test_default_listing_uses_partial_index(self):
+        # 先建索引再写入：同一事务内回填会破坏 HOT 链，新索引在本事务内不可用
+        self._run_migration()
+
+        categories = ['Electronics', 'Home & Kitchen'] + CATEGORY_BLACKLIST
+        branded_expr = CSVProcessor(branded_flag=True)._branded_value_exprs('k', 'b')['is_branded_keyword']
+        self.conn.execute(text(f"""
+            INSERT INTO {self.TEMP_TABLE}
+                (keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week,
+                 top_brand, top_category, is_branded_keyword)
+            SELECT k, i % 1000, DATE '2024-01-15' - (i % 30), 0, 0, DATE '2024-01-15', 0,
+                   b, (CAST(:categories AS text[]))[1 + i % :category_count], {branded_expr}
+            FROM generate_series(1, 20000) AS i,
+                 LATERAL (SELECT 'keyword ' || i AS k,
+                                 CASE WHEN i % 3 = 0 THEN 'Keyword' ELSE 'brand' || (i % 50) END AS b) AS v
+        """), {'categories': categories, 'category_count': len(categories)})
+        self.conn.execute(text(f"ANALYZE {self.TEMP_TABLE}"))
+
+        branded = self.conn.execute(text(f"SELECT count(*) FROM {self.TEMP_TABLE} WHERE is_branded_keyword")).scalar()
+        self.assertGreater(branded, 0)
+
+        query = compile_sql(default_listing()).replace('analysis.amazon_origin_search_data', self.TEMP_TABLE)
+        plan = '\n'.join(row[0] for row in self.conn.execute(text(f"EXPLAIN {query}")))
+        self.assertIn('Index Scan using idx_amazon_default_listing', plan)
+        self.assertNotIn('Sort', plan)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import get_async_db
+from app.auth.simple_auth import simple_auth
+from app.table.analysis.analysis_api import analysis_router
+from app.table.analysis.analysis_crud import AnalysisCRUD
+from app.table.analysis.analysis_service import AsyncAnalysisService
+
+
+class TestCategoriesHttpCache(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(analysis_router, prefix='/api/analysis')
+        app.dependency_overrides[get_async_db] = lambda: None
+        app.dependency_overrides[simple_auth.get_current_user] = lambda: {'id': 1}
+        self.client = TestClient(app)
+        self.categories = [{'label': 'Electronics (10)', 'value': 'Electronics'}]
+
+        async def get_categories(service):
+            return self.categories
+
+        patcher = patch.object(AsyncAnalysisService, 'get_categories', get_categories)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_etag_revalidation(self):
+        first = self.client.get('/api/analysis/categories')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['data'], self.categories)
+        self.assertEqual(first.headers['cache-control'], f'private, max-age={settings.CATEGORIES_CACHE_MAX_AGE}')
+
+        etag = first.headers['etag']
+        unchanged = self.client.get('/api/analysis/categories', headers={'If-None-Match': etag})
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged.headers['etag'], etag)
+
+        # 导入后类目计数变化，旧 ETag 不再匹配
+        self.categories = [{'label': 'Electronics (12)', 'value': 'Electronics'}]
+        changed = self.client.get('/api/analysis/categories', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['etag'], etag)
+
+
+class TestCategoryStatsView(unittest.TestCase):
+    """临时表上按迁移脚本的查询生成类目统计（无数据库时跳过）"""
+
+    def setUp(self):
+        from database import engine
+        try:
+            conn = engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addCleanup(conn.close)
+        conn.begin()
+        conn.execute(text(
+            "CREATE TEMP TABLE amazon_origin_search_data "
+            "(LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        conn.execute(text("""
+            INSERT INTO pg_temp.amazon_origin_search_data
+                (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week, top_brand, top_category)
+            VALUES (1, 'usb cable', 5, DATE '2024-01-15', 0, 5, DATE '2024-01-14', 0, 'Anker', 'Electronics'),
+                   (2, 'phone charger', 8, DATE '2024-01-14', 0, 8, DATE '2024-01-14', 0, 'Anker', 'Electronics'),
+                   (3, 'anker charger', 9, DATE '2024-01-15', 0, 9, DATE '2024-01-14', 0, 'Anker', 'Electronics'),
+                   (4, 'building blocks', 3, DATE '2024-01-15', 0, 3, DATE '2024-01-14', 0, 'LEGO', 'Toys'),
+                   (5, 'novel', 1, DATE '2024-01-15', 0, 1, DATE '2024-01-14', 0, 'Penguin', 'Books')
+        """))
+        with open('docs/migrations/007_category_stats.sql', encoding='utf-8') as f:
+            sql = f.read()
+        view_query = sql[sql.index('SELECT'):sql.index(';')].replace('"analysis".', 'pg_temp.')
+        conn.execute(text(f"CREATE TEMP TABLE category_stats ON COMMIT DROP AS {view_query}"))
+
+        translated = conn.execution_options(schema_translate_map={'analysis': 'pg_temp'})
+        self.crud = AnalysisCRUD(Session(bind=translated))
+
+    def test_categories_from_materialized_stats(self):
+        with patch.object(settings, 'CATEGORY_STATS_MATERIALIZED', True):
+            categories = self.crud.get_categories()
+
+        # 品牌词条目和黑名单类目不计入
+        self.assertEqual(categories, [
+            {'label': 'Electronics (2)', 'value': 'Electronics'},
+            {'label': 'Toys (1)', 'value': 'Toys'},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
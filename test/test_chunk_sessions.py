@@ -0,0 +1,191 @@
+import errno
+import hashlib
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config import settings
+from app.table.upload import upload_api
+from app.table.upload import chunk_sessions
+from app.table.upload.chunk_sessions import ChunkSessionStore, merge_parts
+
+
+class TestChunkSessionStore(unittest.TestCase):
+    """文件存储：两个实例共用同一目录，模拟多个 worker / 重启后的进程"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = temp_dir.name
+        self.store = ChunkSessionStore(self.root, ttl_seconds=3600)
+
+    def _commit(self, store: ChunkSessionStore, key: str, part_number: int, data: bytes) -> bool:
+        temp_path = store.temp_part_path(key, part_number)
+        temp_path.write_bytes(data)
+        return store.commit_part(key, part_number, temp_path, len(data), hashlib.md5(data).hexdigest())
+
+    def test_shared_between_instances(self):
+        session = self.store.create('day.csv', 'daily')
+        other = ChunkSessionStore(self.root, ttl_seconds=3600)
+
+        self.assertTrue(self._commit(other, session['key'], 2, b'b' * 10))
+        self.assertTrue(self._commit(self.store, session['key'], 1, b'a' * 5))
+        # 相同内容重复上传：跳过，不留临时文件
+        self.assertFalse(self._commit(other, session['key'], 1, b'a' * 5))
+        # 内容不同时覆盖
+        self.assertTrue(self._commit(other, session['key'], 2, b'c' * 3))
+
+        parts = other.parts(session['key'])
+        self.assertEqual(sorted(parts), [1, 2])
+        self.assertEqual(parts[2], {'partNumber': 2, 'size': 3, 'md5': hashlib.md5(b'ccc').hexdigest()})
+        self.assertEqual(sorted(os.listdir(self.store.session_dir(session['key']))),
+                         ['part_0001.chunk', 'part_0001.json', 'part_0002.chunk', 'part_0002.json', 'session.json'])
+
+        self.assertEqual(other.get(session['key'])['filename'], 'day.csv')
+        self.assertTrue(self.store.finish(session['key']))
+        self.assertFalse(other.finish(session['key']))
+        self.assertTrue(other.get(session['key'])['locked'])
+
+    def test_invalid_keys(self):
+        for key in ('', '../etc', 'a' * 32 + '/..', 'f' * 32):
+            self.assertIsNone(self.store.get(key))
+
+    def test_purge_expired(self):
+        stale = self.store.create('old.csv', 'daily')
+        fresh = self.store.create('new.csv', 'daily')
+        past = time.time() - 7200
+        os.utime(self.store.session_dir(stale['key']) / 'session.json', (past, past))
+
+        self.assertEqual(self.store.active_count(), 1)
+        self.assertEqual(self.store.purge_expired(), 1)
+        self.assertFalse(self.store.session_dir(stale['key']).exists())
+        self.assertEqual(self.store.active_keys(), [fresh['key']])
+
+    def test_idle_sessions_do_not_count_as_active(self):
+        abandoned = [self.store.create('a.csv', 'daily'), self.store.create('b.csv', 'daily')]
+        past = time.time() - 600
+        for session in abandoned:
+            os.utime(self.store.session_dir(session['key']) / 'session.json', (past, past))
+
+        # 重启后（新的存储实例）中断的上传不占用并发名额，但过期前仍可续传
+        restarted = ChunkSessionStore(self.root, ttl_seconds=3600, idle_seconds=300)
+        self.assertEqual(restarted.active_count(), 0)
+        self.assertEqual(restarted.purge_expired(), 0)
+        self.assertIsNotNone(restarted.get(abandoned[0]['key']))
+
+        # 续传收到新分块后重新计入
+        self._commit(restarted, abandoned[0]['key'], 1, b'resumed')
+        self.assertEqual(restarted.active_keys(), [abandoned[0]['key']])
+
+
+class TestMergeParts(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dir = Path(temp_dir.name)
+        self.chunks = [os.urandom(3 * 1024 * 1024 + 17), b'', os.urandom(1024), os.urandom(2 * 1024 * 1024)]
+
+    def _write_parts(self) -> list:
+        paths = []
+        for number, data in enumerate(self.chunks, 1):
+            path = self.dir / f'part_{number:04d}.chunk'
+            path.write_bytes(data)
+            paths.append(path)
+        return paths
+
+    def test_modes_produce_same_file(self):
+        expected = b''.join(self.chunks)
+        for mode in ('copy', 'read'):
+            paths = self._write_parts()
+            destination = self.dir / f'{mode}.csv'
+            self.assertEqual(merge_parts(paths, destination, mode), len(expected))
+            self.assertEqual(destination.read_bytes(), expected)
+            self.assertFalse(any(path.exists() for path in paths))
+
+    def test_fallback_when_copy_file_range_unsupported(self):
+        def unsupported(*args):
+            raise OSError(errno.EXDEV, 'cross-device')
+
+        for patched in (['copy_file_range'], ['copy_file_range', 'sendfile']):
+            destination = self.dir / 'fallback.csv'
+            with patch.multiple(chunk_sessions.os, create=True, **{name: unsupported for name in patched}):
+                merge_parts(self._write_parts(), destination)
+            self.assertEqual(destination.read_bytes(), b''.join(self.chunks))
+
+    def test_missing_part_raises(self):
+        paths = self._write_parts()
+        paths[2].unlink()
+        with self.assertRaises(FileNotFoundError):
+            merge_parts(paths, self.dir / 'broken.csv', remove_parts=False)
+
+
+class TestChunkUploadApi(unittest.TestCase):
+    """分块上传接口：续传、重复分块、完成校验和只合并一次"""
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.store = ChunkSessionStore(os.path.join(temp_dir.name, 'chunks'), ttl_seconds=3600)
+        self.processed = []
+
+        patches = [
+            patch.object(upload_api, 'get_chunk_session_store', lambda: self.store),
+            patch.object(upload_api, 'process_csv_background',
+                         lambda path, filename, data_type: self.processed.append(Path(path).read_bytes())),
+            patch.object(settings, 'UPLOAD_DIR', temp_dir.name),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        app = FastAPI()
+        app.include_router(upload_api.upload_router)
+        self.client = TestClient(app)
+
+    def _upload(self, key: str, part_number: int, data: bytes, **form) -> dict:
+        return self.client.post('/chunkApi', data={'key': key, 'partNumber': str(part_number), **form},
+                                files={'file': ('blob', data)}).json()
+
+    def test_resume_and_finish_once(self):
+        started = self.client.post('/startChunkApi', json={'filename': 'day.csv', 'data_type': 'daily'}).json()
+        key, upload_id = started['data']['key'], started['data']['uploadId']
+        chunks = {1: b'keyword,rank\n', 2: b'lego,1\n', 3: b'duplo,2\n'}
+
+        etags = {number: self._upload(key, number, data)['data']['eTag'] for number, data in chunks.items() if number != 2}
+        self.assertEqual(etags[1], hashlib.md5(chunks[1]).hexdigest())
+
+        finish = {'uploadId': upload_id, 'key': key, 'filename': 'day.csv',
+                  'partList': [{'partNumber': number, 'eTag': etags.get(number)} for number in chunks]}
+        incomplete = self.client.post('/finishChunkApi', json=finish).json()
+        self.assertEqual((incomplete['status'], incomplete['data']['missingParts']), (1, [2]))
+
+        # 续传：查询已收到的分块，补传缺少的分块；已收到的分块按 partHash 跳过
+        received = self.client.get('/chunkParts', params={'key': key}).json()['data']
+        self.assertEqual([part['partNumber'] for part in received['parts']], [1, 3])
+        skipped = self._upload(key, 1, b'', partHash=etags[1])
+        self.assertEqual((skipped['msg'], skipped['data']['eTag']), ('分块已存在', etags[1]))
+        self._upload(key, 2, chunks[2])
+
+        self.assertEqual(self.client.post('/finishChunkApi', json=finish).json()['status'], 0)
+        self.assertEqual(self.processed, [b''.join(chunks[number] for number in sorted(chunks))])
+        self.assertIsNone(self.store.get(key))
+
+    def test_finish_is_idempotent(self):
+        key = self.client.post('/startChunkApi', json={'filename': 'w.csv', 'data_type': 'weekly'}).json()['data']['key']
+        self._upload(key, 1, b'x')
+        self.store.finish(key)  # 另一个 worker 已提交合并
+
+        finish = {'uploadId': 'u', 'key': key, 'filename': 'w.csv', 'partList': [{'partNumber': 1}]}
+        self.assertEqual(self.client.post('/finishChunkApi', json=finish).json()['status'], 0)
+        self.assertEqual(self.processed, [])
+        self.assertEqual(self._upload(key, 2, b'y')['status'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+from app.table.upload.csv_processor import CSVProcessor, validate_csv_structure
+from app.table.upload.file_inspector import CSVFileInspector
+
+METADATA = '"报告范围=[\'每周\']","选择周=[\'第 2 周 | 2024-01-07 - 2024-01-13\']"\n'
+HEADER = '搜索频率排名,搜索词,点击量最高的品牌 #1,点击量最高的品牌 #2,点击量最高的品牌 #3\n'
+
+
+class TestCSVFileInspector(unittest.TestCase):
+    def _write(self, content: str) -> str:
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def test_validate_and_headers(self):
+        path = self._write(METADATA + HEADER + '1,wireless earbuds,Sony,Apple,Bose\n')
+        inspector = CSVFileInspector(path)
+        self.assertEqual(inspector.validate(), (True, "文件结构验证通过"))
+        self.assertEqual(inspector.headers[:2], ['搜索频率排名', '搜索词'])
+        self.assertTrue(validate_csv_structure(path)[0])
+
+    def test_validate_rejects_missing_rows(self):
+        path = self._write(METADATA + HEADER)
+        self.assertFalse(CSVFileInspector(path).validate()[0])
+
+    def test_count_rows_across_buffer_boundaries(self):
+        rows = ''.join(f'{i},keyword {i},A,B,C\n' for i in range(1, 1001))
+        path = self._write(METADATA + HEADER + rows)
+        # 小缓冲区强制跨块扫描
+        self.assertEqual(CSVFileInspector(path, buffer_size=7).count_data_rows(), 1000)
+
+    def test_count_rows_without_trailing_newline(self):
+        path = self._write(METADATA + HEADER + '1,a,A,B,C\n2,b,A,B,C')
+        self.assertEqual(CSVFileInspector(path).count_data_rows(), 2)
+
+    def test_read_chunks_with_inspected_headers(self):
+        rows = ''.join(f'{i},keyword {i},A,B,C\n' for i in range(1, 26))
+        path = self._write(METADATA + HEADER + rows)
+        processor = CSVProcessor(batch_size=10)
+        inspector = CSVFileInspector(path)
+
+        info = processor.get_file_info(path, inspector)
+        chunks = list(processor.read_csv_chunks(path, inspector.headers))
+
+        self.assertEqual(info['estimated_records'], 25)
+        self.assertEqual([len(c) for c in chunks], [10, 10, 5])
+        self.assertEqual(chunks[0]['keyword'].iloc[0], 'keyword 1')
+        self.assertEqual(chunks[0]['top_brand'].iloc[0], 'A')
+
+    def test_byte_ranges_are_line_aligned_and_cover_data(self):
+        rows = ''.join(f'{i},keyword {i},{"A" * (i % 13)},B,C\n' for i in range(1, 1001))
+        path = self._write(METADATA + HEADER + rows)
+        inspector = CSVFileInspector(path)
+        ranges = inspector.plan_byte_ranges(lines_per_range=97)
+
+        self.assertGreater(len(ranges), 5)
+        self.assertEqual(ranges[0][0], inspector.data_offset)
+        self.assertEqual(ranges[-1][1], os.path.getsize(path))
+        with open(path, 'rb') as f:
+            data = f.read()
+        for (start, end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+        # 各分片直接读取原文件，合计结果与整文件读取一致
+        processor = CSVProcessor(batch_size=50)
+        keywords = [
+            kw for byte_range in ranges
+            for chunk in processor.read_csv_chunks(path, inspector.headers, byte_range=byte_range)
+            for kw in chunk['keyword']
+        ]
+        self.assertEqual(keywords, [f'keyword {i}' for i in range(1, 1001)])
+
+    def test_byte_ranges_single_range_for_small_file(self):
+        path = self._write(METADATA + HEADER + '1,a,A,B,C\n2,b,A,B,C')
+        inspector = CSVFileInspector(path)
+        self.assertEqual(inspector.plan_byte_ranges(1000), [(inspector.data_offset, os.path.getsize(path))])
+
+
+if __name__ == '__main__':
+    unittest.main()
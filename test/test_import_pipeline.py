@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import nullcontext
+from datetime import date
+
+from app.table.upload.csv_processor import CSVProcessor
+from app.table.upload.file_inspector import CSVFileInspector
+from app.table.upload.import_pipeline import ImportPipeline, format_stage_metrics
+
+METADATA = '"报告范围=[\'每日\']","选择日期=[\'2024-01-15\']"\n'
+HEADER = ','.join(f'列{i}' for i in range(20)) + '\n'
+REPORT_DATE = date(2024, 1, 15)
+
+
+class RecordingProcessor(CSVProcessor):
+    """写入阶段只记录数据（不访问数据库），可模拟慢写入和写入失败"""
+
+    def __init__(self, load_delay: float = 0.0, fail_on_chunk: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.load_delay = load_delay
+        self.fail_on_chunk = fail_on_chunk
+        self.loaded = []
+        self.sessions = set()
+        self.read_chunks = 0
+        self.max_ahead = 0
+
+    def read_csv_chunks(self, file_path, headers=None, byte_range=None):
+        for chunk_df in super().read_csv_chunks(file_path, headers, byte_range):
+            self.read_chunks += 1
+            self.max_ahead = max(self.max_ahead, self.read_chunks - len(self.loaded))
+            yield chunk_df
+
+    def load_prepared(self, prepared, report_date, data_type, db_session):
+        self.sessions.add((id(db_session), threading.current_thread().name))
+        if self.fail_on_chunk and len(self.loaded) + 1 == self.fail_on_chunk:
+            raise RuntimeError('写入失败')
+        time.sleep(self.load_delay)
+        self.loaded.append(prepared)
+        return prepared.rows
+
+
+class TestImportPipeline(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(METADATA + HEADER)
+            for i in range(1, 1001):
+                f.write(f'{i},keyword {i},A,B,C,Toys,Toys,Toys,B0{i:08d},title,1.5,0.5,,,,,,,,\n')
+        self.addCleanup(os.unlink, self.path)
+        self.headers = CSVFileInspector(self.path).headers
+
+    def _run(self, processor: CSVProcessor, queue_size: int = 2, **kwargs):
+        pipeline = ImportPipeline(processor, nullcontext, queue_size=queue_size)
+        return pipeline, pipeline.run(self.path, self.headers, REPORT_DATE, 'daily', **kwargs)
+
+    def _keywords(self, prepared_chunks) -> list:
+        return [record['keyword'] for prepared in prepared_chunks for batch in prepared.batches for record in batch]
+
+    def test_same_output_as_sequential(self):
+        for loader in ('upsert', 'copy'):
+            processor = RecordingProcessor(batch_size=64, loader=loader)
+            pipeline, processed = self._run(processor)
+
+            sequential = [
+                processor.prepare_chunk(chunk_df, REPORT_DATE, 'daily')
+                for chunk_df in CSVProcessor(batch_size=64, loader=loader).read_csv_chunks(self.path, self.headers)
+            ]
+            self.assertEqual(processed, 1000)
+            self.assertEqual(len(processor.loaded), 16)
+            if loader == 'upsert':
+                self.assertEqual(self._keywords(processor.loaded), self._keywords(sequential))
+                self.assertEqual(self._keywords(processor.loaded)[:2], ['keyword 1', 'keyword 2'])
+            else:
+                self.assertEqual([p.staging_csv for p in processor.loaded], [p.staging_csv for p in sequential])
+            # 写入阶段在单独线程中使用同一个会话
+            self.assertEqual(len(processor.sessions), 1)
+            self.assertEqual(next(iter(processor.sessions))[1], 'import-load')
+
+    def test_bounded_queues_limit_read_ahead(self):
+        processor = RecordingProcessor(batch_size=100, load_delay=0.05)
+        progress = []
+        pipeline, _ = self._run(processor, queue_size=1, on_progress=progress.append, progress_interval=0.02)
+
+        metrics = pipeline.metrics()
+        # 两个容量为 1 的队列 + 读取、准备阶段各持有一块 + 正在写入的一块
+        self.assertLessEqual(processor.max_ahead, 5)
+        self.assertEqual({q['capacity'] for q in metrics['queues'].values()}, {1})
+        self.assertTrue(all(q['max_depth'] <= 1 for q in metrics['queues'].values()))
+        self.assertEqual(metrics['bottleneck'], 'load')
+        self.assertGreater(metrics['stages']['read']['blocked_seconds'], 0)
+        self.assertTrue(progress)
+        self.assertLessEqual(progress[0]['stages']['load']['rows'], 1000)
+
+    def test_metrics_are_json_serializable(self):
+        pipeline, _ = self._run(RecordingProcessor(batch_size=100))
+        metrics = json.loads(json.dumps(pipeline.metrics()))
+        for stage in ('read', 'prepare', 'load'):
+            self.assertEqual(metrics['stages'][stage]['chunks'], 10)
+            self.assertEqual(metrics['stages'][stage]['rows'], 1000)
+        self.assertIn('写入', format_stage_metrics(metrics))
+        self.assertEqual(format_stage_metrics(None), '')
+
+    def test_stage_error_stops_pipeline(self):
+        processor = RecordingProcessor(batch_size=10, fail_on_chunk=3)
+        with self.assertRaisesRegex(RuntimeError, '写入失败'):
+            self._run(processor, queue_size=1)
+        self.assertEqual(len(processor.loaded), 2)
+        # 读取阶段随之停止，不会读完整个文件
+        self.assertLess(processor.read_chunks, 100)
+        self.assertFalse([t for t in threading.enumerate() if t.name.startswith('import-')])
+
+
+if __name__ == '__main__':
+    unittest.main()
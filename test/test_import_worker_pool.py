@@ -0,0 +1,91 @@
+import asyncio
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest import mock
+
+from app.table.upload import import_worker_pool
+from app.table.upload.import_worker_pool import ImportWorkerPool
+
+
+def _failing_init():
+    """模拟启动时数据库不可达"""
+    raise ConnectionError('database unreachable')
+
+
+def _noop_init():
+    pass
+
+
+def _crash_chunk(*args):
+    """模拟工作进程在处理分片时异常退出"""
+    os._exit(1)
+
+
+class TestImportWorkerPoolSlots(unittest.IsolatedAsyncioTestCase):
+    """提交限流：队列满时的等待不占用线程，取消等待不丢失空位（线程池代替进程池，不连接数据库）"""
+
+    async def asyncSetUp(self):
+        self.pool = ImportWorkerPool(max_workers=1, queue_depth=1)
+        self.pool._executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.pool.shutdown)
+
+    def _submit(self, chunk_id: int):
+        return asyncio.create_task(self.pool.run_chunk('missing.csv', 0, 0, [], '2024-01-15', 'daily', chunk_id))
+
+    async def test_cancelled_wait_keeps_slot(self):
+        self.assertTrue(self.pool._slots.acquire(blocking=False))  # 占满队列
+        waiters = [self._submit(i) for i in range(20)]
+        await asyncio.sleep(0.1)
+        self.assertEqual(self.pool.get_metrics()['waiting_submits'], 20)
+
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertEqual(self.pool.get_metrics()['waiting_submits'], 0)
+
+        # 释放后空位可用：提交的分片正常执行（工作进程处理器未初始化，分片返回 failed）
+        self.pool._slots.release()
+        result = await asyncio.wait_for(self._submit(99), timeout=5)
+        self.assertEqual((result['chunk_id'], result['status']), (99, 'failed'))
+        self.assertTrue(self.pool._slots.acquire(blocking=False))
+        self.pool._slots.release()
+
+
+class TestImportWorkerPoolRecovery(unittest.IsolatedAsyncioTestCase):
+    """工作进程初始化失败或异常退出后，进程池在下次提交时重新创建（真实进程池，工作进程不连接数据库）"""
+
+    async def asyncSetUp(self):
+        self.pool = ImportWorkerPool(max_workers=1, queue_depth=2)
+        self.addCleanup(self.pool.shutdown)
+
+    async def _run(self, chunk_id: int) -> dict:
+        return await self.pool.run_chunk('missing.csv', 0, 0, [], '2024-01-15', 'daily', chunk_id)
+
+    async def test_recovers_after_init_failure(self):
+        with mock.patch.object(import_worker_pool, '_init_worker', _failing_init):
+            with self.assertRaises(BrokenProcessPool):
+                self.pool.start()  # lifespan 启动失败
+            self.assertFalse(self.pool.is_running)
+
+        with mock.patch.object(import_worker_pool, '_init_worker', _noop_init):
+            result = await self._run(1)
+        self.assertEqual(result['chunk_id'], 1)
+        self.assertTrue(self.pool.is_running)
+
+    async def test_recovers_after_worker_crash(self):
+        with mock.patch.object(import_worker_pool, '_init_worker', _noop_init):
+            with mock.patch.object(import_worker_pool, 'run_import_chunk', _crash_chunk):
+                with self.assertRaises(BrokenProcessPool):
+                    await self._run(1)
+            self.assertFalse(self.pool.is_running)
+
+            result = await self._run(2)
+        self.assertEqual(result['chunk_id'], 2)
+        metrics = self.pool.get_metrics()
+        self.assertEqual((metrics['submitted'], metrics['failed'], metrics['waiting_submits']), (2, 2, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
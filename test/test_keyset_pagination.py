@@ -0,0 +1,110 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from app.table.analysis.analysis_crud import AnalysisCRUD
+from app.table.analysis.analysis_cursor import (
+    InvalidCursorError, resolve_sort_keys, encode_cursor, decode_cursor, keyset_ranges
+)
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(paramstyle='named')))
+
+
+class TestSearchCursor(unittest.TestCase):
+    def test_cursor_round_trip(self):
+        row = SimpleNamespace(top_product_click_share=Decimal('12.34'), report_date_day=date(2024, 1, 15), id=42)
+        for order_by in ('top_product_click_share', 'report_date_day'):
+            sort_keys = resolve_sort_keys(order_by, 'desc')
+            cursor = encode_cursor(sort_keys, row)
+            self.assertEqual(decode_cursor(cursor, sort_keys), [getattr(row, order_by), 42])
+
+    def test_cursor_must_match_sort(self):
+        row = SimpleNamespace(current_rangking_day=10, id=1)
+        cursor = encode_cursor(resolve_sort_keys('current_rangking_day', 'asc'), row)
+        with self.assertRaises(InvalidCursorError):
+            decode_cursor(cursor, resolve_sort_keys('current_rangking_day', 'desc'))
+        with self.assertRaises(InvalidCursorError):
+            decode_cursor('not-a-cursor', resolve_sort_keys('current_rangking_day', 'asc'))
+        with self.assertRaises(InvalidCursorError):
+            resolve_sort_keys('keyword; drop table', 'asc')
+
+    def test_keyset_ranges(self):
+        ranges = keyset_ranges(resolve_sort_keys('current_rangking_day', 'asc'), [10, 5])
+        self.assertEqual(len(ranges), 1)
+        self.assertIn('.current_rangking_day, analysis.amazon_origin_search_data.id) > (', compile_sql(ranges[0]))
+
+        # 默认排序方向混合：先取同日期内排名之后的行，再取更早日期的行
+        same_day, earlier = map(compile_sql, keyset_ranges(resolve_sort_keys(), [date(2024, 1, 15), 10, 5]))
+        self.assertIn('report_date_day = ', same_day)
+        self.assertIn('.current_rangking_day, analysis.amazon_origin_search_data.id) > (', same_day)
+        self.assertIn('report_date_day) < (', earlier)
+
+
+class TestKeysetPaginationQuery(unittest.TestCase):
+    """临时表上逐页遍历，游标分页不重不漏，顺序与 OFFSET 分页一致（无数据库时跳过）"""
+
+    def setUp(self):
+        from database import engine
+        try:
+            conn = engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addCleanup(conn.close)
+        conn.begin()
+        conn.execute(text(
+            "CREATE TEMP TABLE amazon_origin_search_data "
+            "(LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        # 排序键大量重复，验证 id 作为次序键
+        conn.execute(text("""
+            INSERT INTO pg_temp.amazon_origin_search_data
+                (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week,
+                 top_brand, top_category, top_product_click_share)
+            SELECT i, 'keyword ' || i, 1 + i % 17, DATE '2024-01-15' - (i % 3), 0,
+                   1 + i % 5, DATE '2024-01-14', 0, 'brand', 'Electronics', (i % 7) * 1.5
+            FROM generate_series(1, 300) AS i
+        """))
+        translated = conn.execution_options(schema_translate_map={'analysis': 'pg_temp'})
+        self.crud = AnalysisCRUD(Session(bind=translated))
+
+    def _walk_cursor(self, **params) -> list:
+        ids, cursor = [], None
+        while True:
+            request = AnalysisSearchRequest(perPage=23, pagination='cursor', cursor=cursor, **params)
+            items, _, cursor = self.crud.search_data_keyset(request)
+            ids.extend(item.id for item in items)
+            if cursor is None:
+                return ids
+
+    def _walk_offset(self, **params) -> list:
+        ids, page = [], 1
+        while items := self.crud.search_data_paginated(AnalysisSearchRequest(perPage=23, page=page, **params))[0]:
+            ids.extend(item.id for item in items)
+            page += 1
+        return ids
+
+    def test_cursor_pages_match_offset_pages(self):
+        for params in ({}, {'orderBy': 'current_rangking_day', 'orderDir': 'asc'},
+                       {'orderBy': 'top_product_click_share', 'orderDir': 'desc'}):
+            cursor_ids = self._walk_cursor(**params)
+            self.assertEqual(len(cursor_ids), 300)
+            self.assertEqual(len(set(cursor_ids)), 300)
+            # OFFSET 模式不按 id 排序，同值行顺序不确定，只比较排序键序列
+            columns = params.get('orderBy') or 'report_date_day, current_rangking_day'
+            keys = {row[0]: tuple(row[1:]) for row in self.crud.db.execute(text(
+                f"SELECT id, {columns} FROM pg_temp.amazon_origin_search_data"
+            ))}
+            self.assertEqual([keys[i] for i in cursor_ids], [keys[i] for i in self._walk_offset(**params)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import FastAPI, Depends
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from app.auth.auth_middleware import AdminAuthMiddleware
+from app.auth.login_auth import auth_service
+from app.auth.principal_cache import PrincipalCache, principal_cache
+from app.auth.simple_auth import simple_auth
+from app.user.user_model import UserCenter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_user(user_id: int = 1, user_name: str = 'alice', is_active: bool = True) -> UserCenter:
+    return UserCenter(id=user_id, user_name=user_name, hashed_pwd='x', is_active=is_active, is_super=False)
+
+
+class TestPrincipalCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = PrincipalCache(ttl_seconds=30, clock=self.clock)
+
+    def test_ttl_and_invalidate(self):
+        user = make_user()
+        self.cache.set(user)
+        self.assertIs(self.cache.get('alice'), user)
+
+        self.cache.invalidate(user_id=1)
+        self.assertIsNone(self.cache.get('alice'))
+
+        self.cache.set(user)
+        self.clock.now = 31
+        self.assertIsNone(self.cache.get('alice'))
+
+    def test_resolve_uses_cached_user(self):
+        token = auth_service.create_access_token(1, 'alice', False)
+        self.cache.set(make_user())
+        with patch('database.SessionFactory', side_effect=AssertionError('不应查询数据库')):
+            self.assertEqual(self.cache.resolve(token).user_name, 'alice')
+
+            self.cache.set(make_user(is_active=False))
+            self.assertIsNone(self.cache.resolve(token))
+
+    def test_resolve_rejects_bad_token(self):
+        with patch.object(auth_service, 'decode_access_token', return_value=None):
+            self.assertIsNone(self.cache.resolve('bad-token'))
+
+
+class TestMiddlewarePassesUser(unittest.TestCase):
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(AdminAuthMiddleware)
+
+        @app.get('/api/analysis/whoami')
+        def whoami(user: UserCenter = Depends(simple_auth.get_current_user)):
+            return {'id': user.id, 'username': user.user_name}
+
+        @app.get('/api/analysis/stream')
+        def stream(user: UserCenter = Depends(simple_auth.get_current_user)):
+            return StreamingResponse(iter([b'a,b\n', b'1,2\n']), media_type='text/csv')
+
+        self.client = TestClient(app)
+        self.addCleanup(principal_cache.clear)
+
+    def test_authenticated_request(self):
+        principal_cache.set(make_user(7, 'bob'))
+        token = auth_service.create_access_token(7, 'bob', False)
+        with patch('database.SessionFactory', side_effect=AssertionError('不应查询数据库')), \
+                patch.object(principal_cache, 'resolve', wraps=principal_cache.resolve) as resolve:
+            response = self.client.get('/api/analysis/whoami', headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.json(), {'id': 7, 'username': 'bob'})
+        # 中间件解析一次，依赖直接复用 request.state.current_user
+        self.assertEqual(resolve.call_count, 1)
+
+    def test_missing_token_rejected(self):
+        # 中间件不拦截（排除前缀 "/"），由路由的 HTTPBearer 依赖拒绝（状态码随 FastAPI 版本为 401 或 403）
+        self.assertIn(self.client.get('/api/analysis/whoami').status_code, (401, 403))
+
+    def test_streaming_response_passes_through(self):
+        principal_cache.set(make_user(7, 'bob'))
+        token = auth_service.create_access_token(7, 'bob', False)
+        response = self.client.get('/api/analysis/stream', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.content, b'a,b\n1,2\n')
+
+    def test_path_matching_same_as_startswith(self):
+        """预编译正则与原 startswith 逐个匹配的结果一致（"/" 为排除前缀，所有路径都不经中间件认证）"""
+        middleware = AdminAuthMiddleware(app=None)
+
+        def startswith_needs_auth(path: str) -> bool:
+            if path.startswith('/admin') or any(path.startswith(p) for p in middleware.exclude_paths):
+                return False
+            return any(path.startswith(p) for p in middleware.protected_paths)
+
+        for path in ['/', '/admin/login', '/admin/user', '/api/auth/login', '/static/css/style.css',
+                     '/health/import-pool', '/api/analysis/search', '/api/user/list', '/api/upload/chunk',
+                     '/api/public/data', 'api/upload/chunk', '']:
+            self.assertEqual(middleware._needs_auth(path), startswith_needs_auth(path), path)
+
+
+if __name__ == '__main__':
+    unittest.main()
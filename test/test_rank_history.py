@@ -0,0 +1,123 @@
+import unittest
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from app.table.analysis.analysis_trend import TrendQuery, PageTrendQuery, TREND_BATCH_MAX
+from app.table.upload.csv_processor import CSVProcessor, UPSERT_COLUMNS
+
+
+class TestRankHistorySQL(unittest.TestCase):
+    def _bind_names(self, sql: str) -> set:
+        return set(text(sql).compile().params)
+
+    def test_history_written_in_same_statement(self):
+        processor = CSVProcessor(rank_history=True)
+        for data_type, period in (('daily', "'d'"), ('weekly', "'w'")):
+            for sql in (processor._build_upsert_sql(data_type), processor._build_merge_sql(data_type)):
+                self.assertIn('INSERT INTO analysis.keyword_rank_history', sql)
+                self.assertIn(period, sql)
+        self.assertIn('report_date_week AS rank_date', processor._build_merge_sql('weekly'))
+        # 绑定参数不变，导入记录无需额外字段
+        self.assertEqual(self._bind_names(processor._build_upsert_sql('daily')), set(UPSERT_COLUMNS))
+        self.assertEqual(self._bind_names(processor._build_merge_sql('daily')), {'now', 'report_date', 'report_date_text'})
+
+    def test_disabled_by_default(self):
+        processor = CSVProcessor(rank_history=False)
+        self.assertNotIn('keyword_rank_history', processor._build_upsert_sql('daily'))
+        self.assertNotIn('keyword_rank_history', processor._build_merge_sql('weekly'))
+
+
+class TestTrendQuery(unittest.IsolatedAsyncioTestCase):
+    """临时表上的趋势降采样（无数据库时跳过）"""
+
+    END = date(2024, 6, 30)
+
+    async def asyncSetUp(self):
+        engine = create_async_engine(settings.DATABASE_URL_ASYNC, poolclass=NullPool)
+        self.addAsyncCleanup(engine.dispose)
+        try:
+            conn = await engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addAsyncCleanup(conn.close)
+        await conn.begin()
+        await conn.execute(text(
+            "CREATE TEMP TABLE amazon_origin_search_data "
+            "(LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        await conn.execute(text("""
+            INSERT INTO pg_temp.amazon_origin_search_data
+                (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week,
+                 ranking_trend_day)
+            VALUES (7, 'lego', 1, DATE '2024-06-30', 0, 1, DATE '2024-06-30', 0,
+                    '[{"date": "2024-06-30", "ranking": 1}, {"date": "2024-06-29", "ranking": 4}]'),
+                   (8, 'duplo', 2, DATE '2024-06-30', 0, 2, DATE '2024-06-30', 0,
+                    '[{"date": "2024-06-30", "ranking": 2}, {"date": "2024-06-28", "ranking": 9}]')
+        """))
+        await conn.execute(text(
+            "CREATE TEMP TABLE keyword_rank_history "
+            "(keyword_id int8, period char(1), rank_date date, rank int4) ON COMMIT DROP"
+        ))
+        # 400 天日排名（排名 = 距结束日期的天数 + 1），每周日一条周排名
+        await conn.execute(text("""
+            INSERT INTO pg_temp.keyword_rank_history
+            SELECT 7, 'd', DATE '2024-06-30' - i, i + 1 FROM generate_series(0, 399) AS i
+            UNION ALL
+            SELECT 7, 'w', DATE '2024-06-30' - i * 7, 100 + i FROM generate_series(0, 57) AS i
+        """))
+        translated = await conn.execution_options(schema_translate_map={'analysis': 'pg_temp'})
+        session = AsyncSession(bind=translated)
+        self.query = TrendQuery(session)
+        self.page_query = PageTrendQuery(session)
+
+    async def test_daily_windows(self):
+        data = await self.query.fetch(keyword_id=7, window=30)
+        self.assertEqual(len(data['dates']), 30)
+        self.assertEqual((data['dates'][-1], data['ranks'][-1]), ('2024-06-30', 1))
+        self.assertEqual(data['dates'][0], (self.END - timedelta(days=29)).isoformat())
+
+        data = await self.query.fetch(keyword='lego', window=90)
+        self.assertEqual((data['keywordId'], data['bucketDays']), (7, 3))
+        self.assertEqual(len(data['dates']), 30)
+        # 最后一桶：6/28~6/30 的排名 3, 2, 1 取平均
+        self.assertEqual((data['dates'][-1], data['ranks'][-1]), ('2024-06-30', 2))
+
+        data = await self.query.fetch(keyword_id=7, window=365)
+        self.assertEqual(data['bucketDays'], 7)
+        self.assertEqual(len(data['dates']), 53)
+        self.assertEqual(data['dates'], sorted(data['dates']))
+
+    async def test_weekly_and_missing(self):
+        data = await self.query.fetch(keyword_id=7, window=90, period='week')
+        self.assertEqual(data['bucketDays'], 7)
+        self.assertEqual(data['ranks'][-3:], [102, 101, 100])
+
+        data = await self.query.fetch(keyword='unknown', window=30)
+        self.assertEqual((data['keywordId'], data['dates']), (None, []))
+
+        with self.assertRaises(ValueError):
+            await self.query.fetch(keyword_id=7, window=60)
+
+    async def test_page_trends_columnar(self):
+        data = await self.page_query.fetch(ids=[8, 404, 7])
+        self.assertEqual(data, {
+            'dates': ['2024-06-30', '2024-06-29', '2024-06-28'],
+            'ids': [8, 7],
+            'ranks': [[2, None, 9], [1, 4, None]],
+        })
+
+        data = await self.page_query.fetch(keywords=['lego'])
+        self.assertEqual((data['ids'], data['keywords'], data['ranks']), ([7], ['lego'], [[1, 4]]))
+
+        for ids in ([], list(range(TREND_BATCH_MAX + 1))):
+            with self.assertRaises(ValueError):
+                await self.page_query.fetch(ids=ids)
+
+
+if __name__ == '__main__':
+    unittest.main()
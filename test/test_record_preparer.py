@@ -0,0 +1,67 @@
+import unittest
+from datetime import datetime, date
+
+import numpy as np
+import pandas as pd
+
+from app.table.upload.csv_processor import CSVProcessor
+from app.table.upload.record_preparer import prepare_batch_records
+from test.benchmark.bench_record_preparation import prepare_rowwise
+
+
+class TestRecordPreparer(unittest.TestCase):
+    def setUp(self):
+        self.processor = CSVProcessor(batch_size=100)
+        self.now = datetime(2024, 1, 15, 8, 30, 0)
+        self.report_date = date(2024, 1, 15)
+
+        raw = pd.DataFrame({
+            'col_0': ['1', '25.0', '', '7', 'abc', '3'],
+            'col_1': [' wireless earbuds ', 'phone case', 'empty rank', '   ', 'bad rank', 'no brand'],
+            'col_2': ['Sony', None, 'Apple', 'X', 'Y', ''],
+            'col_5': ['Electronics', 'Cell Phones', '', 'A', 'B', ' Books '],
+            'col_8': ['B000000001', 'B000000002', None, 'B3', 'B4', 'B5'],
+            'col_10': ['12.5', '', 'n/a', '1', '2', '0'],
+            'col_11': ['3.25', '4', None, '1', '2', '0'],
+        })
+        # 只有部分列，其余列走默认值分支
+        mapping = self.processor._create_column_mapping(12)
+        self.df = self.processor._clean_chunk_data(raw.rename(columns=mapping))
+
+    def _assert_identical(self, data_type: str):
+        expected = prepare_rowwise(self.df, self.report_date, data_type, self.now)
+        actual = prepare_batch_records(self.df, self.report_date, data_type, self.now)
+
+        self.assertEqual(len(actual), len(expected))
+        for exp, act in zip(expected, actual):
+            self.assertEqual(act, exp)
+            for key, value in exp.items():
+                self.assertIs(type(act[key]), type(value), f"字段类型不一致: {key}")
+
+    def test_daily_identical_to_rowwise(self):
+        self._assert_identical('daily')
+
+    def test_weekly_identical_to_rowwise(self):
+        self._assert_identical('weekly')
+
+    def test_empty_keywords_skipped(self):
+        records = prepare_batch_records(self.df, self.report_date, 'daily', self.now)
+        self.assertNotIn('', [r['keyword'] for r in records])
+        self.assertEqual(records[0]['ranking_trend_day'], '[{"date": "2024-01-15", "ranking": 1}]')
+
+    def test_large_random_chunk(self):
+        rng = np.random.default_rng(0)
+        rows = 2000
+        df = pd.DataFrame({
+            'current_rangking_day': rng.integers(0, 1_000_000, rows).astype(float),
+            'keyword': [f'kw {i}' if i % 17 else '' for i in range(rows)],
+            'top_brand': [f'brand {i}' if i % 5 else '' for i in range(rows)],
+            'top_product_click_share': rng.uniform(0, 100, rows).round(2),
+        })
+        expected = prepare_rowwise(df, self.report_date, 'daily', self.now)
+        actual = prepare_batch_records(df, self.report_date, 'daily', self.now)
+        self.assertEqual(actual, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
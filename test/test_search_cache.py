@@ -0,0 +1,159 @@
+import os
+import sys
+import threading
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+from app.table.analysis.analysis_cache import REDIS_RETRY_SECONDS, SearchResultCache
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SearchResultCache(max_entries=2, ttl_seconds=60, clock=self.clock)
+
+    def test_key_normalization(self):
+        key = SearchResultCache.make_key
+        self.assertEqual(key(AnalysisSearchRequest(keyword=' earbuds ')), key(AnalysisSearchRequest(keyword='earbuds')))
+        self.assertEqual(key(AnalysisSearchRequest(brand='')), key(AnalysisSearchRequest()))
+        self.assertNotEqual(key(AnalysisSearchRequest(page=2)), key(AnalysisSearchRequest()))
+        self.assertNotEqual(key(AnalysisSearchRequest(is_new_day=True)), key(AnalysisSearchRequest()))
+
+    def test_hit_miss_and_lru_eviction(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.set('a', {'v': 1})
+        self.cache.set('b', {'v': 2})
+        self.assertEqual(self.cache.get('a'), {'v': 1})  # a 变为最近使用
+        self.cache.set('c', {'v': 3})  # 淘汰 b
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('c'), {'v': 3})
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions']), (2, 2, 1))
+
+    def test_ttl_expiry(self):
+        self.cache.set('a', {'v': 1})
+        self.clock.now = 61
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get_stats()['expirations'], 1)
+
+    def test_version_bump_invalidates(self):
+        self.cache.set('a', {'v': 1})
+        self.assertEqual(self.cache.bump_version(), 1)
+        self.assertIsNone(self.cache.get('a'))
+
+        self.cache.set('a', {'v': 2})
+        self.assertEqual(self.cache.get('a'), {'v': 2})
+        self.assertEqual(self.cache.get_stats()['data_version'], 1)
+
+    def test_version_file_shared_between_workers(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        version_file = os.path.join(temp_dir.name, 'cache', 'version')
+        worker_a, worker_b = (SearchResultCache(max_entries=10, ttl_seconds=3600, version_file=version_file)
+                              for _ in range(2))
+        worker_b.set('a', {'total': 1})
+        self.assertEqual(worker_b.get('a'), {'total': 1})
+
+        # 导入在 worker_a 完成：worker_b 的进程内条目随之失效
+        self.assertEqual(worker_a.bump_version(), 1)
+        self.assertIsNone(worker_b.get('a'))
+        self.assertEqual(worker_b.current_version(), 1)
+
+        # 版本文件内容为版本号（整体替换写入，不随导入次数增长）
+        worker_b.bump_version()
+        with open(version_file) as f:
+            self.assertEqual(f.read(), '2')
+        self.assertEqual(os.listdir(os.path.dirname(version_file)), ['version'])
+
+    def test_result_stored_under_version_read_before_query(self):
+        version = self.cache.version_tag()
+        self.cache.bump_version()  # 查询期间导入完成
+        self.cache.set('a', {'v': 'stale'}, version)
+        self.assertIsNone(self.cache.get('a'))
+
+        version = self.cache.version_tag()
+        self.cache.set('a', {'v': 'fresh'}, version)
+        self.assertEqual(self.cache.get('a'), {'v': 'fresh'})
+
+    def test_disabled_when_ttl_zero(self):
+        cache = SearchResultCache(max_entries=10, ttl_seconds=0)
+        cache.set('a', {'v': 1})
+        self.assertIsNone(cache.get('a'))
+        self.assertFalse(cache.get_stats()['enabled'])
+
+    def test_redis_reconnects_after_backoff(self):
+        store, attempts = {}, []
+
+        class FlakyRedis:
+            """前两次连接 ping 失败（Redis 重启中），之后正常"""
+
+            @classmethod
+            def from_url(cls, url, socket_timeout):
+                return cls()
+
+            def ping(self):
+                attempts.append(1)
+                if len(attempts) <= 2:
+                    raise ConnectionError('connection refused')
+
+            def get(self, key):
+                return store.get(key)
+
+            def setex(self, key, ttl, value):
+                store[key] = value
+
+        self.addCleanup(mock.patch.stopall)
+        mock.patch.dict(sys.modules, {'redis': types.SimpleNamespace(Redis=FlakyRedis)}).start()
+        cache = SearchResultCache(max_entries=10, ttl_seconds=60, redis_url='redis://cache/0', clock=self.clock)
+
+        cache.set('a', {'v': 1})
+        cache.get('a')
+        self.assertEqual(len(attempts), 1)  # 退避期间不再连接
+        self.clock.now += REDIS_RETRY_SECONDS
+        cache.get('a')
+        self.assertEqual(len(attempts), 2)
+        self.assertFalse(cache.get_stats()['redis'])
+
+        self.clock.now += REDIS_RETRY_SECONDS
+        cache.set('b', {'v': 2})
+        self.assertTrue(cache.get_stats()['redis'])
+        self.assertTrue(any(key.endswith(':b') for key in store))
+
+
+
+class TestAsyncAccess(unittest.IsolatedAsyncioTestCase):
+    async def _calling_threads(self, cache: SearchResultCache) -> set:
+        threads = set()
+        get, set_ = cache.get, cache.set
+        cache.get = lambda *args: threads.add(threading.current_thread()) or get(*args)
+        cache.set = lambda *args: threads.add(threading.current_thread()) or set_(*args)
+        await cache.aset('a', {'v': 1})
+        self.assertEqual(await cache.aget('a'), {'v': 1})
+        return threads
+
+    async def test_redis_calls_run_off_event_loop(self):
+        # 配置了 Redis（此处连接失败，退回进程内缓存）：get/set 在线程中执行
+        cache = SearchResultCache(max_entries=10, ttl_seconds=60, redis_url='redis://127.0.0.1:1/0')
+        self.assertNotIn(threading.current_thread(), await self._calling_threads(cache))
+        count = SearchResultCache(max_entries=10, ttl_seconds=60, version_source=cache)
+        self.assertNotIn(threading.current_thread(), await self._calling_threads(count))
+
+    async def test_local_only_stays_on_loop(self):
+        cache = SearchResultCache(max_entries=10, ttl_seconds=60)
+        self.assertEqual(await self._calling_threads(cache), {threading.current_thread()})
+
+
+if __name__ == '__main__':
+    unittest.main()
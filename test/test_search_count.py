@@ -0,0 +1,200 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.table.analysis import analysis_crud
+from app.table.analysis.analysis_cache import SearchResultCache
+from app.table.analysis.analysis_count import CountResult, count_signature, summary_covers
+from app.table.analysis.analysis_crud import AnalysisCRUD
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+
+class FakeSession:
+    """按顺序返回预设结果的会话（不连接数据库），记录执行的语句数；结果为函数时在执行时调用"""
+
+    def __init__(self, outcomes: list):
+        self.outcomes = list(outcomes)
+        self.executed = 0
+
+    def execute(self, stmt):
+        self.executed += 1
+        outcome = self.outcomes.pop(0)
+        if callable(outcome):
+            outcome = outcome()
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResult(outcome)
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar(self):
+        return self.value
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.value
+
+
+class TestSearchFlow(unittest.TestCase):
+    """同步 CRUD 的计数缓存与异常处理（假会话，阈值 100 行，规划器估算固定为 5 行）"""
+
+    def setUp(self):
+        self.cache = SearchResultCache(max_entries=10, ttl_seconds=60, namespace='count')
+        for target, value in (('count_cache', self.cache), ('explain_row_estimate', lambda db, stmt: 5)):
+            patcher = patch.object(analysis_crud, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        threshold = patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 100)
+        threshold.start()
+        self.addCleanup(threshold.stop)
+
+    def test_count_cached_between_pages(self):
+        session = FakeSession([42, ['row'], ['row']])
+        crud = AnalysisCRUD(session)
+        first = crud.search(AnalysisSearchRequest(keyword='lego'))
+        second = crud.search(AnalysisSearchRequest(keyword='lego', page=2))
+        self.assertEqual(first, (['row'], CountResult(42, True), None))
+        self.assertEqual(second, first)
+        # 第二页只查询数据，不再计数
+        self.assertEqual((session.executed, session.outcomes), (3, []))
+
+    def test_count_during_import_not_served_as_fresh(self):
+        def count_while_importing():
+            self.cache.bump_version()
+            return 42
+
+        crud = AnalysisCRUD(FakeSession([count_while_importing, ['row'], 43, ['row']]))
+        self.assertEqual(crud.search(AnalysisSearchRequest(keyword='lego'))[1], CountResult(42, True))
+        self.assertEqual(crud.search(AnalysisSearchRequest(keyword='lego', page=2))[1], CountResult(43, True))
+
+    def test_overestimated_filter_counted_exactly(self):
+        # 规划器把选择性强的条件估算为 100 万行，探测计数只有 42 行：返回精确总数
+        with patch.object(analysis_crud, 'explain_row_estimate', lambda db, stmt: 10 ** 6):
+            crud = AnalysisCRUD(FakeSession([42, ['row']]))
+            self.assertEqual(crud.search(AnalysisSearchRequest(keyword='lego'))[1], CountResult(42, True))
+
+    def test_broad_filter_falls_back_to_estimate(self):
+        # 探测数到阈值 + 1 行后改用估算值，估算偏低时不小于已数到的行数
+        crud = AnalysisCRUD(FakeSession([101, ['row']]))
+        self.assertEqual(crud.search(AnalysisSearchRequest())[1], CountResult(101, False))
+
+    def test_query_error_returns_empty_result(self):
+        crud = AnalysisCRUD(FakeSession([42, RuntimeError('connection lost')]))
+        self.assertEqual(crud.search_data_paginated(AnalysisSearchRequest()), ([], CountResult(0, False)))
+
+
+class TestCountSignature(unittest.TestCase):
+    def test_signature_ignores_paging_and_sort(self):
+        base = count_signature(AnalysisSearchRequest(keyword='earbuds'))
+        self.assertEqual(base, count_signature(AnalysisSearchRequest(
+            keyword=' earbuds ', page=7, perPage=200, orderBy='current_rangking_day', orderDir='desc',
+            pagination='cursor', cursor='abc'
+        )))
+        self.assertNotEqual(base, count_signature(AnalysisSearchRequest(keyword='earbuds', brand='sony')))
+
+    def test_summary_covers_category_and_date_only(self):
+        with patch.object(settings, 'COUNT_SUMMARY_ENABLED', True):
+            self.assertTrue(summary_covers(AnalysisSearchRequest()))
+            self.assertTrue(summary_covers(AnalysisSearchRequest(category='Electronics', report_date='2024-01-15', page=3)))
+            self.assertFalse(summary_covers(AnalysisSearchRequest(category='Electronics', keyword='earbuds')))
+            self.assertFalse(summary_covers(AnalysisSearchRequest(daily_ranking_max=100)))
+        with patch.object(settings, 'COUNT_SUMMARY_ENABLED', False):
+            self.assertFalse(summary_covers(AnalysisSearchRequest()))
+
+
+class TestCountTotal(unittest.TestCase):
+    """临时表上比较精确计数、规划器估算、汇总表计数与缓存（无数据库时跳过）"""
+
+    def setUp(self):
+        from database import engine
+        try:
+            conn = engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addCleanup(conn.close)
+        conn.begin()
+        conn.execute(text(
+            "CREATE TEMP TABLE amazon_origin_search_data "
+            "(LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        # 每 10 行一行品牌词、每 20 行一行 Books 类目，均被默认过滤排除
+        conn.execute(text("""
+            INSERT INTO pg_temp.amazon_origin_search_data
+                (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week, top_brand, top_category)
+            SELECT i, CASE WHEN i % 10 = 0 THEN 'acme keyword ' ELSE 'keyword ' END || i,
+                   i, DATE '2024-01-15' - (i % 2), 0, i, DATE '2024-01-14', 0, 'Acme',
+                   CASE WHEN i % 20 = 1 THEN 'Books' WHEN i % 3 = 0 THEN 'Toys' ELSE 'Electronics' END
+            FROM generate_series(1, 600) AS i
+        """))
+        conn.execute(text("ANALYZE pg_temp.amazon_origin_search_data"))
+        # 物化视图不能建为临时对象，用相同查询生成的临时表代替
+        with open('docs/migrations/006_search_count_summary.sql', encoding='utf-8') as f:
+            sql = f.read()
+        view_query = sql[sql.index('SELECT'):sql.index(';')].replace('"analysis".', 'pg_temp.')
+        conn.execute(text(f"CREATE TEMP TABLE search_count_summary ON COMMIT DROP AS {view_query}"))
+
+        translated = conn.execution_options(schema_translate_map={'analysis': 'pg_temp'})
+        self.crud = AnalysisCRUD(Session(bind=translated))
+        self.cache = SearchResultCache(max_entries=100, ttl_seconds=60, namespace='count')
+        patcher = patch.object(analysis_crud, 'count_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _exact(self, params: AnalysisSearchRequest) -> int:
+        with patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 10 ** 9):
+            self.cache.bump_version()
+            return self.crud.search_data_paginated(params)[1].total
+
+    def test_exact_count_then_cached_for_other_pages(self):
+        params = AnalysisSearchRequest(category='Toys')
+        with patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 10 ** 9):
+            first = self.crud.search_data_paginated(params)[1]
+            second = self.crud.search_data_paginated(params.model_copy(update={'page': 3}))[1]
+        toys = self.crud.db.execute(text(
+            "SELECT count(*) FROM pg_temp.amazon_origin_search_data "
+            "WHERE top_category = 'Toys' AND keyword NOT LIKE 'acme%'"
+        )).scalar()
+        self.assertEqual(first, CountResult(toys, True))
+        self.assertEqual(second, first)
+        self.assertEqual(self.cache.get_stats()['hits'], 1)
+
+    def test_overestimated_filter_returns_exact_count(self):
+        params = AnalysisSearchRequest(category='Toys')
+        expected = self._exact(params)
+        # 估算远超阈值，但实际行数恰好等于阈值：仍为精确总数，计数语句带 LIMIT 阈值 + 1
+        with patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', expected), \
+                patch.object(analysis_crud, 'explain_row_estimate', lambda db, stmt: 10 ** 6):
+            self.cache.bump_version()
+            self.assertEqual(self.crud.search_data_paginated(params)[1], CountResult(expected, True))
+            self.assertIn(f'LIMIT {expected + 1}', str(self.crud._build_count_stmt(
+                self.crud._build_search_query(params)).compile(compile_kwargs={'literal_binds': True})))
+
+    def test_broad_filter_returns_estimate(self):
+        with patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 1):
+            result = self.crud.search_data_paginated(AnalysisSearchRequest())[1]
+        self.assertFalse(result.exact)
+        self.assertGreater(result.total, 0)
+
+    def test_summary_matches_exact_count(self):
+        for params in (AnalysisSearchRequest(),
+                       AnalysisSearchRequest(category='Electronics'),
+                       AnalysisSearchRequest(category='Toys', report_date='2024-01-15'),
+                       AnalysisSearchRequest(report_date='2024-01-14')):
+            expected = self._exact(params)
+            with patch.object(settings, 'COUNT_SUMMARY_ENABLED', True), \
+                    patch.object(settings, 'COUNT_ESTIMATE_THRESHOLD', 1):
+                self.cache.bump_version()
+                self.assertEqual(self.crud.search_data_paginated(params)[1], CountResult(expected, True), params)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.table.analysis.analysis_crud import AnalysisCRUD, escape_like
+from app.table.search.search_component import SearchComponent
+from app.table.search.search_schemas import AnalysisSearchRequest
+from config import settings
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(paramstyle='named'), compile_kwargs={"literal_binds": True}))
+
+
+class TestSearchTextMode(unittest.TestCase):
+    def setUp(self):
+        self.crud = AnalysisCRUD(db=None)
+
+    def _where(self, mode: str, **params) -> str:
+        with patch.object(settings, 'SEARCH_TEXT_MODE', mode):
+            stmt = self.crud._build_search_query(AnalysisSearchRequest(**params))
+        return compile_sql(stmt).split('WHERE', 1)[1]
+
+    def test_match_mode_select_only_in_trigram_mode(self):
+        for mode, shown in (('ilike', False), ('trigram', True)):
+            with patch.object(settings, 'SEARCH_TEXT_MODE', mode):
+                form = json.dumps(SearchComponent._build_additional_search_fields())
+            self.assertEqual('"match_mode"' in form, shown, mode)
+
+    def test_escape_like(self):
+        self.assertEqual(escape_like('50%_off\\'), '50\\%\\_off\\\\')
+
+    def test_ilike_mode_keeps_original_predicates(self):
+        sql = self._where('ilike', keyword='earbuds', category='Electronics', asin='B0C')
+        self.assertIn("keyword ILIKE '%earbuds%'", sql)
+        self.assertIn("top_category ILIKE '%Electronics%'", sql)
+        self.assertIn("top_product_asin ILIKE '%B0C%'", sql)
+
+    def test_trigram_contains_and_exact_matches(self):
+        sql = self._where('trigram', keyword='earbuds', category='Electronics', asin='b0c1234567')
+        self.assertIn("keyword ILIKE '%earbuds%' ESCAPE", sql)
+        self.assertIn("top_category = 'Electronics'", sql)
+        self.assertIn("top_product_asin = 'B0C1234567'", sql)
+
+    def test_trigram_prefix_and_partial_asin(self):
+        sql = self._where('trigram', keyword='wire_less', match_mode='prefix', asin='B0C')
+        self.assertIn("keyword ILIKE 'wire", sql)
+        self.assertIn("top_product_asin LIKE 'B0C%' ESCAPE", sql)
+
+        with patch.object(settings, 'SEARCH_TEXT_MODE', 'trigram'):
+            stmt = self.crud._build_search_query(AnalysisSearchRequest(keyword='wire_less', match_mode='prefix'))
+        self.assertIn('wire\\_less%', stmt.compile(dialect=postgresql.dialect()).params.values())
+
+    def test_trigram_similar_mode(self):
+        sql = self._where('trigram', brand='sony', match_mode='similar')
+        self.assertIn("top_brand % 'sony'", sql)
+
+    def test_short_terms_fall_back_to_prefix(self):
+        for match_mode in ('contains', 'similar'):
+            sql = self._where('trigram', keyword='ab', match_mode=match_mode)
+            self.assertIn("keyword ILIKE 'ab%' ESCAPE", sql)
+            self.assertNotIn("'%ab%'", sql)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import gzip
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+from app.table.analysis.analysis_export import AnalysisExporter, columnar_columns
+from app.table.search.search_schemas import AnalysisSearchRequest
+
+
+class TestStreamingExport(unittest.IsolatedAsyncioTestCase):
+    """临时表上流式导出（无数据库时跳过）"""
+
+    async def asyncSetUp(self):
+        # 每个测试独立的事件循环，不使用全局引擎的连接池
+        engine = create_async_engine(settings.DATABASE_URL_ASYNC, poolclass=NullPool)
+        self.addAsyncCleanup(engine.dispose)
+        try:
+            conn = await engine.connect()
+        except Exception as e:
+            self.skipTest(f"数据库不可用: {e}")
+        self.addAsyncCleanup(conn.close)
+        await conn.begin()
+        await conn.execute(text(
+            "CREATE TEMP TABLE amazon_origin_search_data "
+            "(LIKE analysis.amazon_origin_search_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        ))
+        await conn.execute(text("""
+            INSERT INTO pg_temp.amazon_origin_search_data
+                (id, keyword, current_rangking_day, report_date_day, previous_rangking_day,
+                 current_rangking_week, report_date_week, previous_rangking_week, top_brand, top_category)
+            SELECT i, 'keyword, "' || i || '"', i, DATE '2024-01-15', 0,
+                   i, DATE '2024-01-14', 0, 'brand', CASE WHEN i % 2 = 0 THEN 'Toys' ELSE 'Electronics' END
+            FROM generate_series(1, 50) AS i
+        """))
+        translated = await conn.execution_options(schema_translate_map={'analysis': 'pg_temp'})
+        self.session_factory = lambda: AsyncSession(bind=translated)
+
+    async def _export(self, params: AnalysisSearchRequest, compress: bool = False, **kwargs) -> list:
+        exporter = AnalysisExporter(session_factory=self.session_factory, batch_size=7, **kwargs)
+        return [chunk async for chunk in exporter.iter_csv(params, compress=compress)]
+
+    async def test_csv_streamed_in_batches(self):
+        chunks = await self._export(AnalysisSearchRequest(category='Toys', orderBy='current_rangking_day'))
+        # 表头 + 25 行按 7 行一批
+        self.assertEqual(len(chunks), 1 + 4)
+
+        lines = b''.join(chunks).decode('utf-8').splitlines()
+        self.assertEqual(lines[0], '\ufeff关键词,报告日期')
+        self.assertEqual(len(lines), 26)
+        self.assertEqual(lines[1], '"keyword, ""2""",2024-01-15')
+
+    async def test_gzip_and_row_limit(self):
+        params = AnalysisSearchRequest(orderBy='current_rangking_day', orderDir='desc')
+        plain = b''.join(await self._export(params, max_rows=10))
+        compressed = b''.join(await self._export(params, compress=True, max_rows=10))
+
+        self.assertEqual(gzip.decompress(compressed), plain)
+        lines = plain.decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 11)
+        self.assertTrue(lines[1].startswith('"keyword, ""50"""'))
+
+    async def _export_columnar(self, params: AnalysisSearchRequest, file_format: str) -> list:
+        exporter = AnalysisExporter(session_factory=self.session_factory, batch_size=7)
+        return [chunk async for chunk in exporter.stream(params, file_format)]
+
+    async def test_parquet_row_groups(self):
+        chunks = await self._export_columnar(AnalysisSearchRequest(category='Toys', orderBy='current_rangking_day'), 'parquet')
+        parquet_file = pq.ParquetFile(pa.BufferReader(b''.join(chunks)))
+
+        # 25 行按 7 行一批，每批一个 row group
+        self.assertEqual(parquet_file.metadata.num_row_groups, 4)
+        table = parquet_file.read()
+        self.assertEqual(table.column_names, [column.name for column in columnar_columns()])
+        self.assertEqual(table.num_rows, 25)
+        self.assertEqual(table.column('current_rangking_day').to_pylist()[:3], [2, 4, 6])
+        self.assertEqual(table.column('keyword')[0].as_py(), 'keyword, "2"')
+
+    async def test_arrow_stream(self):
+        chunks = await self._export_columnar(AnalysisSearchRequest(orderBy='current_rangking_day', orderDir='desc'), 'arrow')
+        table = pa.ipc.open_stream(b''.join(chunks)).read_all()
+
+        self.assertEqual(table.num_rows, 50)
+        self.assertEqual(table.column('current_rangking_day')[0].as_py(), 50)
+        self.assertEqual(str(table.column('report_date_day')[0].as_py()), '2024-01-15')
+
+
+if __name__ == '__main__':
+    unittest.main()
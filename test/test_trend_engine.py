@@ -0,0 +1,35 @@
+import unittest
+
+from sqlalchemy import text
+
+from app.table.upload.csv_processor import CSVProcessor, UPSERT_COLUMNS
+
+
+class TestTrendEngineSQL(unittest.TestCase):
+    def _bind_names(self, sql: str) -> set:
+        return set(text(sql).compile().params)
+
+    def test_array_engine_avoids_jsonb_subqueries(self):
+        processor = CSVProcessor(trend_engine='array')
+        for data_type in ('daily', 'weekly'):
+            sql = processor._build_upsert_sql(data_type)
+            self.assertNotIn('jsonb_array_elements', sql)
+            self.assertIn('trend_dates', sql)
+        self.assertIn('array_position', processor._build_upsert_sql('daily'))
+
+    def test_array_engine_bind_params_match_records(self):
+        processor = CSVProcessor(trend_engine='array')
+        for data_type in ('daily', 'weekly'):
+            self.assertLessEqual(self._bind_names(processor._build_upsert_sql(data_type)), set(UPSERT_COLUMNS))
+            self.assertEqual(self._bind_names(processor._build_merge_sql(data_type)), {'now', 'report_date'})
+
+    def test_jsonb_engine_unchanged(self):
+        processor = CSVProcessor(trend_engine='jsonb')
+        sql = processor._build_upsert_sql('daily')
+        self.assertIn('jsonb_array_elements', sql)
+        self.assertNotIn('trend_ranks', sql)
+        self.assertEqual(self._bind_names(sql), set(UPSERT_COLUMNS))
+
+
+if __name__ == '__main__':
+    unittest.main()